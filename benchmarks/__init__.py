@@ -0,0 +1 @@
+"""Microbenchmarks for the library's hot paths, see benchmarks.run."""
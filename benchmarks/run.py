@@ -0,0 +1,269 @@
+"""Runs the benchmarks and compares them with a saved baseline.
+
+Every benchmark does one kind of operation over each position in
+benchmarks.positions and reports:
+
+ops_per_second -- the best of several timed repeats
+peak_bytes -- the most memory allocated at once during one pass over the positions
+blocks_per_op -- memory blocks still allocated after a pass, per operation, which
+    should be about zero unless something is cached or leaked
+
+CPython doesn't count allocations, so the memory columns come from
+tracemalloc and sys.getallocatedblocks.
+
+Results are written as JSON. Given a baseline, every benchmark's speed is
+compared with it, and the run fails if any got slower by more than the
+threshold.
+
+Usage:
+    python -m benchmarks --json baseline.json
+    python -m benchmarks --baseline baseline.json --threshold 0.1
+    python -m benchmarks --filter parse_san --filter fen
+"""
+
+import argparse
+import datetime
+import json
+import math
+import platform
+import sys
+import time
+import tracemalloc
+from typing import Callable, Optional
+
+import chess
+from chess.engines import Limits, OysterEngine
+from .positions import POSITIONS
+
+
+# name -> a function that sets a benchmark up and returns it as
+# a function doing one pass over the positions, and the operations in a pass
+BENCHMARKS: 'dict[str, Callable[[], tuple[Callable[[], None], int]]]' = {}
+
+# the depth of the get_move benchmark's searches
+SEARCH_DEPTH = 2
+
+
+def benchmark(name: str):
+    def decorator(setup):
+        BENCHMARKS[name] = setup
+        return setup
+    return decorator
+
+
+def _boards() -> 'list[chess.Board]':
+    return [chess.Board.from_fen(fen) for fen in POSITIONS]
+
+
+@benchmark('legal_moves')
+def _legal_moves():
+    boards = _boards()
+
+    def run():
+        for board in boards:
+            list(board.legal_moves())
+
+    return run, len(boards)
+
+
+@benchmark('make_unmake')
+def _make_unmake():
+    positions = [(board, list(board.legal_moves())) for board in _boards()]
+
+    def run():
+        for board, moves in positions:
+            for move in moves:
+                board.make_move(move)
+                board.unmake_move(move)
+
+    return run, sum(len(moves) for _, moves in positions)
+
+
+@benchmark('is_in_check')
+def _is_in_check():
+    boards = _boards()
+
+    def run():
+        for board in boards:
+            board.is_in_check()
+
+    return run, len(boards)
+
+
+@benchmark('from_fen')
+def _from_fen():
+    def run():
+        for fen in POSITIONS:
+            chess.Board.from_fen(fen)
+
+    return run, len(POSITIONS)
+
+
+@benchmark('fen')
+def _fen():
+    boards = _boards()
+
+    def run():
+        for board in boards:
+            board.fen
+
+    return run, len(boards)
+
+
+@benchmark('parse_san')
+def _parse_san():
+    positions = [(board, [board.san(move) for move in board.legal_moves()]) for board in _boards()]
+
+    def run():
+        for board, sans in positions:
+            for san in sans:
+                board.parse_san(san, strict=True)
+
+    return run, sum(len(sans) for _, sans in positions)
+
+
+@benchmark('evaluate')
+def _evaluate():
+    boards = _boards()
+    engine = OysterEngine()
+
+    def run():
+        for board in boards:
+            engine.evaluate(board)
+
+    return run, len(boards)
+
+
+@benchmark('get_move')
+def _get_move():
+    boards = _boards()
+    engine = OysterEngine()
+
+    def run():
+        for board in boards:
+            # every search starts from nothing, so repeats take the same work
+            engine.new_game()
+            engine.get_move(board, Limits(depth=SEARCH_DEPTH))
+
+    return run, len(boards)
+
+
+def measure(name: str, *, repeat: int = 5, min_time: float = 0.2) -> dict:
+    """Runs one benchmark and returns its results.
+
+    Each repeat runs enough passes to take at least ``min_time`` seconds.
+    """
+
+    run, operations = BENCHMARKS[name]()
+
+    # the first pass warms up caches and finds how many passes a repeat needs
+    start = time.perf_counter()
+    run()
+    passes = max(1, math.ceil(min_time / (time.perf_counter() - start)))
+
+    best = math.inf
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(passes):
+            run()
+        best = min(best, (time.perf_counter() - start) / passes)
+
+    tracemalloc.start()
+    try:
+        blocks = sys.getallocatedblocks()
+        baseline, _ = tracemalloc.get_traced_memory()
+        run()
+        _, peak = tracemalloc.get_traced_memory()
+        retained_blocks = sys.getallocatedblocks() - blocks
+    finally:
+        tracemalloc.stop()
+
+    return {
+        'operations': operations,
+        'ops_per_second': operations / best,
+        'peak_bytes': peak - baseline,
+        'blocks_per_op': retained_blocks / operations,
+    }
+
+
+def run_benchmarks(names: 'list[str]' = None, *, repeat: int = 5, min_time: float = 0.2, output=None) -> dict:
+    """Runs benchmarks, every one by default, and returns the results for saving as JSON."""
+
+    results = {}
+    for name in names or BENCHMARKS:
+        results[name] = measure(name, repeat=repeat, min_time=min_time)
+        if output is not None:
+            output(format_result(name, results[name]))
+
+    return {
+        'date': datetime.datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'implementation': platform.python_implementation(),
+        'benchmarks': results,
+    }
+
+
+def format_result(name: str, result: dict) -> str:
+    return (
+        f'{name:<12} {result["ops_per_second"]:>12,.0f} ops/s'
+        f' {result["peak_bytes"]:>10,} peak bytes {result["blocks_per_op"]:>8.2f} blocks/op'
+    )
+
+
+def compare(results: dict, baseline: dict, threshold: float = 0.1) -> 'dict[str, tuple[float, str]]':
+    """Compares each benchmark's speed with a baseline's.
+
+    Returns each benchmark's speed as a ratio of the baseline's and whether that's
+    a ``'regression'``, an ``'improvement'`` or ``'ok'``. Benchmarks the baseline
+    doesn't have are left out.
+    """
+
+    comparison = {}
+    for name, result in results['benchmarks'].items():
+        base: Optional[dict] = baseline['benchmarks'].get(name)
+        if base is None:
+            continue
+
+        ratio = result['ops_per_second'] / base['ops_per_second']
+        if ratio < 1 - threshold:
+            status = 'regression'
+        elif ratio > 1 + threshold:
+            status = 'improvement'
+        else:
+            status = 'ok'
+        comparison[name] = (ratio, status)
+
+    return comparison
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks the library's hot paths.")
+    parser.add_argument('--filter', action='append', choices=list(BENCHMARKS), help='only run these benchmarks')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--min-time', type=float, default=0.2, help='seconds each repeat runs for at least')
+    parser.add_argument('--json', help='where to write the results')
+    parser.add_argument('--baseline', help='results to compare with')
+    parser.add_argument('--threshold', type=float, default=0.1, help='the slowdown that counts as a regression')
+    args = parser.parse_args()
+
+    results = run_benchmarks(args.filter, repeat=args.repeat, min_time=args.min_time, output=print)
+
+    if args.json:
+        with open(args.json, 'w') as file:
+            json.dump(results, file, indent=4)
+
+    if args.baseline:
+        with open(args.baseline) as file:
+            baseline = json.load(file)
+
+        comparison = compare(results, baseline, args.threshold)
+        print()
+        for name, (ratio, status) in comparison.items():
+            print(f'{name:<12} {ratio:>6.2f}x  {status}')
+
+        if any(status == 'regression' for _, status in comparison.values()):
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
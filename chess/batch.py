@@ -0,0 +1,490 @@
+"""Move generation for many boards at once.
+
+A BoardBatch holds N positions as NumPy arrays: twelve piece bitboards per
+board in chess.fen.PLANE_PIECES order, the side to move, the CastleState id
+and the en passant square. Attack sets, move masks and moves are worked out
+for every board together with shifts and masks over whole arrays, so the
+Python interpreter runs a fixed number of array operations per batch rather
+than a loop per board, piece or move.
+
+Sliding attacks use Kogge-Stone fills. Moves are checked for legality by
+making them on the bitboards and looking for attacks on the king, all moves
+of all boards at once.
+
+Moves come back as a MoveList: the Move.id of every move in one flat array,
+grouped by board, with ``offsets`` marking where each board's moves start,
+so board ``i``'s moves are ``moves[offsets[i]:offsets[i + 1]]``.
+BoardBatch.play makes every move of a MoveList, giving the batch of
+positions after them, which is enough for a perft that counts its leaves
+without a loop per node:
+
+    batch = BoardBatch.from_boards(boards)
+    moves = batch.legal_moves()
+    counts = moves.counts()
+    children = batch.play(moves)
+
+The arrays exported by chess.training can be used as they are:
+``BoardBatch(shard['planes'], shard['side'], shard['castling'], shard['en_passant'])``.
+
+Halfmove clocks and repetitions aren't tracked. This needs NumPy.
+"""
+
+from typing import NamedTuple
+
+import numpy as np
+
+import chess
+from chess import bitboard, fen
+from chess.castle_state import CastleState
+from chess.piece import PieceColor, PieceType
+
+
+U64 = np.uint64
+FULL = U64(bitboard.FULL)
+EMPTY = U64(0)
+NOT_FILE_A = U64(bitboard.NOT_FILE_A)
+NOT_FILE_H = U64(bitboard.NOT_FILE_H)
+NOT_FILE_AB = U64(bitboard.NOT_FILE_A & (bitboard.NOT_FILE_A << 1))
+NOT_FILE_GH = U64(bitboard.NOT_FILE_H & (bitboard.NOT_FILE_H >> 1))
+RANK_3 = U64(0xFF << 16)
+RANK_6 = U64(0xFF << 40)
+BACK_RANKS = U64(0xFF | 0xFF << 56)
+
+# the bitboard of each square
+SQUARES = np.left_shift(U64(1), np.arange(64, dtype=U64))
+
+KNIGHT_ATTACKS = np.array(bitboard.KNIGHT_ATTACKS, dtype=U64)
+KING_ATTACKS = np.array(bitboard.KING_ATTACKS, dtype=U64)
+
+# the planes of a color's pieces start at 0 for White and 6 for Black,
+# in this order
+PAWN, KNIGHT, BISHOP, ROOK, QUEEN, KING = range(6)
+
+# (shift, mask) of each direction, the mask leaving out squares a shift
+# would wrap around to
+ROOK_SHIFTS = ((8, FULL), (-8, FULL), (1, NOT_FILE_A), (-1, NOT_FILE_H))
+BISHOP_SHIFTS = ((9, NOT_FILE_A), (7, NOT_FILE_H), (-7, NOT_FILE_A), (-9, NOT_FILE_H))
+
+PROMOTIONS = np.array([PieceType.QUEEN, PieceType.ROOK, PieceType.BISHOP, PieceType.KNIGHT], dtype=np.uint16)
+# PieceType -> plane
+PROMOTION_PLANES = np.zeros(8, dtype=np.int64)
+PROMOTION_PLANES[[PieceType.KNIGHT, PieceType.BISHOP, PieceType.ROOK, PieceType.QUEEN]] = [KNIGHT, BISHOP, ROOK, QUEEN]
+
+CASTLE_FLAG = 1 << 15
+# (CastleState bit, CastleType, king from and to, rook from and to,
+#  squares that must be empty, squares that must not be attacked), for White
+CASTLES = (
+    (0b1000, 0, 4, 6, 7, 5, 0b01100000, 0b01110000),
+    (0b0100, 1, 4, 2, 0, 3, 0b00001110, 0b00011100),
+)
+# the castle rights kept when a piece moves from or to each square
+CASTLE_RIGHTS_KEPT = np.full(64, 0b1111, dtype=np.uint8)
+CASTLE_RIGHTS_KEPT[[0, 4, 7]] = [0b1011, 0b0011, 0b0111]
+CASTLE_RIGHTS_KEPT[[56, 60, 63]] = [0b1110, 0b1100, 0b1101]
+
+NO_EN_PASSANT = 255
+
+PIECE_LETTERS = 'PNBRQKpnbrqk'
+
+
+def _shift(bitboards: np.ndarray, amount: int) -> np.ndarray:
+    if amount > 0:
+        return bitboards << U64(amount)
+    return bitboards >> U64(-amount)
+
+
+def _slide(pieces: np.ndarray, empty: np.ndarray, amount: int, mask: np.uint64) -> np.ndarray:
+    # Kogge-Stone: fills from the pieces through empty squares, then takes one step more
+    # onto the first blocker
+    propagate = empty & mask
+    pieces = pieces | (propagate & _shift(pieces, amount))
+    propagate = propagate & _shift(propagate, amount)
+    pieces = pieces | (propagate & _shift(pieces, 2 * amount))
+    propagate = propagate & _shift(propagate, 2 * amount)
+    pieces = pieces | (propagate & _shift(pieces, 4 * amount))
+    return _shift(pieces, amount) & mask
+
+
+def rook_attacks(rooks: np.ndarray, occupied: np.ndarray) -> np.ndarray:
+    """Returns the squares attacked by each bitboard of rooks, given the occupied squares."""
+
+    empty = ~occupied
+    attacks = np.zeros_like(rooks)
+    for amount, mask in ROOK_SHIFTS:
+        attacks |= _slide(rooks, empty, amount, mask)
+    return attacks
+
+
+def bishop_attacks(bishops: np.ndarray, occupied: np.ndarray) -> np.ndarray:
+    """Returns the squares attacked by each bitboard of bishops, given the occupied squares."""
+
+    empty = ~occupied
+    attacks = np.zeros_like(bishops)
+    for amount, mask in BISHOP_SHIFTS:
+        attacks |= _slide(bishops, empty, amount, mask)
+    return attacks
+
+
+def knight_attacks(knights: np.ndarray) -> np.ndarray:
+    one = ((knights >> U64(1)) & NOT_FILE_H) | ((knights << U64(1)) & NOT_FILE_A)
+    two = ((knights >> U64(2)) & NOT_FILE_GH) | ((knights << U64(2)) & NOT_FILE_AB)
+    return (one << U64(16)) | (one >> U64(16)) | (two << U64(8)) | (two >> U64(8))
+
+
+def king_attacks(kings: np.ndarray) -> np.ndarray:
+    attacks = ((kings << U64(1)) & NOT_FILE_A) | ((kings >> U64(1)) & NOT_FILE_H)
+    row = kings | attacks
+    return attacks | (row << U64(8)) | (row >> U64(8))
+
+
+def pawn_attacks(pawns: np.ndarray, white: np.ndarray) -> np.ndarray:
+    """Returns the squares attacked by each bitboard of pawns, White's where ``white`` is true."""
+
+    return np.where(
+        white,
+        ((pawns & NOT_FILE_H) << U64(9)) | ((pawns & NOT_FILE_A) << U64(7)),
+        ((pawns & NOT_FILE_H) >> U64(7)) | ((pawns & NOT_FILE_A) >> U64(9)),
+    )
+
+
+def _square_bitboards(bitboards: np.ndarray) -> 'tuple[np.ndarray, ...]':
+    # the indexes of the set squares of a 2D array of bitboards, as (row, column, square)
+    rows, columns = bitboards.shape
+    bits = np.unpackbits(
+        np.ascontiguousarray(bitboards, dtype='<u8').view(np.uint8).reshape(rows, columns, 8),
+        axis=-1,
+        bitorder='little'
+    )
+    return np.nonzero(bits)
+
+
+class MoveList(NamedTuple):
+    """Moves of a BoardBatch.
+
+    moves -- the Move.id of every move, grouped by board
+    offsets -- N + 1 indexes into ``moves``, where each board's moves start and the last ends
+    """
+
+    moves: np.ndarray
+    offsets: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.moves)
+
+    def counts(self) -> np.ndarray:
+        """Returns the number of moves of each board."""
+
+        return np.diff(self.offsets)
+
+    def boards(self) -> np.ndarray:
+        """Returns the index of the board of every move."""
+
+        return np.repeat(np.arange(len(self.offsets) - 1), self.counts())
+
+
+class BoardBatch:
+    """N positions stored as arrays.
+
+    pieces -- (N, 12) bitboards in chess.fen.PLANE_PIECES order
+    side -- true where White is to move
+    castling -- CastleState ids
+    en_passant -- en passant square indexes, 255 where there isn't one
+    """
+
+    def __init__(self, pieces, side, castling, en_passant):
+        self.pieces = np.ascontiguousarray(pieces, dtype=U64).reshape(-1, len(fen.PLANE_PIECES))
+        self.side = np.asarray(side, dtype=bool)
+        self.castling = np.asarray(castling, dtype=np.uint8)
+        self.en_passant = np.asarray(en_passant, dtype=np.uint8)
+
+    def __repr__(self) -> str:
+        return f'<BoardBatch boards={len(self)}>'
+
+    def __len__(self) -> int:
+        return len(self.pieces)
+
+    @classmethod
+    def from_boards(cls, boards: 'list[chess.Board]'):
+        pieces = np.array([fen.planes(board) for board in boards], dtype=U64).reshape(-1, len(fen.PLANE_PIECES))
+        side = [board.active_color == PieceColor.WHITE for board in boards]
+        castling = [board.castle_state.id for board in boards]
+        en_passant = [
+            board.en_passant_square.row * 8 + board.en_passant_square.column
+            if board.en_passant_square else NO_EN_PASSANT
+            for board in boards
+        ]
+        return cls(pieces, side, castling, en_passant)
+
+    @classmethod
+    def from_fens(cls, fens: 'list[str]'):
+        return cls.from_boards([chess.Board.from_fen(position) for position in fens])
+
+    def fen(self, index: int) -> str:
+        """Returns the FEN of one board, with the move counters at ``0 1``."""
+
+        squares = [''] * 64
+        for plane, letter in enumerate(PIECE_LETTERS):
+            for square in bitboard.iter_squares(int(self.pieces[index, plane])):
+                squares[square] = letter
+
+        ranks = []
+        for row in range(7, -1, -1):
+            rank = ''
+            empty = 0
+            for square in squares[row * 8:row * 8 + 8]:
+                if square:
+                    rank += (str(empty) if empty else '') + square
+                    empty = 0
+                else:
+                    empty += 1
+            ranks.append(rank + (str(empty) if empty else ''))
+
+        en_passant = int(self.en_passant[index])
+        return ' '.join((
+            '/'.join(ranks),
+            'w' if self.side[index] else 'b',
+            CastleState(int(self.castling[index])).fen,
+            '-' if en_passant == NO_EN_PASSANT else 'abcdefgh'[en_passant & 7] + str((en_passant >> 3) + 1),
+            '0 1',
+        ))
+
+    def board(self, index: int) -> chess.Board:
+        return chess.Board.from_fen(self.fen(index), validate=False)
+
+    def _color_pieces(self, white: np.ndarray) -> np.ndarray:
+        # (N, 6) bitboards of one color's pieces, White's where white is true
+        return np.where(np.asarray(white)[..., None], self.pieces[:, :6], self.pieces[:, 6:])
+
+    def occupied(self) -> np.ndarray:
+        return np.bitwise_or.reduce(self.pieces, axis=1)
+
+    def attacks(self, white) -> np.ndarray:
+        """Returns every square attacked by one side on each board, White's where ``white`` is true."""
+
+        white = np.broadcast_to(np.asarray(white, dtype=bool), self.side.shape)
+        pieces = self._color_pieces(white)
+        occupied = self.occupied()
+        queens = pieces[:, QUEEN]
+        return (
+            pawn_attacks(pieces[:, PAWN], white)
+            | knight_attacks(pieces[:, KNIGHT])
+            | bishop_attacks(pieces[:, BISHOP] | queens, occupied)
+            | rook_attacks(pieces[:, ROOK] | queens, occupied)
+            | king_attacks(pieces[:, KING])
+        )
+
+    def in_check(self) -> np.ndarray:
+        """Returns whether the side to move is in check on each board."""
+
+        return (self._color_pieces(self.side)[:, KING] & self.attacks(~self.side)) != 0
+
+    def _piece_moves(self) -> 'tuple[np.ndarray, ...]':
+        # every piece of the side to move, as (board, plane, square, targets)
+        own = self._color_pieces(self.side)
+        own_occupied = np.bitwise_or.reduce(own, axis=1)
+        their_occupied = np.bitwise_or.reduce(self._color_pieces(~self.side), axis=1)
+        occupied = own_occupied | their_occupied
+
+        boards, planes, squares = _square_bitboards(own)
+        pieces = SQUARES[squares]
+        white = self.side[boards]
+        piece_occupied = occupied[boards]
+
+        rooks = np.where((planes == ROOK) | (planes == QUEEN), pieces, EMPTY)
+        bishops = np.where((planes == BISHOP) | (planes == QUEEN), pieces, EMPTY)
+        targets = rook_attacks(rooks, piece_occupied) | bishop_attacks(bishops, piece_occupied)
+        targets |= np.where(planes == KNIGHT, KNIGHT_ATTACKS[squares], EMPTY)
+        targets |= np.where(planes == KING, KING_ATTACKS[squares], EMPTY)
+        targets &= ~own_occupied[boards]
+
+        en_passant = self.en_passant[boards]
+        en_passant_squares = np.where(
+            en_passant != NO_EN_PASSANT, SQUARES[en_passant.astype(np.int64) & 63], EMPTY
+        )
+        empty = ~piece_occupied
+        single = np.where(white, pieces << U64(8), pieces >> U64(8)) & empty
+        double = np.where(white, (single & RANK_3) << U64(8), (single & RANK_6) >> U64(8)) & empty
+        captures = pawn_attacks(pieces, white) & (their_occupied[boards] | en_passant_squares)
+        targets = np.where(planes == PAWN, single | double | captures, targets)
+
+        return boards, planes, squares, targets
+
+    def move_masks(self) -> np.ndarray:
+        """Returns (N, 64) bitboards of where the piece of the side to move on each square can move to.
+
+        These are pseudo-legal: moves that leave the king in check are
+        included, and castling isn't.
+        """
+
+        boards, _, squares, targets = self._piece_moves()
+        masks = np.zeros((len(self), 64), dtype=U64)
+        masks[boards, squares] = targets
+        return masks
+
+    def _moves(self) -> 'tuple[np.ndarray, ...]':
+        # pseudo-legal moves other than castling, as (board, plane, from, to, promotion)
+        boards, planes, squares, targets = self._piece_moves()
+        pieces, _, to_squares = _square_bitboards(targets[:, None])
+        boards, planes, from_squares = boards[pieces], planes[pieces], squares[pieces]
+
+        # pawn moves to a back rank are repeated for each promotion
+        promoting = (planes == PAWN) & ((SQUARES[to_squares] & BACK_RANKS) != 0)
+        repeats = np.where(promoting, len(PROMOTIONS), 1)
+        boards, planes, from_squares, to_squares, promoting = (
+            np.repeat(array, repeats) for array in (boards, planes, from_squares, to_squares, promoting)
+        )
+        starts = np.repeat(np.cumsum(repeats) - repeats, repeats)
+        promotions = np.where(promoting, PROMOTIONS[(np.arange(len(boards)) - starts) % len(PROMOTIONS)], 0)
+
+        return boards, planes, from_squares, to_squares, promotions
+
+    def _legal(self, boards, planes, from_squares, to_squares) -> np.ndarray:
+        # makes each move on the bitboards and checks the king isn't attacked after it
+        from_bitboards = SQUARES[from_squares]
+        to_bitboards = SQUARES[to_squares]
+        white = self.side[boards]
+
+        en_passant = (planes == PAWN) & (to_squares == self.en_passant[boards])
+        captured = to_bitboards | np.where(
+            en_passant, np.where(white, to_bitboards >> U64(8), to_bitboards << U64(8)), EMPTY
+        )
+        occupied = (self.occupied()[boards] & ~from_bitboards & ~captured) | to_bitboards
+
+        theirs = self._color_pieces(~self.side)[boards] & ~captured[:, None]
+        king = np.where(planes == KING, to_bitboards, self._color_pieces(self.side)[boards, KING])
+        queens = theirs[:, QUEEN]
+
+        attacked = (
+            (pawn_attacks(king, white) & theirs[:, PAWN])
+            | (knight_attacks(king) & theirs[:, KNIGHT])
+            | (king_attacks(king) & theirs[:, KING])
+            | (bishop_attacks(king, occupied) & (theirs[:, BISHOP] | queens))
+            | (rook_attacks(king, occupied) & (theirs[:, ROOK] | queens))
+        )
+        return attacked == 0
+
+    def _castles(self) -> 'tuple[np.ndarray, np.ndarray]':
+        # legal castle moves, as (board, Move.id)
+        own = self._color_pieces(self.side)
+        occupied = self.occupied()
+        attacked = self.attacks(~self.side)
+        # Black's squares are White's moved up seven rows, and its rights two bits down
+        row_shift = np.where(self.side, U64(0), U64(56))
+        rights_shift = np.where(self.side, 0, 2).astype(np.uint8)
+
+        boards = []
+        moves = []
+        for right, castle_type, king_from, _, rook_from, _, empty, safe in CASTLES:
+            legal = (
+                ((self.castling & (right >> rights_shift)) != 0)
+                & ((own[:, KING] & (U64(1 << king_from) << row_shift)) != 0)
+                & ((own[:, ROOK] & (U64(1 << rook_from) << row_shift)) != 0)
+                & ((occupied & (U64(empty) << row_shift)) == 0)
+                & ((attacked & (U64(safe) << row_shift)) == 0)
+            )
+            castling_boards = np.nonzero(legal)[0]
+            boards.append(castling_boards)
+            moves.append(np.full(len(castling_boards), CASTLE_FLAG | castle_type, dtype=np.uint16))
+
+        return np.concatenate(boards), np.concatenate(moves)
+
+    def _move_list(self, boards, moves) -> MoveList:
+        order = np.argsort(boards, kind='stable')
+        offsets = np.zeros(len(self) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(boards, minlength=len(self)), out=offsets[1:])
+        return MoveList(moves[order], offsets)
+
+    def pseudo_legal_moves(self) -> MoveList:
+        """Returns the moves of the side to move on every board, including ones that leave its king in check.
+
+        Castling is only included when it's legal.
+        """
+
+        boards, _, from_squares, to_squares, promotions = self._moves()
+        castle_boards, castles = self._castles()
+        ids = (from_squares | to_squares << 6 | promotions << 12).astype(np.uint16)
+        return self._move_list(np.concatenate([boards, castle_boards]), np.concatenate([ids, castles]))
+
+    def legal_moves(self) -> MoveList:
+        """Returns the legal moves of the side to move on every board."""
+
+        boards, planes, from_squares, to_squares, promotions = self._moves()
+        legal = self._legal(boards, planes, from_squares, to_squares)
+        boards, from_squares, to_squares, promotions = (
+            array[legal] for array in (boards, from_squares, to_squares, promotions)
+        )
+        castle_boards, castles = self._castles()
+        ids = (from_squares | to_squares << 6 | promotions << 12).astype(np.uint16)
+        return self._move_list(np.concatenate([boards, castle_boards]), np.concatenate([ids, castles]))
+
+    def legal_counts(self) -> np.ndarray:
+        """Returns the number of legal moves on every board, without sorting them into a MoveList."""
+
+        boards, planes, from_squares, to_squares, _ = self._moves()
+        legal = self._legal(boards, planes, from_squares, to_squares)
+        castle_boards, _ = self._castles()
+        return (
+            np.bincount(boards[legal], minlength=len(self))
+            + np.bincount(castle_boards, minlength=len(self))
+        )
+
+    def play(self, moves: MoveList) -> 'BoardBatch':
+        """Returns the batch of positions after each move, in the order of ``moves.moves``."""
+
+        boards = moves.boards()
+        ids = moves.moves.astype(np.int64)
+        white = self.side[boards]
+        castle = (ids & CASTLE_FLAG) != 0
+        castle_type = ids & 1
+        row = np.where(white, 0, 56)
+
+        from_squares = np.where(castle, row + 4, ids & 63)
+        to_squares = np.where(castle, row + np.where(castle_type == 0, 6, 2), ids >> 6 & 63)
+        promotions = np.where(castle, 0, ids >> 12 & 7)
+        from_bitboards = SQUARES[from_squares]
+        to_bitboards = SQUARES[to_squares]
+
+        pieces = self.pieces[boards]
+        own = np.where(white, 0, 6)
+        rows = np.arange(len(ids))
+        planes = np.argmax((pieces[:, :6] | pieces[:, 6:]) & from_bitboards[:, None] != 0, axis=1)
+
+        # captures, including en passant
+        en_passant = (planes == PAWN) & (to_squares == self.en_passant[boards])
+        captured = np.where(castle, EMPTY, to_bitboards) | np.where(
+            en_passant, np.where(white, to_bitboards >> U64(8), to_bitboards << U64(8)), EMPTY
+        )
+        pieces &= ~captured[:, None]
+
+        pieces[rows, own + planes] &= ~from_bitboards
+        pieces[rows, own + np.where(promotions != 0, PROMOTION_PLANES[promotions], planes)] |= to_bitboards
+
+        rook_from = row + np.where(castle_type == 0, 7, 0)
+        rook_to = row + np.where(castle_type == 0, 5, 3)
+        pieces[rows, own + ROOK] ^= np.where(castle, SQUARES[rook_from] | SQUARES[rook_to], EMPTY)
+
+        castling = self.castling[boards] & CASTLE_RIGHTS_KEPT[from_squares] & CASTLE_RIGHTS_KEPT[to_squares]
+        double_push = (planes == PAWN) & (np.abs(to_squares - from_squares) == 16)
+        en_passant_squares = np.where(double_push, (from_squares + to_squares) // 2, NO_EN_PASSANT)
+
+        return BoardBatch(pieces, ~white, castling, en_passant_squares)
+
+
+def perft(batch: BoardBatch, depth: int) -> np.ndarray:
+    """Returns the number of move paths of a depth from each board.
+
+    Every level before the last is played out as a batch, so memory grows
+    with the number of positions at depth - 1; the last level is only counted.
+    """
+
+    if depth == 0:
+        return np.ones(len(batch), dtype=np.int64)
+
+    boards = len(batch)
+    roots = np.arange(boards)
+    for _ in range(depth - 1):
+        moves = batch.legal_moves()
+        roots = roots[moves.boards()]
+        batch = batch.play(moves)
+
+    return np.bincount(roots, weights=batch.legal_counts(), minlength=boards).astype(np.int64)
@@ -0,0 +1,135 @@
+"""Bitboard helpers.
+
+A bitboard is an int where each bit is a square on the board.
+Squares are indexed as ``row * 8 + column``, so a1 is bit 0 and h8 is bit 63.
+"""
+
+from .piece import PieceColor, PieceType
+
+
+FULL = (1 << 64) - 1
+
+FILE_A = 0x0101010101010101
+FILE_H = FILE_A << 7
+NOT_FILE_A = FULL ^ FILE_A
+NOT_FILE_H = FULL ^ FILE_H
+
+# (row, column) offsets
+NORTH, SOUTH, EAST, WEST = (1, 0), (-1, 0), (0, 1), (0, -1)
+NORTH_EAST, NORTH_WEST, SOUTH_EAST, SOUTH_WEST = (1, 1), (1, -1), (-1, 1), (-1, -1)
+
+ROOK_DIRECTIONS = (NORTH, SOUTH, EAST, WEST)
+BISHOP_DIRECTIONS = (NORTH_EAST, NORTH_WEST, SOUTH_EAST, SOUTH_WEST)
+
+# directions that walk towards higher square indexes
+POSITIVE_DIRECTIONS = (NORTH, EAST, NORTH_EAST, NORTH_WEST)
+
+
+try:
+    popcount = int.bit_count
+except AttributeError:  # Python < 3.10
+    def popcount(bitboard: int) -> int:
+        """Returns the number of set bits in a bitboard."""
+
+        return bin(bitboard).count('1')
+
+
+def square_index(row: int, column: int) -> int:
+    return row * 8 + column
+
+
+def iter_squares(bitboard: int):
+    """Returns a generator of the square indexes set in a bitboard."""
+
+    while bitboard:
+        lowest = bitboard & -bitboard
+        yield lowest.bit_length() - 1
+        bitboard ^= lowest
+
+
+def _step_table(offsets):
+    table = []
+    for index in range(64):
+        row, column = divmod(index, 8)
+        bitboard = 0
+        for row_offset, column_offset in offsets:
+            r, c = row + row_offset, column + column_offset
+            if 0 <= r <= 7 and 0 <= c <= 7:
+                bitboard |= 1 << square_index(r, c)
+        table.append(bitboard)
+    return tuple(table)
+
+
+def _ray_table(direction):
+    table = []
+    for index in range(64):
+        row, column = divmod(index, 8)
+        bitboard = 0
+        r, c = row + direction[0], column + direction[1]
+        while 0 <= r <= 7 and 0 <= c <= 7:
+            bitboard |= 1 << square_index(r, c)
+            r, c = r + direction[0], c + direction[1]
+        table.append(bitboard)
+    return tuple(table)
+
+
+KNIGHT_ATTACKS = _step_table(((2, 1), (2, -1), (-2, 1), (-2, -1), (1, 2), (1, -2), (-1, 2), (-1, -2)))
+KING_ATTACKS = _step_table(ROOK_DIRECTIONS + BISHOP_DIRECTIONS)
+PAWN_ATTACKS = {
+    PieceColor.WHITE: _step_table((NORTH_EAST, NORTH_WEST)),
+    PieceColor.BLACK: _step_table((SOUTH_EAST, SOUTH_WEST)),
+}
+RAYS = {direction: _ray_table(direction) for direction in ROOK_DIRECTIONS + BISHOP_DIRECTIONS}
+
+
+def ray_attacks(index: int, occupied: int, direction) -> int:
+    """Returns the squares a slider attacks from a square in one direction."""
+
+    ray = RAYS[direction]
+    attacks = ray[index]
+    blockers = attacks & occupied
+    if blockers:
+        if direction in POSITIVE_DIRECTIONS:
+            blocker = (blockers & -blockers).bit_length() - 1
+        else:
+            blocker = blockers.bit_length() - 1
+        attacks ^= ray[blocker]
+    return attacks
+
+
+def rook_attacks(index: int, occupied: int) -> int:
+    attacks = 0
+    for direction in ROOK_DIRECTIONS:
+        attacks |= ray_attacks(index, occupied, direction)
+    return attacks
+
+
+def bishop_attacks(index: int, occupied: int) -> int:
+    attacks = 0
+    for direction in BISHOP_DIRECTIONS:
+        attacks |= ray_attacks(index, occupied, direction)
+    return attacks
+
+
+def pawn_attacks(pawns: int, color: int) -> int:
+    """Returns every square attacked by a set of pawns of a color."""
+
+    if color == PieceColor.WHITE:
+        return (((pawns & NOT_FILE_H) << 9) | ((pawns & NOT_FILE_A) << 7)) & FULL
+    return ((pawns & NOT_FILE_H) >> 7) | ((pawns & NOT_FILE_A) >> 9)
+
+
+def piece_attacks(piece_type: int, color: int, index: int, occupied: int) -> int:
+    """Returns the squares a piece on a square attacks, ignoring legality."""
+
+    if piece_type == PieceType.KNIGHT:
+        return KNIGHT_ATTACKS[index]
+    if piece_type == PieceType.BISHOP:
+        return bishop_attacks(index, occupied)
+    if piece_type == PieceType.ROOK:
+        return rook_attacks(index, occupied)
+    if piece_type == PieceType.QUEEN:
+        return rook_attacks(index, occupied) | bishop_attacks(index, occupied)
+    if piece_type == PieceType.KING:
+        return KING_ATTACKS[index]
+    return PAWN_ATTACKS[color][index]
@@ -1,11 +1,50 @@
-from typing import Optional
+import random
+import struct
+from typing import Any, Optional
 
-from . import errors
+from . import bitboard, errors, stats, zobrist
 from .castle_state import CastleState
 from .move import Move, CastleMove, CastleType
 from .piece import Pawn, PieceColor, Piece, PIECES, PieceType
 from .square import Square
-from chess import castle_state
+
+
+ROOK_DIRECTIONS = ((1, 0), (-1, 0), (0, 1), (0, -1))
+BISHOP_DIRECTIONS = ((1, 1), (1, -1), (-1, 1), (-1, -1))
+KING_OFFSETS = ROOK_DIRECTIONS + BISHOP_DIRECTIONS
+KNIGHT_OFFSETS = ((2, 1), (2, -1), (-2, 1), (-2, -1), (1, 2), (1, -2), (-1, 2), (-1, -2))
+
+# the castle rights left when a rook moves from or is captured on a corner
+CASTLE_RIGHTS_KEPT = {
+    (0, 7): 0b0111,
+    (0, 0): 0b1011,
+    (7, 7): 0b1101,
+    (7, 0): 0b1110,
+}
+
+# piece values for static exchange evaluation, indexed by PieceType
+SEE_VALUES = (0, 100, 500, 300, 300, 900, 20000)
+
+# Board.to_packed's layout: occupancy, piece ids, castle state and side to move,
+# en passant square, halfmoves, fullmoves and two bytes of padding
+PACKED_FORMAT = struct.Struct('<Q16sBBHH2x')
+PACKED_SIZE = PACKED_FORMAT.size
+PACKED_WHITE_TO_MOVE = 0b10000
+PACKED_NO_EN_PASSANT = 0xFF
+
+# pieces are never changed, so parsed and unpacked boards share them
+PIECES_BY_ID = {
+    color | Piece.TYPE: Piece(color=color)
+    for Piece in PIECES
+    for color in (PieceColor.WHITE, PieceColor.BLACK)
+}
+FEN_PIECES = {
+    piece.FEN.upper() if piece.color == PieceColor.WHITE else piece.FEN: piece
+    for piece in PIECES_BY_ID.values()
+}
+
+# the order pieces join an exchange in, least valuable first
+SEE_ORDER = (PieceType.PAWN, PieceType.KNIGHT, PieceType.BISHOP, PieceType.ROOK, PieceType.QUEEN, PieceType.KING)
 
 
 class Board:
@@ -21,7 +60,11 @@ class Board:
         'en_passant_square',
         'fullmoves',
         'halfmoves',
-        'move_history'
+        'move_history',
+        'zobrist',
+        'pawn_zobrist',
+        'accumulator',
+        '_states'
     )
 
     DEFAULT_FEN = 'rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1'
@@ -33,6 +76,10 @@ class Board:
     fullmoves: int
     halfmoves: int
     move_history: 'list[Move]'
+    zobrist: int
+    pawn_zobrist: int
+    accumulator: Optional[Any]
+    _states: 'list[tuple[Optional[Square], int, int, int]]'
 
     def __init__(self):
         # 8x8 board filled with nothing
@@ -47,6 +94,17 @@ class Board:
         self.fullmoves = 1
         self.halfmoves = 0
         self.move_history = []
+        self.zobrist = 0
+        # the Zobrist key of the pawns alone, for caching pawn structure evaluations
+        self.pawn_zobrist = 0
+
+        # an evaluator's incrementally updated state, which is told about every
+        # made and unmade move, see chess.engines.nnue.Accumulator
+        self.accumulator = None
+
+        # en passant squares, zobrist keys and halfmove clocks from before each made move,
+        # so unmaking a move doesn't have to guess or recompute them
+        self._states = []
 
     def __repr__(self) -> str:
         return f'<Board fen={self.fen}>'
@@ -58,15 +116,23 @@ class Board:
         return cls.from_fen(cls.DEFAULT_FEN)
 
     @classmethod
-    def from_fen(cls, fen: str):
-        """Parses a FEN string into a board."""
+    def from_fen(cls, fen: str, *, validate: bool = True):
+        """Parses a FEN string into a board.
+
+        Raises InvalidFEN with the reason if the string can't be parsed or,
+        with ``validate``, if the position can't come up in a game: it must
+        have one king of each color, no pawns on the first or last rank,
+        castle rights that match the kings and rooks, an en passant square
+        behind a pawn that just moved two squares, and the side that just
+        moved can't be in check.
+        """
 
         self = cls()
 
         split_fen = fen.split()
 
         if len(split_fen) != 6:
-            raise errors.InvalidFEN()
+            raise errors.InvalidFEN(f'expected 6 fields, got {len(split_fen)}')
 
         (
             piece_placement,
@@ -78,27 +144,28 @@ class Board:
         ) = split_fen
 
         # parse piece placement
-        row = 8
-        column = 1
-
-        for char in piece_placement:
-            if char == '/':
-                row -= 1
-                column = 1
-                continue
-
-            try:
-                inc = int(char)
-            except ValueError:
-                pass
-            else:
-                column += inc
-                continue
+        ranks = piece_placement.split('/')
+        if len(ranks) != 8:
+            raise errors.InvalidFEN(f'expected 8 ranks, got {len(ranks)}')
+
+        for row, rank in zip(range(7, -1, -1), ranks):
+            board_row = self.rows[row]
+            column = 0
+
+            for char in rank:
+                piece = FEN_PIECES.get(char)
+                if piece is not None:
+                    if column > 7:
+                        raise errors.InvalidFEN(f'rank {row + 1} has more than 8 squares')
+                    board_row[column] = piece
+                    column += 1
+                elif char in '12345678':
+                    column += ord(char) - 48
+                else:
+                    raise errors.InvalidFEN(f'unknown piece {char!r}')
 
-            color = PieceColor.WHITE if char.isupper() else PieceColor.BLACK
-            piece = Piece.from_fen(char.lower(), color)
-            self.rows[row - 1][column - 1] = piece
-            column += 1
+            if column != 8:
+                raise errors.InvalidFEN(f'rank {row + 1} has {column} squares')
 
         # set active color
         if active_color == 'w':
@@ -106,40 +173,182 @@ class Board:
         elif active_color == 'b':
             self.active_color = PieceColor.BLACK
         else:
-            raise errors.InvalidFEN()
+            raise errors.InvalidFEN(f'unknown side to move {active_color!r}')
 
         # castle state
+        if castle_state != '-' and (
+            len(set(castle_state)) != len(castle_state) or not set(castle_state) <= set('KQkq')
+        ):
+            raise errors.InvalidFEN(f'invalid castle rights {castle_state!r}')
         self.castle_state = CastleState.from_fen(castle_state)
 
         # en passant state
         if en_passant_square != '-':
-            self.en_passant_square = Square.from_san(en_passant_square)
-
-            # bugfix for lost en passant move
-            up_or_down = 1 if self.active_color is PieceColor.WHITE else -1
-            from_square_row = self.en_passant_square.row + up_or_down
-            from_square = Square(from_square_row, self.en_passant_square.column)
-            to_square_row = self.en_passant_square.row - up_or_down
-            to_square = Square(to_square_row, self.en_passant_square.column)
-            self.move_history.append(Move(from_square, to_square, self.castle_state.copy(), en_passant=from_square))
+            if (
+                len(en_passant_square) != 2
+                or en_passant_square[0] not in Square.FILES
+                or en_passant_square[1] not in '36'
+            ):
+                raise errors.InvalidFEN(f'invalid en passant square {en_passant_square!r}')
+            self._set_en_passant_square(Square.from_san(en_passant_square))
 
         # set halfmoves and fullmoves
-        try:
-            halfmoves = int(halfmoves)
-        except ValueError:
-            raise errors.InvalidFEN()
-        else:
-            self.halfmoves = halfmoves
+        if not halfmoves.isdigit():
+            raise errors.InvalidFEN(f'invalid halfmove clock {halfmoves!r}')
+        self.halfmoves = int(halfmoves)
 
-        try:
-            fullmoves = int(fullmoves)
-        except ValueError:
-            raise errors.InvalidFEN()
-        else:
-            self.fullmoves = fullmoves
+        if not fullmoves.isdigit() or fullmoves == '0':
+            raise errors.InvalidFEN(f'invalid fullmove number {fullmoves!r}')
+        self.fullmoves = int(fullmoves)
 
+        if validate:
+            self._validate_position()
+
+        self.zobrist = self.compute_zobrist()
+        self.pawn_zobrist = self.compute_pawn_zobrist()
         return self
 
+    def _validate_position(self):
+        """Raises InvalidFEN if the board's position can't come up in a game."""
+
+        kings = {PieceColor.WHITE: [], PieceColor.BLACK: []}
+        pieces = {PieceColor.WHITE: 0, PieceColor.BLACK: 0}
+        pawns = {PieceColor.WHITE: 0, PieceColor.BLACK: 0}
+        for i, row in enumerate(self.rows):
+            for j, piece in enumerate(row):
+                if not piece:
+                    continue
+                pieces[piece.color] += 1
+                if piece.type == PieceType.PAWN:
+                    pawns[piece.color] += 1
+                if piece.type == PieceType.KING:
+                    kings[piece.color].append((i, j))
+                elif piece.type == PieceType.PAWN and i in (0, 7):
+                    raise errors.InvalidFEN('a pawn is on the first or last rank')
+
+        for color, name in ((PieceColor.WHITE, 'White'), (PieceColor.BLACK, 'Black')):
+            if len(kings[color]) != 1:
+                raise errors.InvalidFEN(f'{name} has {len(kings[color])} kings')
+            if pieces[color] > 16:
+                raise errors.InvalidFEN(f'{name} has {pieces[color]} pieces')
+            if pawns[color] > 8:
+                raise errors.InvalidFEN(f'{name} has {pawns[color]} pawns')
+
+        for bit, row, rook_column in ((0b1000, 0, 7), (0b0100, 0, 0), (0b0010, 7, 7), (0b0001, 7, 0)):
+            if not self.castle_state.id & bit:
+                continue
+            color = PieceColor.WHITE if row == 0 else PieceColor.BLACK
+            if (
+                kings[color][0] != (row, 4)
+                or self.rows[row][rook_column] != PIECES_BY_ID[color | PieceType.ROOK]
+            ):
+                raise errors.InvalidFEN(f'castle rights {self.castle_state.fen} without the king and rook at home')
+
+        square = self.en_passant_square
+        if square is not None:
+            # the pawn that just moved two squares is in front of the en passant square
+            if self.active_color == PieceColor.WHITE:
+                expected_row, pawn_row, pawn = 5, 4, PIECES_BY_ID[PieceColor.BLACK | PieceType.PAWN]
+            else:
+                expected_row, pawn_row, pawn = 2, 3, PIECES_BY_ID[PieceColor.WHITE | PieceType.PAWN]
+            if square.row != expected_row or self.rows[pawn_row][square.column] != pawn:
+                raise errors.InvalidFEN(f'no pawn just moved past {square.san}')
+
+        other_color = PieceColor.BLACK if self.active_color == PieceColor.WHITE else PieceColor.WHITE
+        if self.is_attacked(Square(*kings[other_color][0]), self.active_color):
+            raise errors.InvalidFEN('the side not to move is in check')
+
+    def _set_en_passant_square(self, square: Square):
+        self.en_passant_square = square
+
+        # bugfix for lost en passant move
+        up_or_down = 1 if self.active_color is PieceColor.WHITE else -1
+        from_square = Square(square.row + up_or_down, square.column)
+        to_square = Square(square.row - up_or_down, square.column)
+        self.move_history.append(Move(from_square, to_square, self.castle_state.copy(), en_passant=from_square))
+
+    @classmethod
+    def from_packed(cls, data: bytes):
+        """Unpacks a board packed by Board.to_packed."""
+
+        if len(data) != PACKED_SIZE:
+            raise ValueError(f'A packed board is {PACKED_SIZE} bytes, not {len(data)}.')
+
+        occupied, ids, flags, en_passant, halfmoves, fullmoves = PACKED_FORMAT.unpack(data)
+        if bitboard.popcount(occupied) > 32:
+            raise ValueError('A packed board can\'t have more than 32 pieces.')
+
+        self = cls()
+
+        for i, index in enumerate(bitboard.iter_squares(occupied)):
+            piece_id = ids[i >> 1] >> (i & 1) * 4 & 0xF
+            piece = PIECES_BY_ID.get(piece_id)
+            if piece is None:
+                raise ValueError(f'Invalid piece {piece_id} in a packed board.')
+            self.rows[index >> 3][index & 7] = piece
+
+        self.active_color = PieceColor.WHITE if flags & PACKED_WHITE_TO_MOVE else PieceColor.BLACK
+        self.castle_state = CastleState(flags & 0b1111)
+        if en_passant != PACKED_NO_EN_PASSANT:
+            self._set_en_passant_square(Square(en_passant >> 3, en_passant & 7))
+        self.halfmoves = halfmoves
+        self.fullmoves = fullmoves
+
+        self.zobrist = self.compute_zobrist()
+        self.pawn_zobrist = self.compute_pawn_zobrist()
+        return self
+
+    def to_packed(self) -> bytes:
+        """Returns the board packed into 32 bytes.
+
+        The occupied squares are a bitboard, followed by the Piece.id of each
+        occupied piece in square order, four bits each. Boards with more than
+        32 pieces can't be packed. The move history isn't kept.
+        """
+
+        occupied = 0
+        ids = bytearray(16)
+        count = 0
+
+        for i, row in enumerate(self.rows):
+            for j, piece in enumerate(row):
+                if piece:
+                    if count == 32:
+                        raise ValueError('Boards with more than 32 pieces can\'t be packed.')
+                    occupied |= 1 << (i * 8 + j)
+                    ids[count >> 1] |= piece.id << (count & 1) * 4
+                    count += 1
+
+        flags = self.castle_state.id
+        if self.active_color == PieceColor.WHITE:
+            flags |= PACKED_WHITE_TO_MOVE
+
+        square = self.en_passant_square
+        en_passant = square.row * 8 + square.column if square else PACKED_NO_EN_PASSANT
+
+        return PACKED_FORMAT.pack(
+            occupied, bytes(ids), flags, en_passant, min(self.halfmoves, 0xFFFF), min(self.fullmoves, 0xFFFF)
+        )
+
+    def copy(self):
+        """Returns a copy of the board that can be changed independently.
+
+        The copy doesn't have an accumulator.
+        """
+
+        board = self.__class__()
+        board.rows = [list(row) for row in self.rows]
+        board.active_color = self.active_color
+        board.castle_state = self.castle_state.copy()
+        board.en_passant_square = self.en_passant_square
+        board.fullmoves = self.fullmoves
+        board.halfmoves = self.halfmoves
+        board.move_history = list(self.move_history)
+        board.zobrist = self.zobrist
+        board.pawn_zobrist = self.pawn_zobrist
+        board._states = list(self._states)
+        return board
+
     @property
     def fen(self) -> str:
         """Returns a FEN string of the board."""
@@ -194,11 +403,269 @@ class Board:
 
         return result
 
+    def compute_zobrist(self) -> int:
+        """Computes the board's Zobrist key from scratch.
+
+        Board.zobrist is kept up to date incrementally as moves are made,
+        so this is only needed after editing the board by hand.
+        """
+
+        key = 0
+
+        for i, row in enumerate(self.rows):
+            for j, piece in enumerate(row):
+                if piece:
+                    key ^= zobrist.PIECE_KEYS[piece.id][i * 8 + j]
+
+        key ^= zobrist.CASTLE_KEYS[self.castle_state.id]
+
+        if self.en_passant_square:
+            key ^= zobrist.EN_PASSANT_KEYS[self.en_passant_square.column]
+
+        if self.active_color == PieceColor.BLACK:
+            key ^= zobrist.BLACK_TO_MOVE_KEY
+
+        return key
+
+    def compute_pawn_zobrist(self) -> int:
+        """Computes the Zobrist key of the board's pawns from scratch.
+
+        This is the XOR of the pawns' piece keys, so it only changes when a
+        pawn moves, is captured or promotes. Like Board.zobrist, it's kept up
+        to date incrementally.
+        """
+
+        key = 0
+
+        for i, row in enumerate(self.rows):
+            for j, piece in enumerate(row):
+                if piece and piece.type == PieceType.PAWN:
+                    key ^= zobrist.PIECE_KEYS[piece.id][i * 8 + j]
+
+        return key
+
     def get(self, square: Square):
         """Returns the piece on a Square, if any."""
 
         return self.rows[square.row][square.column]
 
+    def is_attacked(self, square: Square, color: int) -> bool:
+        """Returns whether or not a Square is attacked by a color.
+
+        This looks outwards from the square instead of generating
+        every move of the attacking color.
+        """
+
+        rows = self.rows
+        row, column = square.row, square.column
+
+        # pawns attack diagonally forwards, so look diagonally backwards
+        pawn_row = row - 1 if color == PieceColor.WHITE else row + 1
+        if 0 <= pawn_row <= 7:
+            for pawn_column in (column - 1, column + 1):
+                if 0 <= pawn_column <= 7:
+                    piece = rows[pawn_row][pawn_column]
+                    if piece and piece.color == color and piece.type == PieceType.PAWN:
+                        return True
+
+        for offsets, piece_type in ((KNIGHT_OFFSETS, PieceType.KNIGHT), (KING_OFFSETS, PieceType.KING)):
+            for row_offset, column_offset in offsets:
+                r, c = row + row_offset, column + column_offset
+                if 0 <= r <= 7 and 0 <= c <= 7:
+                    piece = rows[r][c]
+                    if piece and piece.color == color and piece.type == piece_type:
+                        return True
+
+        for directions, piece_type in ((ROOK_DIRECTIONS, PieceType.ROOK), (BISHOP_DIRECTIONS, PieceType.BISHOP)):
+            for row_offset, column_offset in directions:
+                r, c = row + row_offset, column + column_offset
+                while 0 <= r <= 7 and 0 <= c <= 7:
+                    piece = rows[r][c]
+                    if piece:
+                        if piece.color == color and piece.type in (piece_type, PieceType.QUEEN):
+                            return True
+                        break
+                    r += row_offset
+                    c += column_offset
+
+        return False
+
+    def piece_bitboards(self) -> 'list[int]':
+        """Returns a bitboard of every kind of piece, indexed by Piece.id."""
+
+        bitboards = [0] * 16
+        for i, row in enumerate(self.rows):
+            for j, piece in enumerate(row):
+                if piece:
+                    bitboards[piece.id] |= 1 << (i * 8 + j)
+        return bitboards
+
+    @staticmethod
+    def _attackers_to(index: int, occupied: int, bitboards: 'list[int]') -> int:
+        # both colors' pieces that attack a square, given which squares are occupied
+        white, black = PieceColor.WHITE, PieceColor.BLACK
+        diagonal = (
+            bitboards[white | PieceType.BISHOP] | bitboards[black | PieceType.BISHOP]
+            | bitboards[white | PieceType.QUEEN] | bitboards[black | PieceType.QUEEN]
+        )
+        straight = (
+            bitboards[white | PieceType.ROOK] | bitboards[black | PieceType.ROOK]
+            | bitboards[white | PieceType.QUEEN] | bitboards[black | PieceType.QUEEN]
+        )
+        return (
+            # a white pawn attacks the square if a black pawn on it would attack the pawn
+            bitboard.PAWN_ATTACKS[black][index] & bitboards[white | PieceType.PAWN]
+            | bitboard.PAWN_ATTACKS[white][index] & bitboards[black | PieceType.PAWN]
+            | bitboard.KNIGHT_ATTACKS[index] & (bitboards[white | PieceType.KNIGHT] | bitboards[black | PieceType.KNIGHT])
+            | bitboard.KING_ATTACKS[index] & (bitboards[white | PieceType.KING] | bitboards[black | PieceType.KING])
+            | bitboard.bishop_attacks(index, occupied) & diagonal
+            | bitboard.rook_attacks(index, occupied) & straight
+        ) & occupied
+
+    def _see_start(self, move: Move):
+        """Sets up a static exchange after a move.
+
+        Returns the value it captures, the value of the piece left on the
+        target square, the target square's index, the squares still occupied,
+        the attackers of the target square and the piece bitboards.
+        """
+
+        bitboards = self.piece_bitboards()
+        occupied = 0
+        for piece_bitboard in bitboards:
+            occupied |= piece_bitboard
+
+        from_index = move.from_square.row * 8 + move.from_square.column
+        to_index = move.to_square.row * 8 + move.to_square.column
+        piece = self.get(move.from_square)
+
+        captured = SEE_VALUES[move.capture.type] if move.capture else 0
+        on_square = SEE_VALUES[piece.type]
+        if move.promotion:
+            captured += SEE_VALUES[move.promotion.type] - SEE_VALUES[PieceType.PAWN]
+            on_square = SEE_VALUES[move.promotion.type]
+
+        occupied &= ~(1 << from_index)
+        if move.en_passant:
+            occupied &= ~(1 << (move.en_passant.row * 8 + move.en_passant.column))
+
+        attackers = self._attackers_to(to_index, occupied, bitboards)
+        return captured, on_square, to_index, occupied, attackers, bitboards
+
+    def _least_valuable_attacker(self, attackers: int, color: int, bitboards: 'list[int]') -> 'tuple[int, int]':
+        # returns the attacker's type and its bit, or (0, 0) if the color has none
+        for piece_type in SEE_ORDER:
+            pieces = attackers & bitboards[color | piece_type]
+            if pieces:
+                return piece_type, pieces & -pieces
+        return 0, 0
+
+    def _reveal_x_rays(self, index: int, occupied: int, bitboards: 'list[int]') -> int:
+        # sliders that attack the square through the pieces that have left the exchange
+        white, black = PieceColor.WHITE, PieceColor.BLACK
+        diagonal = bitboards[white | PieceType.BISHOP] | bitboards[black | PieceType.BISHOP]
+        straight = bitboards[white | PieceType.ROOK] | bitboards[black | PieceType.ROOK]
+        queens = bitboards[white | PieceType.QUEEN] | bitboards[black | PieceType.QUEEN]
+        return (
+            bitboard.bishop_attacks(index, occupied) & (diagonal | queens)
+            | bitboard.rook_attacks(index, occupied) & (straight | queens)
+        ) & occupied
+
+    def see(self, move: Move) -> int:
+        """Returns the material a move wins by static exchange evaluation, in SEE_VALUES.
+
+        Both sides keep recapturing on the move's target square with their
+        least valuable piece, and either side may stop when carrying on would
+        lose material. Pieces behind the ones that capture (x-rays) join in as they're uncovered.
+        Pins and checks are ignored, except that a king won't capture onto a
+        defended square. Castling returns 0.
+        """
+
+        if isinstance(move, CastleMove):
+            return 0
+
+        captured, on_square, index, occupied, attackers, bitboards = self._see_start(move)
+        color = PieceColor.BLACK if self.active_color == PieceColor.WHITE else PieceColor.WHITE
+
+        # gains[n] is what the side making capture n has won if the exchange stops after it
+        gains = [captured]
+        while True:
+            piece_type, bit = self._least_valuable_attacker(attackers, color, bitboards)
+            if not piece_type:
+                break
+
+            occupied ^= bit
+            if piece_type == PieceType.KING:
+                other = PieceColor.BLACK if color == PieceColor.WHITE else PieceColor.WHITE
+                if self._attackers_to(index, occupied, bitboards) & self._color_bitboard(other, bitboards):
+                    break
+
+            gains.append(on_square - gains[-1])
+            on_square = SEE_VALUES[piece_type]
+            attackers = (attackers | self._reveal_x_rays(index, occupied, bitboards)) & occupied
+            color = PieceColor.BLACK if color == PieceColor.WHITE else PieceColor.WHITE
+
+        # each side only makes its capture if it comes out ahead of stopping
+        for n in range(len(gains) - 1, 0, -1):
+            gains[n - 1] = -max(-gains[n - 1], gains[n])
+        return gains[0]
+
+    def see_ge(self, move: Move, threshold: int = 0) -> bool:
+        """Returns whether Board.see(move) is at least the threshold.
+
+        This stops as soon as the answer is known, so it's cheaper than
+        calling Board.see, which plays the whole exchange out.
+        """
+
+        if isinstance(move, CastleMove):
+            return threshold <= 0
+
+        captured, on_square, index, occupied, attackers, bitboards = self._see_start(move)
+
+        # balance is how far the side that made the move is past the threshold,
+        # from the point of view of whoever has to decide whether to recapture next
+        balance = captured - threshold
+        if balance < 0:
+            return False
+        balance = on_square - balance
+        if balance <= 0:
+            # even losing the moved piece for nothing keeps the move at the threshold
+            return True
+
+        color = self.active_color
+        # whether the move reaches the threshold if the exchange stops here
+        result = True
+        while True:
+            color = PieceColor.BLACK if color == PieceColor.WHITE else PieceColor.WHITE
+            piece_type, bit = self._least_valuable_attacker(attackers, color, bitboards)
+            if not piece_type:
+                break
+
+            result = not result
+            if piece_type == PieceType.KING:
+                # the king can only capture if nothing can take it back
+                other = PieceColor.BLACK if color == PieceColor.WHITE else PieceColor.WHITE
+                if self._attackers_to(index, occupied ^ bit, bitboards) & self._color_bitboard(other, bitboards):
+                    return not result
+                return result
+
+            balance = SEE_VALUES[piece_type] - balance
+            if balance < result:
+                # the other side can't gain by taking back, so the exchange stops here
+                break
+
+            occupied ^= bit
+            attackers = (attackers | self._reveal_x_rays(index, occupied, bitboards)) & occupied
+
+        return result
+
+    @staticmethod
+    def _color_bitboard(color: int, bitboards: 'list[int]') -> int:
+        pieces = 0
+        for piece_type in SEE_ORDER:
+            pieces |= bitboards[color | piece_type]
+        return pieces
+
     def is_in_check(self, color: int = None) -> bool:
         """Returns whether or not a color is in check.
 
@@ -208,19 +675,12 @@ class Board:
         if color is None:
             color = self.active_color
 
+        other_color = PieceColor.BLACK if color == PieceColor.WHITE else PieceColor.WHITE
+
         for i, row in enumerate(self.rows):
             for j, piece in enumerate(row):
-                if piece is None:
-                    continue
-                if piece.color == color:
-                    continue
-
-                square = Square(i, j)
-                for move in piece.moves(self, square):
-                    capture = self.get(move)
-
-                    if capture and capture.type == PieceType.KING:
-                        return True
+                if piece and piece.color == color and piece.type == PieceType.KING:
+                    return self.is_attacked(Square(i, j), other_color)
 
         return False
 
@@ -238,28 +698,11 @@ class Board:
         if self.halfmoves >= 100:
             return True
 
-        if not self.is_in_check and not list(self.legal_moves()):
+        if not self.is_in_check() and not list(self.legal_moves()):
             return True
 
         return False
 
-    def _controls_square(self, color: int, square: Square):
-        """Returns whether or not a Square is controlled by a color."""
-
-        for i, row in enumerate(self.rows):
-            for j, piece in enumerate(row):
-                if not piece:
-                    continue
-                if piece.color != color:
-                    continue
-
-                current_square = Square(i, j)
-                for move in piece.moves(self, current_square):
-                    if move == square:
-                        return True
-
-        return False
-
     def _check_castle(self, white_squares: 'tuple[Square, Square]', black_squares: 'tuple[Square, Square]'):
         """Performs part of the castle detection logic."""
 
@@ -273,7 +716,7 @@ class Board:
         can_castle: bool = True
 
         for square in squares_to_check:
-            if self.get(square) or self._controls_square(color, square):
+            if self.get(square) or self.is_attacked(square, color):
                 can_castle = False
 
         return can_castle
@@ -281,6 +724,8 @@ class Board:
     def pseudo_legal_moves(self):
         """Returns a generator of all pseudo-legal moves on the board."""
 
+        stats.count('movegen')
+
         # regular moves
         for i, row in enumerate(self.rows):
             for j, piece in enumerate(row):
@@ -289,53 +734,65 @@ class Board:
                 if piece.color != self.active_color:
                     continue
 
-                square = Square(i, j)
-                for move in piece.moves(self, square):
-                    capture = self.get(move)
+                yield from self._piece_moves(piece, Square(i, j))
 
-                    # en passant
-                    if piece.type == PieceType.PAWN and move == self.en_passant_square:
-                        up_or_down = -1 if piece.color is PieceColor.WHITE else 1
-                        original_piece_row = self.en_passant_square.row + up_or_down
-                        en_passant = Square(original_piece_row, move.column)
-                        capture = self.get(en_passant)
-                    else:
-                        en_passant = None
-
-                    # promotion
-                    if piece.type == PieceType.PAWN and move.row in (0, 7):
-                        for piece_type in ('Q', 'R', 'B', 'N'):
-                            new_piece = Piece.from_fen(piece_type, color=self.active_color)
-                            yield Move(
-                                square,
-                                move,
-                                capture=capture,
-                                castle_state=self.castle_state.copy(),
-                                en_passant=en_passant,
-                                promotion=new_piece
-                            )
-                    else:
-                        yield Move(
-                            square,
-                            move,
-                            capture=capture,
-                            castle_state=self.castle_state.copy(),
-                            en_passant=en_passant
-                        )
-
-        # castle moves
-        if self.is_in_check():
+        yield from self._castle_moves()
+
+    def _piece_moves(self, piece: Piece, square: Square):
+        """Returns a generator of the pseudo-legal moves of a piece, except castles."""
+
+        for move in piece.moves(self, square):
+            capture = self.get(move)
+
+            # en passant
+            if piece.type == PieceType.PAWN and move == self.en_passant_square:
+                up_or_down = -1 if piece.color is PieceColor.WHITE else 1
+                original_piece_row = self.en_passant_square.row + up_or_down
+                en_passant = Square(original_piece_row, move.column)
+                capture = self.get(en_passant)
+            else:
+                en_passant = None
+
+            # promotion
+            if piece.type == PieceType.PAWN and move.row in (0, 7):
+                for piece_type in ('Q', 'R', 'B', 'N'):
+                    new_piece = Piece.from_fen(piece_type, color=self.active_color)
+                    yield Move(
+                        square,
+                        move,
+                        capture=capture,
+                        castle_state=self.castle_state.copy(),
+                        en_passant=en_passant,
+                        promotion=new_piece
+                    )
+            else:
+                yield Move(
+                    square,
+                    move,
+                    capture=capture,
+                    castle_state=self.castle_state.copy(),
+                    en_passant=en_passant
+                )
+
+    def _castle_moves(self):
+        """Returns a generator of the castle moves of the active color."""
+
+        kingside = self.castle_state.can_castle_kingside(self.active_color)
+        queenside = self.castle_state.can_castle_queenside(self.active_color)
+        if not (kingside or queenside) or self.is_in_check():
             return
 
-        if self.castle_state.can_castle_kingside(self.active_color):
+        if kingside:
             if self._check_castle(
                 (Square(0, 6), Square(0, 5)),
                 (Square(7, 6), Square(7, 5))
             ):
                 yield CastleMove(CastleType.KINGSIDE, self.castle_state.copy())
 
-        if self.castle_state.can_castle_queenside(self.active_color):
-            if self._check_castle(
+        if queenside:
+            # the knight's square only has to be empty, the king doesn't cross it
+            knight_square = Square(0, 1) if self.active_color == PieceColor.WHITE else Square(7, 1)
+            if not self.get(knight_square) and self._check_castle(
                 (Square(0, 2), Square(0, 3)),
                 (Square(7, 2), Square(7, 3))
             ):
@@ -358,6 +815,57 @@ class Board:
             if valid:
                 yield move
 
+    def random_move(self, rng=random) -> Optional[Move]:
+        """Returns a random legal move, or None if there aren't any.
+
+        A random piece is picked first, then one of its moves, so this doesn't
+        have to generate every move on the board the way Board.legal_moves does.
+        Moves of pieces with fewer moves are a little more likely.
+        """
+
+        color = self.active_color
+        squares = [
+            Square(i, j)
+            for i, row in enumerate(self.rows)
+            for j, piece in enumerate(row)
+            if piece and piece.color == color
+        ]
+
+        while squares:
+            index = rng.randrange(len(squares))
+            square = squares[index]
+            squares[index] = squares[-1]
+            squares.pop()
+
+            piece = self.get(square)
+            moves = list(self._piece_moves(piece, square))
+            if piece.type == PieceType.KING:
+                moves.extend(self._castle_moves())
+
+            while moves:
+                index = rng.randrange(len(moves))
+                move = moves[index]
+                moves[index] = moves[-1]
+                moves.pop()
+
+                self.make_move(move)
+                legal = not self.is_in_check(color)
+                self.unmake_move(move)
+
+                if legal:
+                    return move
+
+        return None
+
+    def move_from_id(self, move_id: int) -> Optional[Move]:
+        """Returns the legal move with a Move.id, if there is one."""
+
+        for move in self.legal_moves():
+            if move.id == move_id:
+                return move
+
+        return None
+
     def _is_double_pawn_push(self, piece: Optional[Piece], move: Move) -> bool:
         """Returns whether or not a move is a double pawn push."""
 
@@ -376,6 +884,14 @@ class Board:
         It simply performs a replacement and updates the board's state.
         """
 
+        stats.count('make_move')
+
+        # the pieces, castle state, en passant file and side to move
+        # are all XORed into the key as they change
+        key = self.zobrist ^ zobrist.BLACK_TO_MOVE_KEY ^ zobrist.CASTLE_KEYS[self.castle_state.id]
+        if self.en_passant_square:
+            key ^= zobrist.EN_PASSANT_KEYS[self.en_passant_square.column]
+
         if isinstance(move, CastleMove):
             # this is such a disgusting mess.
             # I'm so sorry
@@ -385,30 +901,72 @@ class Board:
             rook_from_square = move.rook_from_square(self.active_color)
             rook_to_square = move.rook_to_square(self.active_color)
 
+            piece_keys = zobrist.PIECE_KEYS
+
             piece = self.get(king_from_square)
             self.rows[king_from_square.row][king_from_square.column] = None
             self.rows[king_to_square.row][king_to_square.column] = piece
+            key ^= piece_keys[piece.id][king_from_square.row * 8 + king_from_square.column]
+            key ^= piece_keys[piece.id][king_to_square.row * 8 + king_to_square.column]
 
             piece = self.get(rook_from_square)
             self.rows[rook_from_square.row][rook_from_square.column] = None
             self.rows[rook_to_square.row][rook_to_square.column] = piece
+            key ^= piece_keys[piece.id][rook_from_square.row * 8 + rook_from_square.column]
+            key ^= piece_keys[piece.id][rook_to_square.row * 8 + rook_to_square.column]
 
         else:
-            piece = self.get(move.from_square)
-            self.rows[move.from_square.row][move.from_square.column] = None
-            self.rows[move.to_square.row][move.to_square.column] = piece
+            from_square = move.from_square
+            to_square = move.to_square
+            piece_keys = zobrist.PIECE_KEYS
+
+            piece = self.get(from_square)
+            captured = self.get(to_square)
+            self.rows[from_square.row][from_square.column] = None
+            self.rows[to_square.row][to_square.column] = piece
+
+            # pawn_key follows the pawns the same way key follows every piece
+            pawn_key = self.pawn_zobrist
+            is_pawn = piece and piece.type == PieceType.PAWN
+
+            if piece:
+                key ^= piece_keys[piece.id][from_square.row * 8 + from_square.column]
+                if is_pawn:
+                    pawn_key ^= piece_keys[piece.id][from_square.row * 8 + from_square.column]
+            if captured:
+                key ^= piece_keys[captured.id][to_square.row * 8 + to_square.column]
+                if captured.type == PieceType.PAWN:
+                    pawn_key ^= piece_keys[captured.id][to_square.row * 8 + to_square.column]
 
             if move.en_passant:
+                captured = self.get(move.en_passant)
                 self.rows[move.en_passant.row][move.en_passant.column] = None
+                if captured:
+                    key ^= piece_keys[captured.id][move.en_passant.row * 8 + move.en_passant.column]
+                    pawn_key ^= piece_keys[captured.id][move.en_passant.row * 8 + move.en_passant.column]
 
             if move.promotion:
-                self.rows[move.to_square.row][move.to_square.column] = move.promotion
+                self.rows[to_square.row][to_square.column] = move.promotion
+                key ^= piece_keys[move.promotion.id][to_square.row * 8 + to_square.column]
+            elif piece:
+                key ^= piece_keys[piece.id][to_square.row * 8 + to_square.column]
+                if is_pawn:
+                    pawn_key ^= piece_keys[piece.id][to_square.row * 8 + to_square.column]
 
         self.move_history.append(move)
+        self._states.append((self.en_passant_square, self.zobrist, self.halfmoves, self.pawn_zobrist))
+        if not isinstance(move, CastleMove):
+            self.pawn_zobrist = pawn_key
 
         if self.active_color is PieceColor.BLACK:
             self.fullmoves += 1
 
+        # the fifty-move rule counts from the last capture or pawn move
+        if not isinstance(move, CastleMove) and (move.capture or piece and piece.type == PieceType.PAWN):
+            self.halfmoves = 0
+        else:
+            self.halfmoves += 1
+
         # en passant
         if not isinstance(move, CastleMove) and self._is_double_pawn_push(piece, move):
             en_passant_row = (move.from_square.row + move.to_square.row) // 2
@@ -422,27 +980,27 @@ class Board:
             self.castle_state.id &= change
 
         elif piece and piece.type == PieceType.ROOK:
-            if self.active_color == PieceColor.WHITE:
-                kingside_square = Square(0, 7)
-                kingside_change = 0b0100
-                queenside_square = Square(0, 0)
-                queenside_change = 0b1000
-            else:
-                kingside_square = Square(7, 7)
-                kingside_change = 0b0001
-                queenside_square = Square(7, 0)
-                queenside_change = 0b0010
+            self.castle_state.id &= CASTLE_RIGHTS_KEPT.get((move.from_square.row, move.from_square.column), 0b1111)
 
-            if move.from_square == kingside_square:
-                self.castle_state.id &= kingside_change
-            elif move.from_square == queenside_square:
-                self.castle_state.id &= queenside_change
+        # a rook captured in its corner can't castle either
+        if not isinstance(move, CastleMove) and move.capture:
+            self.castle_state.id &= CASTLE_RIGHTS_KEPT.get((move.to_square.row, move.to_square.column), 0b1111)
+
+        key ^= zobrist.CASTLE_KEYS[self.castle_state.id]
+        if self.en_passant_square:
+            key ^= zobrist.EN_PASSANT_KEYS[self.en_passant_square.column]
+        self.zobrist = key
 
         self.active_color = PieceColor.BLACK if self.active_color else PieceColor.WHITE
 
+        if self.accumulator is not None:
+            self.accumulator.push(self, move)
+
     def unmake_move(self, move: Move):
         """Updates the internal board state to reflect a move being unmade."""
 
+        stats.count('unmake_move')
+
         color = PieceColor.WHITE if self.active_color == PieceColor.BLACK else PieceColor.BLACK
 
         if isinstance(move, CastleMove):
@@ -475,7 +1033,10 @@ class Board:
                 self.rows[move.from_square.row][move.from_square.column] = Pawn(color=color)
 
         # en passant
-        if len(self.move_history) >= 2:
+        state = self._states.pop() if self._states else None
+        if state:
+            self.en_passant_square, self.zobrist, self.halfmoves, self.pawn_zobrist = state
+        elif len(self.move_history) >= 2:
             last_move = self.move_history[-2]
             if not isinstance(last_move, CastleMove) and self._is_double_pawn_push(self.get(last_move.to_square), last_move):
                 en_passant_row = (last_move.from_square.row + last_move.to_square.row) // 2
@@ -498,8 +1059,99 @@ class Board:
 
         self.active_color = color
 
-    def parse_san(self, san: str) -> Move:
-        """Parses a string in Standard Algebraic Notation and returns the Move."""
+        if not state:
+            # there was nothing saved for this move
+            self.zobrist = self.compute_zobrist()
+            self.pawn_zobrist = self.compute_pawn_zobrist()
+
+        if self.accumulator is not None:
+            self.accumulator.pop()
+
+    def make_null_move(self):
+        """Passes the turn to the other color without moving a piece.
+
+        This is used by engines for null-move pruning.
+        """
+
+        self._states.append((self.en_passant_square, self.zobrist, self.halfmoves, self.pawn_zobrist))
+        if self.en_passant_square:
+            self.zobrist ^= zobrist.EN_PASSANT_KEYS[self.en_passant_square.column]
+        self.zobrist ^= zobrist.BLACK_TO_MOVE_KEY
+        self.en_passant_square = None
+
+        if self.active_color is PieceColor.BLACK:
+            self.fullmoves += 1
+
+        self.active_color = PieceColor.BLACK if self.active_color else PieceColor.WHITE
+
+    def unmake_null_move(self):
+        """Takes back a move made with Board.make_null_move."""
+
+        self.active_color = PieceColor.BLACK if self.active_color else PieceColor.WHITE
+
+        if self.active_color is PieceColor.BLACK:
+            self.fullmoves -= 1
+
+        self.en_passant_square, self.zobrist, self.halfmoves, self.pawn_zobrist = self._states.pop()
+
+    def san(self, move: Move) -> str:
+        """Returns a legal move on the board in Standard Algebraic Notation."""
+
+        if isinstance(move, CastleMove):
+            san = move.castle_notation
+        else:
+            piece = self.get(move.from_square)
+            capture = 'x' if move.capture else ''
+
+            if piece.type == PieceType.PAWN:
+                san = f'{move.from_square.file}{capture}' if capture else ''
+                san += move.to_square.san
+                if move.promotion:
+                    san += f'={move.promotion.fen.upper()}'
+            else:
+                # other pieces of the same kind that can move to the same square
+                others = [
+                    other.from_square for other in self.legal_moves()
+                    if not isinstance(other, CastleMove)
+                    and other.to_square == move.to_square
+                    and other.from_square != move.from_square
+                    and self.get(other.from_square) == piece
+                ]
+
+                disambiguation = ''
+                if others:
+                    if all(square.column != move.from_square.column for square in others):
+                        disambiguation = move.from_square.file
+                    elif all(square.row != move.from_square.row for square in others):
+                        disambiguation = str(move.from_square.rank)
+                    else:
+                        disambiguation = move.from_square.san
+
+                san = f'{piece.fen.upper()}{disambiguation}{capture}{move.to_square.san}'
+
+        self.make_move(move)
+        if self.is_in_check():
+            san += '+' if any(True for _ in self.legal_moves()) else '#'
+        self.unmake_move(move)
+
+        return san
+
+    def is_legal(self, move: Move) -> bool:
+        """Returns whether a pseudo-legal move leaves the mover's king out of check."""
+
+        color = self.active_color
+        self.make_move(move)
+        legal = not self.is_in_check(color)
+        self.unmake_move(move)
+        return legal
+
+    def parse_san(self, san: str, *, strict: bool = False) -> Move:
+        """Parses a string in Standard Algebraic Notation and returns the Move.
+
+        Check and annotation marks at the end (``+``, ``#``, ``!``, ``?``) are ignored.
+        By default a move without a piece letter can be any piece's, as long as
+        that's unambiguous. With ``strict``, it's always a pawn move, as in PGN.
+        """
 
         piece: Optional[Piece] = None
         from_row: Optional[int] = None
@@ -507,17 +1159,12 @@ class Board:
         to_square: Optional[Square] = None
         promotion: Optional[Piece] = None
 
-        legal_moves = list(self.legal_moves())
-
-        if san in ('0-0', 'O-O'):
-            move = CastleMove(CastleType.KINGSIDE, self.castle_state.copy())
-            if move not in legal_moves:
-                raise errors.InvalidMove()
-            return move
+        san = san.rstrip('+#!?')
 
-        if san in ('0-0-0', 'O-O-O'):
-            move = CastleMove(CastleType.QUEENSIDE, self.castle_state.copy())
-            if move not in legal_moves:
+        if san in ('0-0', 'O-O', '0-0-0', 'O-O-O'):
+            castle = CastleType.KINGSIDE if len(san) == 3 else CastleType.QUEENSIDE
+            move = CastleMove(castle, self.castle_state.copy())
+            if move not in list(self._castle_moves()) or not self.is_legal(move):
                 raise errors.InvalidMove()
             return move
 
@@ -560,6 +1207,9 @@ class Board:
                 # piece takes a piece, which we can ignore
                 continue
 
+        if strict and piece is None:
+            piece = Pawn(color=self.active_color)
+
         possible_moves: 'list[Move]' = []
 
         could_be_castle: bool = False
@@ -568,32 +1218,41 @@ class Board:
         if piece and piece.type == PieceType.KING and to_square in possible_squares:
             could_be_castle = True
 
-        for legal_move in legal_moves:
+        # only the moves that match are checked for legality, which is the slow part
+        for legal_move in self.pseudo_legal_moves():
             if isinstance(legal_move, CastleMove):
-                if could_be_castle and to_square == legal_move.rook_from_square(self.active_color):
+                if (
+                    could_be_castle
+                    and to_square == legal_move.rook_from_square(self.active_color)
+                    and self.is_legal(legal_move)
+                ):
                     return legal_move
                 else:
                     continue
 
+            if to_square != legal_move.to_square:
+                continue
+
             legal_move_piece = self.get(legal_move.from_square)
 
             if (
-                to_square == legal_move.to_square
-                and (not piece or piece == legal_move_piece)
+                (not piece or piece == legal_move_piece)
                 and (from_column is None or from_column == legal_move.from_square.column)
                 and (from_row is None or from_row == legal_move.from_square.row)
                 and (promotion is None or promotion == legal_move.promotion)
+                and self.is_legal(legal_move)
             ):
                 possible_moves.append(legal_move)
 
             # catch if the user doesn't enter a promotion piece
             if (
                 promotion is None  # no false positives
+                and (not piece or piece.type == PieceType.PAWN)
                 and legal_move.promotion
-                and to_square == legal_move.to_square
                 and (legal_move_piece and legal_move_piece.type == PieceType.PAWN)
                 and (from_column is None or from_column == legal_move.from_square.column)
                 and (from_row is None or from_row == legal_move.from_square.row)
+                and self.is_legal(legal_move)
             ):
                 raise errors.PromotionError()
 
@@ -605,9 +1264,40 @@ class Board:
 
         return possible_moves[0]
 
-    def push_san(self, san: str) -> Move:
-        """Pushes a inputted move to the board in Standard Algebraic Notation."""
+    def push_san(self, san: str, *, strict: bool = False) -> Move:
+        """Pushes a inputted move to the board in Standard Algebraic Notation.
+
+        ``strict`` is passed on to Board.parse_san.
+        """
+
+        move = self.parse_san(san, strict=strict)
+        self.make_move(move)
+        return move
+
+    def uci(self, move: Move) -> str:
+        """Returns a move on the board in UCI notation, like e2e4, e1g1 or e7e8q."""
+
+        if isinstance(move, CastleMove):
+            from_square = move.king_from_square(self.active_color)
+            to_square = move.king_to_square(self.active_color)
+        else:
+            from_square, to_square = move.from_square, move.to_square
+
+        promotion = move.promotion.fen.lower() if move.promotion else ''
+        return f'{from_square.san}{to_square.san}{promotion}'
+
+    def parse_uci(self, uci: str) -> Move:
+        """Parses a string in UCI notation and returns the legal Move."""
+
+        for move in self.legal_moves():
+            if self.uci(move) == uci:
+                return move
+
+        raise errors.InvalidMove()
+
+    def push_uci(self, uci: str) -> Move:
+        """Pushes a move to the board in UCI notation."""
 
-        move = self.parse_san(san)
+        move = self.parse_uci(uci)
         self.make_move(move)
         return move
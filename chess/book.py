@@ -0,0 +1,278 @@
+"""Opening books.
+
+An OpeningTree is built by replaying the first moves of PGN games and
+counting, for every position and move, how often the move was played and how
+the games went for the side that played it. It's written as a book in the
+Polyglot ``.bin`` layout: 16-byte big-endian entries of key, move, weight
+and learn value, sorted by key, with moves encoded the Polyglot way (castling
+as the king taking its own rook). A move's weight is two points per win and
+one per draw, scaled down to fit if needed.
+
+The keys are Polyglot keys (chess.polyglot), so books written here can be
+used by other Polyglot tools, and Polyglot books made elsewhere can be
+probed here.
+
+A Book memory-maps its file and finds a position's entries with a binary
+search, so probing doesn't read the book into memory. OysterEngine plays
+from a book given in its ``book_file`` option.
+
+Usage:
+    python -m chess.book games.pgn --output book.bin --max-ply 24
+"""
+
+import argparse
+import mmap
+import random
+import struct
+from typing import NamedTuple, Optional
+
+import chess
+from chess import errors
+from chess.move import CastleMove, Move
+from chess.pgn import PGNReader
+from chess.polyglot import polyglot_key
+from chess.piece import PieceColor, PieceType
+
+
+ENTRY = struct.Struct('>QHHI')
+
+# the promotion piece in bits 12-14 of a Polyglot move
+PROMOTION_CODES = {
+    PieceType.KNIGHT: 1,
+    PieceType.BISHOP: 2,
+    PieceType.ROOK: 3,
+    PieceType.QUEEN: 4,
+}
+
+MAX_WEIGHT = 0xFFFF
+
+# a game's result from White's side: wins, draws, losses
+RESULT_COUNTS = {'1-0': (1, 0, 0), '1/2-1/2': (0, 1, 0), '0-1': (0, 0, 1)}
+
+
+def encode_move(board: chess.Board, move: Move) -> int:
+    """Returns a move on the board as a Polyglot move."""
+
+    if isinstance(move, CastleMove):
+        from_square = move.king_from_square(board.active_color)
+        to_square = move.rook_from_square(board.active_color)
+    else:
+        from_square, to_square = move.from_square, move.to_square
+
+    code = (
+        to_square.column
+        | to_square.row << 3
+        | from_square.column << 6
+        | from_square.row << 9
+    )
+    if move.promotion:
+        code |= PROMOTION_CODES[move.promotion.type] << 12
+    return code
+
+
+class BookEntry(NamedTuple):
+    key: int
+    move: int
+    weight: int
+    learn: int
+
+
+class OpeningTree:
+    """The moves played from each position in a set of games, with their results.
+
+    ``positions`` maps a Polyglot key to a dict from Polyglot move to
+    ``[games, wins, draws, losses]``, counted for the side that played it.
+    Only the first ``max_ply`` moves of each game are counted.
+    """
+
+    def __init__(self, max_ply: int = 24):
+        self.max_ply = max_ply
+        self.positions: 'dict[int, dict[int, list[int]]]' = {}
+        self.games = 0
+
+    def __repr__(self) -> str:
+        return f'<OpeningTree games={self.games} positions={len(self.positions)}>'
+
+    def __len__(self) -> int:
+        return len(self.positions)
+
+    def add_game(self, game) -> bool:
+        """Counts the opening moves of a chess.pgn.Game.
+
+        Games without a decided result, or with an invalid FEN tag, aren't
+        counted. A game with a move that can't be played is counted up to that
+        move. Returns whether the game was counted.
+        """
+
+        counts = RESULT_COUNTS.get(game.result)
+        if counts is None:
+            return False
+        try:
+            board = game.starting_board()
+        except errors.ChessError:
+            return False
+
+        try:
+            for ply, (board, move) in enumerate(game.moves(board)):
+                if ply == self.max_ply:
+                    break
+
+                wins, draws, losses = counts if board.active_color == PieceColor.WHITE else counts[::-1]
+                moves = self.positions.setdefault(polyglot_key(board), {})
+                stats = moves.setdefault(encode_move(board, move), [0, 0, 0, 0])
+                stats[0] += 1
+                stats[1] += wins
+                stats[2] += draws
+                stats[3] += losses
+        except errors.InvalidPGN:
+            pass
+
+        self.games += 1
+        return True
+
+    def add_pgn(self, path: str) -> int:
+        """Counts the games in a PGN file, streaming them from disk. Returns how many were counted."""
+
+        counted = 0
+        with PGNReader(path) as reader:
+            for game in reader.games():
+                counted += self.add_game(game)
+        return counted
+
+    def entries(self, min_games: int = 1) -> 'list[BookEntry]':
+        """Returns the book entries of the tree, sorted by key and then by weight, highest first.
+
+        Moves played in fewer than ``min_games`` games are left out.
+        """
+
+        entries = []
+        for key, moves in self.positions.items():
+            weights = {
+                move: 2 * wins + draws
+                for move, (games, wins, draws, losses) in moves.items()
+                if games >= min_games
+            }
+            if not weights:
+                continue
+
+            highest = max(weights.values())
+            scale = MAX_WEIGHT / highest if highest > MAX_WEIGHT else 1
+            for move, weight in weights.items():
+                entries.append(BookEntry(key, move, int(weight * scale), 0))
+
+        entries.sort(key=lambda entry: (entry.key, -entry.weight, entry.move))
+        return entries
+
+    def write(self, path: str, min_games: int = 1) -> int:
+        """Writes the tree as a book. Returns the number of entries written."""
+
+        entries = self.entries(min_games)
+        with open(path, 'wb') as file:
+            for entry in entries:
+                file.write(ENTRY.pack(*entry))
+        return len(entries)
+
+
+class Book:
+    """A memory-mapped opening book.
+
+    Use it as a context manager, or call Book.close when done.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.file = open(path, 'rb')
+        try:
+            self.data = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # an empty file can't be mapped
+            self.data = b''
+
+    def __repr__(self) -> str:
+        return f'<Book path={self.path!r} entries={len(self)}>'
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __len__(self) -> int:
+        return len(self.data) // ENTRY.size
+
+    def close(self):
+        if isinstance(self.data, mmap.mmap):
+            self.data.close()
+        self.file.close()
+
+    def _key_at(self, index: int) -> int:
+        return ENTRY.unpack_from(self.data, index * ENTRY.size)[0]
+
+    def entries(self, key: int) -> 'list[BookEntry]':
+        """Returns the entries stored for a Polyglot key."""
+
+        # the first entry with the key, by binary search
+        low, high = 0, len(self)
+        while low < high:
+            middle = (low + high) // 2
+            if self._key_at(middle) < key:
+                low = middle + 1
+            else:
+                high = middle
+
+        entries = []
+        for index in range(low, len(self)):
+            entry = BookEntry(*ENTRY.unpack_from(self.data, index * ENTRY.size))
+            if entry.key != key:
+                break
+            entries.append(entry)
+        return entries
+
+    def moves(self, board: chess.Board) -> 'list[tuple[Move, int]]':
+        """Returns the legal book moves for a board with their weights, highest first."""
+
+        entries = self.entries(polyglot_key(board))
+        if not entries:
+            return []
+
+        legal_moves = {encode_move(board, move): move for move in board.legal_moves()}
+        moves = [(legal_moves[entry.move], entry.weight) for entry in entries if entry.move in legal_moves]
+        moves.sort(key=lambda item: item[1], reverse=True)
+        return moves
+
+    def choose(self, board: chess.Board, rng: random.Random = None, *, best: bool = False) -> Optional[Move]:
+        """Returns a book move for a board, or None if the book doesn't have one.
+
+        The move is picked at random in proportion to its weight, or with
+        ``best`` the highest weighted move is returned. Moves weighted zero
+        are never picked.
+        """
+
+        moves = [(move, weight) for move, weight in self.moves(board) if weight > 0]
+        if not moves:
+            return None
+        if best:
+            return moves[0][0]
+
+        rng = rng or random
+        return rng.choices([move for move, _ in moves], weights=[weight for _, weight in moves])[0]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Builds an opening book from PGN games.')
+    parser.add_argument('paths', nargs='+', help='the PGN files')
+    parser.add_argument('--output', required=True, help='the book file to write')
+    parser.add_argument('--max-ply', type=int, default=24, help='plies of each game to count')
+    parser.add_argument('--min-games', type=int, default=1, help='games a move needs to be kept')
+    args = parser.parse_args()
+
+    tree = OpeningTree(args.max_ply)
+    for path in args.paths:
+        tree.add_pgn(path)
+
+    written = tree.write(args.output, args.min_games)
+    print(f'{tree.games} games, {len(tree)} positions, {written} entries written to {args.output}')
+
+
+if __name__ == '__main__':
+    main()
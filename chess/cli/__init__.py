@@ -3,19 +3,24 @@ import time
 from typing import Optional
 
 from rich.console import Console
-from rich.progress import Progress
+from rich.progress import Progress, SpinnerColumn, TextColumn, TimeElapsedColumn
 from rich.prompt import Prompt, Confirm, PromptBase, InvalidResponse
 
 import chess
+from chess import stats
 from chess.errors import InvalidFEN, InvalidMove, DisambiguationError, PromotionError
+from chess.move import Move
 from chess.piece import PieceColor
-from chess.engines import Engine, OysterEngine
+from chess.engines import Engine, Limits, OysterEngine
 
 from .board import Board
 
 
 console = Console()
 
+# how long the engine thinks about each move, in seconds
+ENGINE_THINKING_TIME = 5.0
+
 
 # TODO:
 # make this code look nicer
@@ -23,12 +28,65 @@ console = Console()
 # use better colors
 
 
+def start_pondering(engine: OysterEngine, board: Board) -> Optional[Move]:
+    """Starts the engine thinking on the player's time.
+
+    If the engine expects a reply from its last search, it thinks about the position after it.
+    Otherwise it thinks about the current position, which covers every reply.
+    Returns the expected reply, if any.
+    """
+
+    expected = engine.pv[1] if len(engine.pv) > 1 else None
+    ponder_board = board.copy()
+
+    if expected is not None and expected in list(board.legal_moves()):
+        ponder_board.make_move(expected)
+    else:
+        expected = None
+
+    engine.start_search(ponder_board, Limits(infinite=True))
+    return expected
+
+
+def think(engine: OysterEngine) -> Move:
+    """Shows the progress of the engine's running search and returns its move."""
+
+    start = time.perf_counter()
+    start_nodes = engine.nodes
+
+    columns = (
+        SpinnerColumn(),
+        TextColumn('[yellow]Thinking[/]'),
+        TextColumn('depth [magenta]{task.fields[depth]}[/]'),
+        TextColumn('[magenta]{task.fields[nodes]}[/] nodes'),
+        TextColumn('[magenta]{task.fields[nps]}[/] nps'),
+        TimeElapsedColumn(),
+    )
+
+    with Progress(*columns, console=console, transient=True) as progress:
+        task = progress.add_task('Thinking', depth=0, nodes=0, nps=0)
+
+        while engine.search_thread is not None and engine.search_thread.is_alive():
+            engine.search_thread.join(0.1)
+            elapsed = time.perf_counter() - start
+            progress.update(
+                task,
+                depth=engine.current_depth,
+                nodes=engine.nodes,
+                nps=int((engine.nodes - start_nodes) / elapsed) if elapsed else 0
+            )
+
+    return engine.wait()
+
+
 def main():
     help_message = (
         '[blue]Hello![/] Welcome to [red]chess[/].\n'
         '[underline red]Commands:[/]\n'
         '[bold magenta]undo[/] - Undoes the last move\n'
         '[bold magenta]fen[/] - Prints the board\'s FEN string\n'
+        '[bold magenta]stats[/] - Toggles search statistics after each engine move\n'
+        '[bold magenta]profile[/] [sample] - Toggles profiling each engine move, with cProfile or by sampling\n'
         '[bold magenta]help[/] - Shows this message\n'
         '[bold magenta]quit[/] - Quits the program'
     )
@@ -49,6 +107,7 @@ def main():
 
     engine: Optional[Engine] = None
     player_color: Optional[int] = None
+    ponder: bool = False
     play_engine = Confirm.ask('Do you want to play against an engine?')
     if play_engine:
         white_or_black = Prompt.ask('Please enter your piece color (or r for random)', choices=['w', 'b', 'r'], default='r')
@@ -61,6 +120,15 @@ def main():
 
         # TODO: add engine choosing process
         engine = OysterEngine()
+        ponder = Confirm.ask('Should the engine think during your turn?', default=True)
+
+    # whether the engine is thinking during the player's turn,
+    # and the reply it is thinking about (None means every reply)
+    pondering: bool = False
+    ponder_move: Optional[Move] = None
+
+    # printed after each engine move
+    show_stats: bool = False
 
     should_print: bool = True
 
@@ -80,15 +148,45 @@ def main():
             break
 
         if engine and board.active_color != player_color:
-            with Progress(console=console, transient=True) as progress:
-                progress.add_task("[yellow]Thinking", total=1000, start=False)
-                start = time.perf_counter()
-                board.make_move(engine.get_move(board))
-                end = time.perf_counter()
-            console.print(f'Evaluated {engine.moves_evaluated} positions in {end - start:.2f} seconds.')
+            limits = Limits(time=ENGINE_THINKING_TIME)
+            start = time.perf_counter()
+            stats.reset()
+
+            if pondering and ponder_move is not None and board.move_history[-1] == ponder_move:
+                # the engine guessed right, so it can keep going
+                engine.ponderhit(limits)
+                console.print('[dim]Ponder hit![/]')
+            else:
+                if pondering:
+                    engine.stop()
+                    engine.wait()
+                engine.start_search(board, limits)
+
+            pondering = False
+            move = think(engine)
+            end = time.perf_counter()
+            if move is None or move not in board.legal_moves():
+                # the search failed, and its error was printed by its thread
+                console.print('[prompt.invalid]The engine couldn\'t find a move.')
+                break
+            board.make_move(move)
+
+            depth = engine.iterations[-1].depth if engine.iterations else 0
+            console.print(
+                f'Searched {engine.nodes} positions to depth {depth} in {end - start:.2f} seconds '
+                f'({engine.moves_evaluated} evaluated).'
+            )
+            if show_stats:
+                console.print(stats.format_stats(), markup=False)
+            if engine.profiler is not None:
+                console.print(engine.profiler.report(), markup=False)
             should_print = True
             continue
 
+        if engine and ponder and not pondering:
+            ponder_move = start_pondering(engine, board)
+            pondering = True
+
         move = Prompt.ask('Please enter a [magenta]move in algebraic notation[/] or a [magenta]command[/]')
 
         if not move:
@@ -102,10 +200,18 @@ def main():
 
         if move.lower() in ('q', 'quit'):
             if Confirm.ask('Really quit?'):
+                if engine:
+                    engine.close()
                 console.print('Goodbye!', style='bold blue')
                 return
 
         if move.lower() in ('u', 'undo'):
+            if pondering:
+                # the engine was thinking about a position that's gone now
+                engine.stop()
+                engine.wait()
+                pondering = False
+
             if not board.move_history:
                 console.print('[prompt.invalid]No move to undo.')
             else:
@@ -118,6 +224,25 @@ def main():
             console.print(board.fen)
             continue
 
+        if move.lower() == 'stats':
+            show_stats = not show_stats
+            if show_stats:
+                stats.enable()
+            else:
+                stats.disable()
+            console.print(f'Search statistics are {"on" if show_stats else "off"}.')
+            continue
+
+        parts = move.lower().split()
+        if parts and parts[0] == 'profile' and engine:
+            if engine.profiler is None:
+                mode = 'sample' if parts[1:] == ['sample'] else 'cprofile'
+                engine.profiler = stats.SearchProfiler(mode)
+            else:
+                engine.profiler = None
+            console.print(f'Profiling is {"off" if engine.profiler is None else engine.profiler.mode}.')
+            continue
+
         if move.lower() == 'board':
             should_print = True
             continue
@@ -1,5 +1,16 @@
-from .base import Engine
+from .analysis import Analysis
+from .base import Engine, Limits, SearchInfo
+from .mcts import MCTSEngine
 from .oyster import OysterEngine
 from .rand import RandomEngine
 
-ENGINES = (OysterEngine, RandomEngine)
+ENGINES = (OysterEngine, MCTSEngine, RandomEngine)
+
+
+def engine_name(engine_class) -> str:
+    """Returns the short name of an engine class, like ``oyster`` for OysterEngine."""
+
+    name = engine_class.__name__
+    if name.endswith('Engine'):
+        name = name[:-len('Engine')]
+    return name.lower()
@@ -0,0 +1,101 @@
+import asyncio
+from typing import Optional
+
+import chess
+from chess.move import Move
+
+
+class Analysis:
+    """A search running in an executor, so it doesn't block the event loop.
+
+    Iterating over an Analysis with ``async for`` yields a SearchInfo every
+    time the search completes an iteration, and ends when the search ends.
+
+        analysis = engine.analyse_async(board, Limits(time=5))
+        async for info in analysis:
+            print(info.depth, info.score, info.nps)
+        move = await analysis.wait()
+
+    ``await analysis.stop()`` ends the search early and returns the best move
+    found so far. Cancelling a task that is waiting on the analysis stops the
+    search too.
+
+    The executor has to run the search in this process (a thread pool, which is
+    what the event loop uses by default), since the search reports its progress
+    through a callback. Engines that use several processes start those themselves.
+    """
+
+    def __init__(self, search, stop, board: chess.Board, limits=None, executor=None):
+        self._search = search
+        self._stop = stop
+        self.infos = []
+        self.loop = asyncio.get_running_loop()
+        self._queue = asyncio.Queue()
+        self._future = self.loop.run_in_executor(executor, self._run, board.copy(), limits)
+
+    def __repr__(self) -> str:
+        return f'<Analysis done={self.done} best_move={self.best_move}>'
+
+    def _run(self, board: chess.Board, limits):
+        # runs in the executor
+        try:
+            return self._search(board, limits, self._post)
+        finally:
+            self._post(None)
+
+    def _post(self, info):
+        self.loop.call_soon_threadsafe(self._queue.put_nowait, info)
+
+    @property
+    def done(self) -> bool:
+        return self._future.done()
+
+    @property
+    def best_move(self) -> Optional[Move]:
+        """Returns the best move of the deepest iteration so far."""
+
+        for info in reversed(self.infos):
+            if info.pv:
+                return info.pv[0]
+        return None
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        info = await self._queue.get()
+
+        if info is None:
+            # leave the end marker for anyone else iterating
+            self._queue.put_nowait(None)
+            # raises the search's exception, if it had one
+            await self._future
+            raise StopAsyncIteration
+
+        self.infos.append(info)
+        return info
+
+    async def wait(self) -> Optional[Move]:
+        """Waits for the search to end and returns its best move."""
+
+        try:
+            infos = await asyncio.shield(self._future)
+        except asyncio.CancelledError:
+            self._stop()
+            raise
+
+        if infos and infos[-1].pv:
+            return infos[-1].pv[0]
+        return self.best_move
+
+    async def stop(self) -> Optional[Move]:
+        """Stops the search and returns the best move found so far."""
+
+        self._stop()
+        return await self.wait()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.stop()
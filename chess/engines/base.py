@@ -1,16 +1,263 @@
+import threading
+import time
+from typing import Optional
+
 import chess
+from chess import errors
+from chess.piece import PieceColor
+from .analysis import Analysis
+
+
+class Limits:
+    """Limits on how long a search can run.
+
+    A search stops as soon as it reaches any of its limits.
+    An ``infinite`` search ignores its limits and runs until it is stopped.
+
+    Attributes:
+    depth -- the deepest iteration to search
+    nodes -- the number of nodes to search
+    time -- the number of seconds to search for
+    white_clock, black_clock -- the time each side has left on its clock, in seconds
+    white_increment, black_increment -- the seconds each side gains per move
+    moves_to_go -- the number of moves until the next time control
+    """
+
+    __slots__ = (
+        'depth',
+        'nodes',
+        'time',
+        'infinite',
+        'white_clock',
+        'black_clock',
+        'white_increment',
+        'black_increment',
+        'moves_to_go'
+    )
+
+    # how many more moves a game is assumed to last when the clock doesn't say
+    DEFAULT_MOVES_TO_GO = 30
+    # seconds kept on the clock for communication overhead
+    CLOCK_MARGIN = 0.05
+
+    def __init__(
+            self,
+            *,
+            depth: int = None,
+            nodes: int = None,
+            time: float = None,
+            infinite: bool = False,
+            white_clock: float = None,
+            black_clock: float = None,
+            white_increment: float = 0,
+            black_increment: float = 0,
+            moves_to_go: int = None
+    ):
+        self.depth = depth
+        self.nodes = nodes
+        self.time = time
+        self.infinite = infinite
+        self.white_clock = white_clock
+        self.black_clock = black_clock
+        self.white_increment = white_increment
+        self.black_increment = black_increment
+        self.moves_to_go = moves_to_go
+
+    def __repr__(self) -> str:
+        return f'<Limits depth={self.depth} nodes={self.nodes} time={self.time} infinite={self.infinite}>'
+
+    def move_time(self, color: int) -> Optional[float]:
+        """Returns the number of seconds a side can spend on its move, if it's limited.
+
+        This is the ``time`` limit if there is one. Otherwise it is
+        an even share of the side's clock plus most of its increment.
+        """
+
+        if self.time is not None:
+            return self.time
+
+        if color == PieceColor.WHITE:
+            clock, increment = self.white_clock, self.white_increment
+        else:
+            clock, increment = self.black_clock, self.black_increment
+
+        if clock is None:
+            return None
+
+        clock = max(clock - self.CLOCK_MARGIN, 0)
+        share = clock / (self.moves_to_go or self.DEFAULT_MOVES_TO_GO) + increment * 0.75
+        return min(share, clock / 2)
+
+
+class SearchInfo:
+    """Information about a search after it completes an iteration.
+
+    ``multipv`` is the rank of the line among the lines a search is
+    looking for, 1 for the best one.
+    """
+
+    __slots__ = ('depth', 'score', 'nodes', 'time', 'pv', 'multipv')
+
+    def __init__(self, *, depth: int, score: float, nodes: int, time: float, pv: list, multipv: int = 1):
+        self.depth = depth
+        self.score = score
+        self.nodes = nodes
+        self.time = time
+        self.pv = pv
+        self.multipv = multipv
+
+    def __repr__(self) -> str:
+        return f'<SearchInfo depth={self.depth} score={self.score} nodes={self.nodes}>'
+
+    @property
+    def nps(self) -> int:
+        """Returns the nodes searched per second."""
+
+        return int(self.nodes / self.time) if self.time else 0
 
 
 class Engine:
     """The base chess engine that all other engines subclass.
 
     This doesn't include any logic. It is simply a framework for actual engines.
+
+    Engines declare their tunable settings in ``OPTIONS``, which maps
+    each option name to its default value.
     """
 
+    OPTIONS: dict = {}
+
+    def __init__(self, **options):
+        self.options = dict(self.OPTIONS)
+        self.search_thread: Optional[threading.Thread] = None
+        self.stop_event = threading.Event()
+        self.last_search: 'list[SearchInfo]' = []
+        # runs every search when set, see chess.stats.SearchProfiler
+        self.profiler = None
+
+        for name, value in options.items():
+            self.set_option(name, value)
+
+    @classmethod
+    def parse_option(cls, name: str, value: str):
+        """Converts an option's value from text to the type of its default."""
+
+        if name not in cls.OPTIONS:
+            raise errors.InvalidOption(name)
+
+        default = cls.OPTIONS[name]
+        if isinstance(default, bool):
+            return value.lower() in ('true', 'yes', 'on', '1')
+        if isinstance(default, int):
+            return int(value)
+        if isinstance(default, float):
+            return float(value)
+        return value
+
+    def set_option(self, name: str, value):
+        """Sets one of the engine's options."""
+
+        if name not in self.options:
+            raise errors.InvalidOption(name)
+
+        self.options[name] = value
+
     def evaluate(self, board: chess.Board):
         """Returns the engine's evaluation score for a board."""
         raise NotImplementedError
 
-    def get_move(self, board: chess.Board):
+    def get_move(self, board: chess.Board, limits: Limits = None):
         """Finds and returns the best move on the board."""
         raise NotImplementedError
+
+    def search(self, board: chess.Board, limits: Limits = None, info=None) -> 'list[SearchInfo]':
+        """Searches the board and returns information about the search.
+
+        ``info`` is called with a SearchInfo whenever the search has something to report.
+        """
+
+        self.stop_event.clear()
+        return self._profiled_search(board, limits, info)
+
+    def _profiled_search(self, board: chess.Board, limits: Optional[Limits], info) -> 'list[SearchInfo]':
+        if self.profiler is not None:
+            return self.profiler(self._search, board, limits, info)
+        return self._search(board, limits, info)
+
+    def _search(self, board: chess.Board, limits: Optional[Limits], info=None) -> 'list[SearchInfo]':
+        """Runs a search. Engines with a search of their own override this.
+
+        It should return early once ``stop_event`` is set.
+        Engines without a search of their own report the move from Engine.get_move.
+        """
+
+        start = time.perf_counter()
+        move = self.get_move(board, limits)
+        result = SearchInfo(depth=0, score=None, nodes=0, time=time.perf_counter() - start, pv=[move])
+
+        if info is not None:
+            info(result)
+        return [result]
+
+    def start_search(self, board: chess.Board, limits: Limits = None, info=None) -> threading.Thread:
+        """Starts searching a copy of the board in a background thread.
+
+        Use Engine.stop to end the search early and Engine.wait for its result.
+        """
+
+        self.wait()
+        # cleared here rather than in the thread, so a stop can't be lost
+        # if it comes before the search has started, and so a search that
+        # fails doesn't leave the last one's move for Engine.wait
+        self.stop_event.clear()
+        self.last_search = []
+        self.search_thread = threading.Thread(
+            target=self._run_search,
+            args=(board.copy(), limits, info),
+            daemon=True
+        )
+        self.search_thread.start()
+        return self.search_thread
+
+    def _run_search(self, board: chess.Board, limits: Optional[Limits], info):
+        self.last_search = self._profiled_search(board, limits, info)
+
+    def stop(self):
+        """Tells a running search to stop as soon as possible."""
+
+        self.stop_event.set()
+
+    def ponderhit(self, limits: Limits):
+        """Gives a running (pondering) search new limits, counted from now."""
+
+    def wait(self):
+        """Waits for a background search and returns its best move."""
+
+        if self.search_thread is not None:
+            self.search_thread.join()
+            self.search_thread = None
+
+        if self.last_search and self.last_search[-1].pv:
+            return self.last_search[-1].pv[0]
+        return None
+
+    def new_game(self):
+        """Forgets anything the engine learned from previous games."""
+
+    def analyse_async(self, board: chess.Board, limits: Limits = None, executor=None) -> Analysis:
+        """Starts searching a copy of the board in an executor.
+
+        This has to be called from a coroutine. The returned Analysis streams
+        SearchInfo updates as an async iterator and can be stopped early.
+        """
+
+        self.stop_event.clear()
+        return Analysis(self._search, self.stop, board, limits, executor)
+
+    async def get_move_async(self, board: chess.Board, limits: Limits = None, executor=None):
+        """Finds and returns the best move on the board without blocking the event loop."""
+
+        return await self.analyse_async(board, limits, executor).wait()
+
+    def close(self):
+        """Releases anything the engine holds on to, like helper processes."""
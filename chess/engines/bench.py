@@ -0,0 +1,70 @@
+"""Fixed-position search benchmark for OysterEngine.
+
+Searches every position in BENCH_POSITIONS to a fixed depth and reports
+nodes, time and nodes per second, so search changes can be compared.
+
+Usage:
+    python -m chess.engines.bench [--depth N] [--no-lmr] [--no-futility] ...
+"""
+
+import argparse
+import time
+
+import chess
+from .base import Limits
+from .oyster import OysterEngine
+
+
+BENCH_POSITIONS = (
+    'rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1',
+    'r1bqkb1r/pppp1ppp/2n2n2/4p3/2B1P3/5N2/PPPP1PPP/RNBQK2R w KQkq - 4 4',
+    'r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1',
+    'r4rk1/1pp1qppp/p1np1n2/2b1p1B1/2B1P1b1/P1NP1N2/1PP1QPPP/R4RK1 w - - 0 10',
+    '8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1',
+    '6k1/5ppp/8/8/8/8/5PPP/3R2K1 w - - 0 1',
+)
+
+
+def bench(depth: int, options: dict = None, positions=BENCH_POSITIONS, output=print) -> 'tuple[int, float]':
+    """Searches every position to a depth and returns the total nodes and time."""
+
+    total_nodes = 0
+    total_time = 0.0
+
+    for fen in positions:
+        engine = OysterEngine(**(options or {}))
+        board = chess.Board.from_fen(fen)
+
+        start = time.perf_counter()
+        infos = engine.search(board, Limits(depth=depth))
+        elapsed = time.perf_counter() - start
+
+        total_nodes += engine.nodes
+        total_time += elapsed
+
+        best = infos[-1].pv[0].lan if infos and infos[-1].pv else '-'
+        output(f'{fen:<72} {best:>8} {engine.nodes:>9} nodes {elapsed:>8.2f}s {int(engine.nodes / elapsed):>7} nps')
+
+    output(f'Total: {total_nodes} nodes in {total_time:.2f}s ({int(total_nodes / total_time)} nps)')
+    return total_nodes, total_time
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--depth', type=int, default=4)
+
+    for name, default in OysterEngine.OPTIONS.items():
+        if isinstance(default, bool):
+            parser.add_argument(f'--no-{name.replace("_", "-")}', dest=name, action='store_false')
+
+    args = parser.parse_args()
+    options = {
+        name: getattr(args, name)
+        for name, default in OysterEngine.OPTIONS.items()
+        if isinstance(default, bool)
+    }
+    bench(args.depth, options)
+
+
+if __name__ == '__main__':
+    main()
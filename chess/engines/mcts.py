@@ -0,0 +1,315 @@
+import concurrent.futures
+import math
+import multiprocessing
+import random
+import time
+from typing import Optional
+
+import chess
+from chess.move import Move
+from chess.piece import PieceType
+from .base import Engine, Limits, SearchInfo
+
+
+# set in worker processes, see _init_worker
+_worker_stop_event = None
+
+
+def _init_worker(stop_event):
+    global _worker_stop_event
+    _worker_stop_event = stop_event
+
+
+def _search_worker(board: chess.Board, limits: Limits, options: dict, seed: int) -> 'tuple[list[tuple], int]':
+    """Builds a tree in a worker process.
+
+    Returns ``(move_id, visits, score)`` for each root child and the number of playouts.
+    """
+
+    engine = MCTSEngine(**dict(options, processes=1))
+    engine.stop_event = _worker_stop_event
+    engine.rng = random.Random(seed)
+    engine._search(board, limits)
+
+    children = [(child.move.id, child.visits, child.score) for child in engine.root.children]
+    return children, engine.playouts
+
+
+class Node:
+    """A position in the search tree.
+
+    ``score`` is the total result of the playouts through this node, from the
+    side of the player who made ``move``, so a parent picks the child with the
+    best average for itself.
+    """
+
+    __slots__ = ('move', 'parent', 'children', 'untried', 'visits', 'score')
+
+    def __init__(self, move: Optional[Move] = None, parent: 'Optional[Node]' = None):
+        self.move = move
+        self.parent = parent
+        self.children: 'list[Node]' = []
+        # the moves that don't have a child yet, filled in the first time the node is reached
+        self.untried: 'Optional[list[Move]]' = None
+        self.visits = 0
+        self.score = 0.0
+
+    def __repr__(self) -> str:
+        return f'<Node move={self.move} visits={self.visits} score={self.score}>'
+
+    def best_child(self) -> 'Optional[Node]':
+        """Returns the most visited child."""
+
+        return max(self.children, key=lambda child: child.visits, default=None)
+
+
+class MCTSEngine(Engine):
+    """A chess engine that uses Monte Carlo tree search (UCT).
+
+    Each playout picks moves at random until the game ends or
+    ``playout_depth`` plies have been played, and scores the position
+    it ends in by material. The reported nodes are playouts.
+
+    Options:
+    playouts -- the number of playouts when no limits are given
+    exploration -- the UCT exploration constant
+    playout_depth -- the number of plies before a playout is scored by material
+    processes -- the number of processes building trees at once.
+        Each one grows its own tree from the root and their root statistics are added up.
+    """
+
+    OPTIONS = {
+        'playouts': 2000,
+        'exploration': 1.4,
+        'playout_depth': 40,
+        'processes': 1,
+    }
+
+    PIECE_SCORES = {
+        PieceType.KING: 0,
+        PieceType.QUEEN: 900,
+        PieceType.ROOK: 500,
+        PieceType.BISHOP: 330,
+        PieceType.KNIGHT: 320,
+        PieceType.PAWN: 100
+    }
+
+    # how often a running search reports its progress, in seconds
+    REPORT_INTERVAL = 1.0
+
+    def __init__(self, **options):
+        super().__init__(**options)
+
+        self.rng = random.Random()
+        self.root: Optional[Node] = None
+        self.playouts = 0
+        self.pool: Optional[concurrent.futures.ProcessPoolExecutor] = None
+        self.pool_stop_event = None
+
+    def evaluate(self, board: chess.Board) -> float:
+        """Returns the material balance in centipawns, from the side to move."""
+
+        score = 0
+        for row in board.rows:
+            for piece in row:
+                if piece:
+                    value = self.PIECE_SCORES[piece.type]
+                    score += value if piece.color == board.active_color else -value
+        return score
+
+    def playout(self, board: chess.Board) -> float:
+        """Plays random moves on a copy of the board and returns the result for the side to move.
+
+        A win is 1, a draw 0.5 and a loss 0. A playout that doesn't end
+        is scored from the material balance it ends with.
+        """
+
+        color = board.active_color
+        board = board.copy()
+
+        for _ in range(self.options['playout_depth']):
+            move = board.random_move(self.rng)
+            if move is None:
+                if board.is_in_check():
+                    return 0.0 if board.active_color == color else 1.0
+                return 0.5
+            if board.halfmoves >= 100:
+                return 0.5
+
+            board.make_move(move)
+
+        score = self.evaluate(board)
+        if board.active_color != color:
+            score = -score
+        return 1 / (1 + 10 ** (-score / 400))
+
+    def _select(self, node: Node) -> Node:
+        exploration = self.options['exploration']
+        log_visits = math.log(node.visits)
+
+        def uct(child: Node) -> float:
+            return child.score / child.visits + exploration * math.sqrt(log_visits / child.visits)
+
+        return max(node.children, key=uct)
+
+    def _run_playout(self, board: chess.Board):
+        """Runs one selection, expansion, playout and backpropagation from the root."""
+
+        node = self.root
+        path = []
+
+        # selection
+        while node.untried == [] and node.children:
+            node = self._select(node)
+            board.make_move(node.move)
+            path.append(node.move)
+
+        # expansion
+        if node.untried is None:
+            node.untried = list(board.legal_moves())
+        if node.untried:
+            move = node.untried.pop(self.rng.randrange(len(node.untried)))
+            board.make_move(move)
+            path.append(move)
+            child = Node(move, node)
+            node.children.append(child)
+            node = child
+
+        # playout, from the side to move at the new node
+        result = self.playout(board)
+
+        # backpropagation
+        result = 1 - result
+        while node is not None:
+            node.visits += 1
+            node.score += result
+            result = 1 - result
+            node = node.parent
+
+        for move in reversed(path):
+            board.unmake_move(move)
+
+        self.playouts += 1
+
+    def _info(self, start_time: float, children=None) -> SearchInfo:
+        """Returns a SearchInfo for the tree, or for root statistics added up from several trees."""
+
+        pv = []
+        node = self.root
+        while node is not None and node.children:
+            node = node.best_child()
+            pv.append(node.move)
+
+        if children:
+            # (move, visits, score) from every tree
+            best_move, visits, score = max(children, key=lambda child: child[1])
+            if not pv or pv[0] != best_move:
+                pv = [best_move]
+        elif pv:
+            visits, score = self.root.best_child().visits, self.root.best_child().score
+        else:
+            visits, score = 0, 0.0
+
+        win_rate = min(max(score / visits, 0.001), 0.999) if visits else 0.5
+        return SearchInfo(
+            depth=len(pv),
+            # the win rate on the centipawn scale of a logistic model
+            score=round(400 * math.log10(win_rate / (1 - win_rate))),
+            nodes=self.playouts,
+            time=time.perf_counter() - start_time,
+            pv=pv
+        )
+
+    def _search(self, board: chess.Board, limits: Optional[Limits], info=None) -> 'list[SearchInfo]':
+        """Runs playouts until the limits are reached.
+
+        The limits default to the engine's playouts option. The ``nodes`` limit counts playouts.
+        ``info`` is called with a SearchInfo about once a second and when the search ends.
+        """
+
+        limits = limits or Limits(nodes=self.options['playouts'])
+        self.limits = limits
+        self.root = Node()
+        self.playouts = 0
+        start_time = time.perf_counter()
+        time_limit = limits.move_time(board.active_color)
+        processes = self.options['processes']
+
+        futures = []
+        if processes > 1:
+            if self.pool is None:
+                self.pool_stop_event = multiprocessing.get_context().Event()
+                self.pool = concurrent.futures.ProcessPoolExecutor(
+                    processes - 1,
+                    initializer=_init_worker,
+                    initargs=(self.pool_stop_event,)
+                )
+
+            # Engine.stop sets both events, so checking after clearing can't miss a stop
+            self.pool_stop_event.clear()
+            if self.stop_event.is_set():
+                self.pool_stop_event.set()
+
+            worker_limits = limits
+            if limits.nodes:
+                # the playouts are split between the processes
+                worker_limits = Limits(nodes=limits.nodes // processes, time=time_limit, infinite=limits.infinite)
+                limits = Limits(nodes=limits.nodes - worker_limits.nodes * (processes - 1), time=time_limit, infinite=limits.infinite)
+            futures = [
+                self.pool.submit(_search_worker, board.copy(), worker_limits, self.options, self.rng.getrandbits(32))
+                for _ in range(processes - 1)
+            ]
+
+        infos = []
+        last_report = start_time
+        while True:
+            self._run_playout(board)
+
+            now = time.perf_counter()
+            if self.stop_event.is_set() or not self.root.untried and not self.root.children:
+                break
+            if not limits.infinite and (
+                limits.nodes and self.playouts >= limits.nodes
+                or time_limit and now - start_time >= time_limit
+            ):
+                break
+
+            if info and now - last_report >= self.REPORT_INTERVAL:
+                last_report = now
+                info(self._info(start_time))
+
+        children = None
+        if futures:
+            # the tree's own statistics plus every worker's
+            totals = {child.move.id: [child.move, child.visits, child.score] for child in self.root.children}
+            for future in futures:
+                worker_children, playouts = future.result()
+                self.playouts += playouts
+                for move_id, visits, score in worker_children:
+                    if move_id not in totals:
+                        totals[move_id] = [board.move_from_id(move_id), 0, 0.0]
+                    totals[move_id][1] += visits
+                    totals[move_id][2] += score
+            children = [tuple(total) for total in totals.values()]
+
+        infos.append(self._info(start_time, children))
+        if info:
+            info(infos[-1])
+        return infos
+
+    def get_move(self, board: chess.Board, limits: Limits = None):
+        infos = self.search(board, limits)
+        return infos[-1].pv[0] if infos[-1].pv else None
+
+    def stop(self):
+        super().stop()
+        if self.pool_stop_event is not None:
+            self.pool_stop_event.set()
+
+    def close(self):
+        self.stop()
+        self.wait()
+
+        if self.pool is not None:
+            self.pool.shutdown()
+            self.pool = None
@@ -0,0 +1,257 @@
+"""An NNUE-style evaluation network.
+
+The network has 768 inputs per perspective, one for each (own or enemy piece,
+piece type, square) with the board flipped for Black, a hidden layer shared
+by both perspectives, and a single output. The hidden layer's outputs (the
+accumulator) only change by a few weight rows per move, so they are updated
+incrementally as moves are made and unmade instead of being recomputed at
+every leaf.
+
+Networks are stored quantized in ``.npz`` files:
+
+feature_weights -- int16, (768, hidden)
+feature_biases -- int16, (hidden,)
+output_weights -- int16, (2 * hidden,), side to move's half first
+output_bias -- int32, ()
+
+This needs NumPy.
+"""
+
+from typing import Optional
+
+import numpy as np
+
+import chess
+from chess.move import CastleMove
+from chess.piece import Pawn, PieceColor, PieceType
+
+
+INPUTS = 768
+
+# activations are clipped to [0, QA] and the output weights are scaled by QB
+QA = 255
+QB = 64
+# the output is multiplied by this to get centipawns
+SCALE = 400
+
+PERSPECTIVES = (PieceColor.WHITE, PieceColor.BLACK)
+
+_TYPE_INDEXES = {
+    PieceType.PAWN: 0,
+    PieceType.KNIGHT: 1,
+    PieceType.BISHOP: 2,
+    PieceType.ROOK: 3,
+    PieceType.QUEEN: 4,
+    PieceType.KING: 5,
+}
+
+
+def _feature_table(perspective: int) -> 'list[Optional[list[int]]]':
+    # indexed by Piece.id, then by square index
+    table = [None] * 16
+    for color in PERSPECTIVES:
+        for piece_type, type_index in _TYPE_INDEXES.items():
+            side = 0 if color == perspective else 1
+            flip = 0 if perspective == PieceColor.WHITE else 56
+            table[color | piece_type] = [
+                side * 384 + type_index * 64 + (index ^ flip)
+                for index in range(64)
+            ]
+    return table
+
+
+# FEATURES[perspective index][Piece.id][square index] -> input index
+FEATURES = tuple(_feature_table(perspective) for perspective in PERSPECTIVES)
+
+
+def _perspective_index(color: int) -> int:
+    return 0 if color == PieceColor.WHITE else 1
+
+
+def board_features(board: chess.Board, perspective: int) -> 'list[int]':
+    """Returns the active inputs of a board from one side's perspective."""
+
+    table = FEATURES[_perspective_index(perspective)]
+    return [
+        table[piece.id][i * 8 + j]
+        for i, row in enumerate(board.rows)
+        for j, piece in enumerate(row)
+        if piece
+    ]
+
+
+class Network:
+    """A quantized evaluation network."""
+
+    def __init__(self, feature_weights, feature_biases, output_weights, output_bias):
+        self.feature_weights = np.asarray(feature_weights, dtype=np.int16)
+        self.feature_biases = np.asarray(feature_biases, dtype=np.int16)
+        self.output_weights = np.asarray(output_weights, dtype=np.int16)
+        self.output_bias = int(output_bias)
+
+        hidden = self.feature_biases.shape[0]
+        if self.feature_weights.shape != (INPUTS, hidden) or self.output_weights.shape != (2 * hidden,):
+            raise ValueError('Network weights have mismatched shapes.')
+
+        # accumulators are int32 so many large weights can't overflow them, and the
+        # output layer sums products of up to QA and a weight, which needs int64
+        self._feature_weights = self.feature_weights.astype(np.int32)
+        self._feature_biases = self.feature_biases.astype(np.int32)
+        self._output_weights = self.output_weights.astype(np.int64)
+
+    def __repr__(self) -> str:
+        return f'<Network hidden={self.hidden}>'
+
+    @property
+    def hidden(self) -> int:
+        return self.feature_biases.shape[0]
+
+    @classmethod
+    def load(cls, path: str):
+        """Loads a network from an ``.npz`` file."""
+
+        with np.load(path) as data:
+            return cls(data['feature_weights'], data['feature_biases'], data['output_weights'], data['output_bias'])
+
+    @classmethod
+    def random(cls, hidden: int = 64, seed: int = 0):
+        """Returns an untrained network with small random weights, for testing."""
+
+        rng = np.random.default_rng(seed)
+        return cls(
+            rng.integers(-64, 64, (INPUTS, hidden)),
+            rng.integers(0, 64, hidden),
+            rng.integers(-64, 64, 2 * hidden),
+            0
+        )
+
+    def save(self, path: str):
+        np.savez(
+            path,
+            feature_weights=self.feature_weights,
+            feature_biases=self.feature_biases,
+            output_weights=self.output_weights,
+            output_bias=np.int32(self.output_bias)
+        )
+
+    def refresh(self, board: chess.Board) -> np.ndarray:
+        """Computes both perspectives' accumulators from scratch.
+
+        Returns an array of shape (2, hidden), White's perspective first.
+        """
+
+        accumulators = np.empty((2, self.hidden), dtype=np.int32)
+        for i, perspective in enumerate(PERSPECTIVES):
+            features = board_features(board, perspective)
+            accumulators[i] = self._feature_biases + self._feature_weights[features].sum(axis=0)
+        return accumulators
+
+    def accumulator(self, board: chess.Board) -> 'Accumulator':
+        """Returns an Accumulator for a board. Attach it with ``board.accumulator = ...``."""
+
+        return Accumulator(self, board)
+
+    def _output(self, us: np.ndarray, them: np.ndarray) -> int:
+        hidden = self.hidden
+        weights = self._output_weights
+        value = (
+            int(np.clip(us, 0, QA) @ weights[:hidden])
+            + int(np.clip(them, 0, QA) @ weights[hidden:])
+            + self.output_bias
+        )
+        return value * SCALE // (QA * QB)
+
+    def evaluate(self, board: chess.Board) -> int:
+        """Returns the score of a board in centipawns, from the side to move.
+
+        Uses the board's accumulator when this network's is attached,
+        otherwise computes one from scratch.
+        """
+
+        accumulator = board.accumulator
+        if isinstance(accumulator, Accumulator) and accumulator.network is self:
+            accumulators = accumulator.stack[-1]
+        else:
+            accumulators = self.refresh(board)
+
+        us = _perspective_index(board.active_color)
+        return self._output(accumulators[us], accumulators[1 - us])
+
+    def evaluate_batch(self, boards: 'list[chess.Board]') -> np.ndarray:
+        """Returns the scores of many boards at once, in centipawns from each side to move."""
+
+        count = len(boards)
+        inputs = np.zeros((2, count, INPUTS), dtype=np.int32)
+        for i, board in enumerate(boards):
+            them = PieceColor.BLACK if board.active_color == PieceColor.WHITE else PieceColor.WHITE
+            inputs[0, i, board_features(board, board.active_color)] = 1
+            inputs[1, i, board_features(board, them)] = 1
+
+        hidden = np.clip(inputs @ self._feature_weights + self._feature_biases, 0, QA)
+        weights = self._output_weights
+        values = (
+            hidden[0] @ weights[:self.hidden]
+            + hidden[1] @ weights[self.hidden:]
+            + self.output_bias
+        )
+        return values * SCALE // (QA * QB)
+
+
+class Accumulator:
+    """A network's accumulators for a board, kept up to date as moves are made.
+
+    A board with an accumulator attached calls Accumulator.push after every
+    made move and Accumulator.pop after every unmade one. Each push adds and
+    subtracts the weight rows of the few inputs the move changed.
+    """
+
+    def __init__(self, network: Network, board: chess.Board):
+        self.network = network
+        self.stack = [network.refresh(board)]
+
+    def __repr__(self) -> str:
+        return f'<Accumulator network={self.network!r} depth={len(self.stack)}>'
+
+    def push(self, board: chess.Board, move):
+        """Updates the accumulators for a move that was just made on the board."""
+
+        color = PieceColor.BLACK if board.active_color == PieceColor.WHITE else PieceColor.WHITE
+        added = []
+        removed = []
+
+        if isinstance(move, CastleMove):
+            king = board.get(move.king_to_square(color))
+            rook = board.get(move.rook_to_square(color))
+            for piece, from_square, to_square in (
+                (king, move.king_from_square(color), move.king_to_square(color)),
+                (rook, move.rook_from_square(color), move.rook_to_square(color)),
+            ):
+                removed.append((piece.id, from_square.row * 8 + from_square.column))
+                added.append((piece.id, to_square.row * 8 + to_square.column))
+        else:
+            from_index = move.from_square.row * 8 + move.from_square.column
+            to_index = move.to_square.row * 8 + move.to_square.column
+            piece = board.get(move.to_square)
+
+            removed.append((Pawn(color=color).id if move.promotion else piece.id, from_index))
+            added.append((piece.id, to_index))
+
+            if move.capture:
+                captured_square = move.en_passant or move.to_square
+                removed.append((move.capture.id, captured_square.row * 8 + captured_square.column))
+
+        accumulators = self.stack[-1].copy()
+        weights = self.network._feature_weights
+        for i, table in enumerate(FEATURES):
+            row = accumulators[i]
+            for piece_id, index in added:
+                row += weights[table[piece_id][index]]
+            for piece_id, index in removed:
+                row -= weights[table[piece_id][index]]
+
+        self.stack.append(accumulators)
+
+    def pop(self):
+        """Goes back to the accumulators from before the last pushed move."""
+
+        self.stack.pop()
@@ -1,9 +1,16 @@
+import math
+import random
+import time
 from typing import Optional
 
 import chess
+from chess import bitboard, stats
+from chess.board import SEE_VALUES
 from chess.move import Move
 from chess.piece import Piece, PieceColor, PieceType
-from .base import Engine
+from .base import Engine, Limits, SearchInfo
+from .pawns import PawnHashTable, pawn_structure
+from .transposition import Bound, SharedTranspositionTable, TranspositionTable
 
 
 PIECE_SQUARE_TABLES = {
@@ -70,98 +77,1005 @@ PIECE_SQUARE_TABLES = {
 }
 
 
+def attack_mobility(mobile_pieces, occupied: int, occupancy: dict, pawns: dict) -> int:
+    """Returns the number of safe squares White's pieces attack minus Black's.
+
+    ``mobile_pieces`` holds ``(piece_type, color, square index)`` for every piece
+    except pawns and kings. ``occupancy`` and ``pawns`` are bitboards by color.
+    """
+
+    # a square is safe if it isn't ours and no enemy pawn attacks it
+    safe = {
+        PieceColor.WHITE: ~(occupancy[PieceColor.WHITE] | bitboard.pawn_attacks(pawns[PieceColor.BLACK], PieceColor.BLACK)),
+        PieceColor.BLACK: ~(occupancy[PieceColor.BLACK] | bitboard.pawn_attacks(pawns[PieceColor.WHITE], PieceColor.WHITE)),
+    }
+    mobility = 0
+    for piece_type, color, index in mobile_pieces:
+        attacks = bitboard.piece_attacks(piece_type, color, index, occupied) & safe[color]
+        if color == PieceColor.WHITE:
+            mobility += bitboard.popcount(attacks)
+        else:
+            mobility -= bitboard.popcount(attacks)
+    return mobility
+
+
+LMR_TABLE_SIZE = 64
+
+# depth reduction for a late move, indexed by depth and move number
+LMR_TABLE = [
+    [
+        int(0.75 + math.log(depth) * math.log(move_number) / 2.25) if depth and move_number else 0
+        for move_number in range(LMR_TABLE_SIZE)
+    ]
+    for depth in range(LMR_TABLE_SIZE)
+]
+
+
 class OysterEngine(Engine):
-    """A chess engine named Oyster."""
+    """A chess engine named Oyster.
+
+    Options:
+    depth -- the depth searched when no limits are given
+    mobility -- ``'attacks'`` counts the safe squares each piece attacks,
+        ``'legal'`` counts full legal moves for both sides (slow, kept for comparison)
+    pvs -- search moves after the first with a null window (principal variation search)
+    aspiration -- search each iteration with a window around the previous score
+    null_move -- prune nodes where passing the turn still fails high
+    lmr -- search late quiet moves at a reduced depth first (late move reductions)
+    futility -- skip quiet moves near the leaves when the static eval is far below alpha
+    reverse_futility -- cut nodes near the leaves when the static eval is far above beta
+    quiescence -- keep searching captures past the depth limit
+    see -- search captures that lose material by static exchange evaluation after
+        the quiet moves, and skip them in the quiescence search
+    hash -- the size of the transposition table in megabytes
+    threads -- the number of processes searching at once (Lazy SMP)
+    evaluator -- ``'classic'`` for the piece-square tables, mobility and pawn structure,
+        ``'nnue'`` for the network in ``nnue_file`` (needs NumPy, see chess.engines.nnue)
+    nnue_file -- the ``.npz`` file of the network
+    multipv -- the number of best lines to search for, see OysterEngine.analyse
+    book_file -- an opening book to play from before searching, see chess.book
+    """
+
+    OPTIONS = {
+        'depth': 3,
+        'mobility': 'attacks',
+        'pvs': True,
+        'aspiration': True,
+        'null_move': True,
+        'lmr': True,
+        'futility': True,
+        'reverse_futility': True,
+        'quiescence': True,
+        'see': True,
+        'hash': 16,
+        'threads': 1,
+        'evaluator': 'classic',
+        'nnue_file': '',
+        'multipv': 1,
+        'book_file': '',
+    }
+
+    def __init__(self, **options):
+        super().__init__(**options)
 
-    def __init__(self):
         self.move_table: dict[str, Move] = {}
         self.score_table: dict[Move, float] = {}
 
+        # counted per search
         self.moves_evaluated = 0
+        self.nodes = 0
 
+        # kept between searches, see OysterEngine.new_game
+        self.pv: 'list[Move]' = []
+        self.killers = [[None, None] for _ in range(self.MAX_PLY + 1)]
+        self.history = {PieceColor.WHITE: {}, PieceColor.BLACK: {}}
+        self.last_root: 'Optional[tuple[list[Move], int]]' = None
+        self.tt: Optional[TranspositionTable] = None
+        # pawn structure scores don't depend on the search, so these are kept for good
+        self.pawn_table = PawnHashTable(self.PAWN_HASH_ENTRIES)
+        self.helpers = None
+
+        # set when this engine is a Lazy SMP helper searching with another engine's table.
+        # helpers shuffle their quiet moves a little so they don't all search the same tree
+        self.helper_id: Optional[int] = None
+        self.ordering_noise: Optional[random.Random] = None
+
+        # the best lines of the last completed iteration, best first
+        self.lines: 'list[SearchInfo]' = []
+        # overrides the multipv option for one search, see OysterEngine.analyse
+        self.multipv: Optional[int] = None
+        # root moves left out of the search, so it finds the next best line
+        self.excluded_root_moves: 'frozenset[int]' = frozenset()
+
+        # loaded the first time it's needed, see OysterEngine._network
+        self.network = None
+        self.network_file: Optional[str] = None
+        # opened the first time it's needed, see OysterEngine._book_move
+        self.book = None
+
+    # centipawns, the same scale as the piece-square tables
     PIECE_SCORES = {
-        PieceType.KING: 200,
-        PieceType.QUEEN: 9,
-        PieceType.ROOK: 5,
-        PieceType.BISHOP: 3,
-        PieceType.KNIGHT: 3,
-        PieceType.PAWN: 1
+        PieceType.KING: 60000,
+        PieceType.QUEEN: 929,
+        PieceType.ROOK: 479,
+        PieceType.BISHOP: 320,
+        PieceType.KNIGHT: 280,
+        PieceType.PAWN: 100
     }
 
     MATE_LOWER = PIECE_SCORES[PieceType.KING] - 10*PIECE_SCORES[PieceType.QUEEN]
     MATE_UPPER = PIECE_SCORES[PieceType.KING] + 10*PIECE_SCORES[PieceType.QUEEN]
 
+    MOBILITY_WEIGHT = 2
+
+    PAWN_HASH_ENTRIES = 1 << 14
+
+    MAX_PLY = 64
+    ASPIRATION_WINDOW = 50
+    NULL_MOVE_MIN_DEPTH = 3
+    NULL_MOVE_REDUCTION = 2
+    LMR_MIN_DEPTH = 3
+    LMR_MIN_MOVES = 3
+    # indexed by depth - 1
+    FUTILITY_MARGINS = (200, 500)
+    REVERSE_FUTILITY_DEPTH = 3
+    REVERSE_FUTILITY_MARGIN = 120
+    # how often the search checks whether it should stop, in nodes minus one
+    # (a few milliseconds at pure-Python speeds, so short time controls are kept)
+    STOP_CHECK_MASK = 31
+
     def evaluate(self, board: chess.Board) -> float:
         self.moves_evaluated += 1
+        stats.count('evaluations')
+
+        if self.options['evaluator'] == 'nnue':
+            return self._network().evaluate(board)
 
         score: float = 0
 
+        occupied = 0
+        occupancy = {PieceColor.WHITE: 0, PieceColor.BLACK: 0}
+        pawns = {PieceColor.WHITE: 0, PieceColor.BLACK: 0}
+        mobile_pieces = []
+
         # calculate piece scores
         for i, row in enumerate(board.rows):
             for j, piece in enumerate(row):
                 if not piece:
                     continue
-                negative = -1 if piece.color == PieceColor.BLACK else 1
-                score += self.PIECE_SCORES[piece.type] * negative
+                color = piece.color
+                piece_type = piece.type
+                negative = -1 if color == PieceColor.BLACK else 1
+                score += self.PIECE_SCORES[piece_type] * negative
 
-                table = PIECE_SQUARE_TABLES[piece.type]
-                table = list(reversed(table)) if piece.color == PieceColor.WHITE else table
+                table = PIECE_SQUARE_TABLES[piece_type]
+                score += table[7 - i if color == PieceColor.WHITE else i][j] * negative
 
-                score += table[i][j] * negative
+                bit = 1 << (i * 8 + j)
+                occupied |= bit
+                occupancy[color] |= bit
+                if piece_type == PieceType.PAWN:
+                    pawns[color] |= bit
+                elif piece_type != PieceType.KING:
+                    mobile_pieces.append((piece_type, color, i * 8 + j))
 
-        # TODO: doubled, blocked, isolated pawns
+        # pawn structure, cached since the pawns rarely change
+        pawn_score = self.pawn_table.probe(board.pawn_zobrist)
+        if pawn_score is None:
+            pawn_score = pawn_structure(pawns[PieceColor.WHITE], pawns[PieceColor.BLACK])
+            self.pawn_table.store(board.pawn_zobrist, pawn_score)
+        score += pawn_score
 
         # calculate mobility
-        white_mobility = len(list(board.legal_moves()))
-        # change active color to other and find legal moves
-        board.active_color = PieceColor.BLACK if board.active_color == PieceColor.WHITE else PieceColor.WHITE
-        black_mobility = len(list(board.legal_moves()))
-        board.active_color = PieceColor.BLACK if board.active_color == PieceColor.WHITE else PieceColor.WHITE
+        if self.options['mobility'] == 'legal':
+            mobility = self.legal_mobility(board)
+        else:
+            mobility = attack_mobility(mobile_pieces, occupied, occupancy, pawns)
 
-        score += 0.1 * (white_mobility - black_mobility)
+        score += self.MOBILITY_WEIGHT * mobility
 
         who_to_move = -1 if board.active_color == PieceColor.BLACK else 1
         return score * who_to_move
 
-    def negamax(self, board: chess.Board, depth: int, alpha: float, beta: float) -> float:
-        if depth == 0:
+    def _network(self):
+        """Returns the evaluation network, loading it if the nnue_file option changed."""
+
+        if self.network is None or self.network_file != self.options['nnue_file']:
+            from .nnue import Network
+
+            self.network = Network.load(self.options['nnue_file'])
+            self.network_file = self.options['nnue_file']
+
+        return self.network
+
+    def _book_move(self, board: chess.Board) -> Optional[Move]:
+        """Returns a move from the opening book, opening it if the book_file option changed.
+
+        The book isn't used by helpers or when searching for more than one line.
+        """
+
+        path = self.options['book_file']
+        if not path or self.helper_id is not None or (self.multipv or self.options['multipv']) > 1:
+            return None
+
+        if self.book is None or self.book.path != path:
+            from chess.book import Book
+
+            if self.book is not None:
+                self.book.close()
+            self.book = Book(path)
+
+        return self.book.choose(board)
+
+    def legal_mobility(self, board: chess.Board) -> int:
+        """Returns white's legal move count minus black's.
+
+        The side not to move is counted by temporarily passing the turn,
+        and the board is restored afterwards.
+        """
+
+        active_color = board.active_color
+        en_passant_square = board.en_passant_square
+        other_color = PieceColor.BLACK if active_color == PieceColor.WHITE else PieceColor.WHITE
+
+        mobility = {active_color: len(list(board.legal_moves()))}
+
+        board.active_color = other_color
+        board.en_passant_square = None
+        try:
+            mobility[other_color] = len(list(board.legal_moves()))
+        finally:
+            board.active_color = active_color
+            board.en_passant_square = en_passant_square
+
+        return mobility[PieceColor.WHITE] - mobility[PieceColor.BLACK]
+
+    def _has_non_pawn_material(self, board: chess.Board) -> bool:
+        """Returns whether the side to move has a piece other than pawns and its king."""
+
+        for row in board.rows:
+            for piece in row:
+                if (
+                    piece
+                    and piece.color == board.active_color
+                    and piece.type not in (PieceType.PAWN, PieceType.KING)
+                ):
+                    return True
+
+        return False
+
+    def _score_move(self, board: chess.Board, move: Move, ply: int, pv_move: Optional[Move], hash_move_id: int = 0) -> int:
+        """Returns a score used to order a move. Higher scores are searched first."""
+
+        if pv_move is not None and move == pv_move:
+            return 1 << 30
+
+        if hash_move_id and move.id == hash_move_id:
+            return 1 << 29
+
+        if move.capture:
+            # most valuable victim, least valuable attacker
+            attacker = board.get(move.from_square)
+            score = 10 * self.PIECE_SCORES[move.capture.type] - self.PIECE_SCORES[attacker.type]
+            if self.options['see'] and self._is_losing_capture(board, move):
+                return score - (1 << 20)
+            return (1 << 20) + score
+
+        if move.promotion:
+            return (1 << 20) + self.PIECE_SCORES[move.promotion.type]
+
+        move_id = move.id
+        if move_id in self.killers[ply]:
+            return 1 << 19
+
+        score = self.history[board.active_color].get(move_id, 0)
+        if self.ordering_noise:
+            score += self.ordering_noise.randrange(16)
+        return score
+
+    def _is_losing_capture(self, board: chess.Board, move: Move) -> bool:
+        """Returns whether a capture loses material by static exchange evaluation."""
+
+        # taking something worth at least the capturing piece can't lose material
+        if SEE_VALUES[move.capture.type] >= SEE_VALUES[board.get(move.from_square).type]:
+            return False
+        return not board.see_ge(move)
+
+    def ordered_moves(
+            self,
+            board: chess.Board,
+            ply: int,
+            pv_move: Optional[Move] = None,
+            captures_only: bool = False,
+            hash_move_id: int = 0
+    ) -> 'list[Move]':
+        """Returns the pseudo-legal moves on the board, best candidates first."""
+
+        moves = board.pseudo_legal_moves()
+        if captures_only:
+            moves = [move for move in moves if move.capture or move.promotion]
+        else:
+            moves = list(moves)
+
+        moves.sort(key=lambda move: self._score_move(board, move, ply, pv_move, hash_move_id), reverse=True)
+        return moves
+
+    def _store_cutoff(self, board: chess.Board, move: Move, depth: int, ply: int):
+        """Remembers a quiet move that caused a beta cutoff."""
+
+        if move.capture or move.promotion:
+            return
+
+        move_id = move.id
+        killers = self.killers[ply]
+        if killers[0] != move_id:
+            killers[1] = killers[0]
+            killers[0] = move_id
+
+        history = self.history[board.active_color]
+        history[move_id] = history.get(move_id, 0) + depth * depth
+
+    def quiescence(self, board: chess.Board, alpha: float, beta: float, ply: int) -> float:
+        """Searches captures until the position is quiet, so leaves aren't scored mid-exchange."""
+
+        self.nodes += 1
+        stats.count('qs_nodes')
+
+        stand_pat = self.evaluate(board)
+        if stand_pat >= beta or ply >= self.MAX_PLY:
+            return stand_pat
+        if stand_pat > alpha:
+            alpha = stand_pat
+
+        best_score = stand_pat
+        color = board.active_color
+        see = self.options['see']
+
+        for move in self.ordered_moves(board, ply, captures_only=True):
+            # the side to move could stand pat instead of losing material
+            if see and move.capture and not move.promotion and self._is_losing_capture(board, move):
+                continue
+
+            board.make_move(move)
+            if board.is_in_check(color):
+                board.unmake_move(move)
+                continue
+
+            try:
+                score = -self.quiescence(board, -beta, -alpha, ply + 1)
+            finally:
+                board.unmake_move(move)
+
+            if score > best_score:
+                best_score = score
+                if score > alpha:
+                    alpha = score
+                    if alpha >= beta:
+                        break
+
+        return best_score
+
+    def _score_to_tt(self, score: float, ply: int) -> float:
+        """Converts a mate score from distance-from-root to distance-from-this-node."""
+
+        if score >= self.MATE_LOWER:
+            return score + ply
+        if score <= -self.MATE_LOWER:
+            return score - ply
+        return score
+
+    def _score_from_tt(self, score: float, ply: int) -> float:
+        if score >= self.MATE_LOWER:
+            return score - ply
+        if score <= -self.MATE_LOWER:
+            return score + ply
+        return score
+
+    def negamax(self, board: chess.Board, depth: int, alpha: float, beta: float, ply: int = 0, allow_null: bool = True) -> float:
+        self.pv_table[ply] = []
+
+        if depth <= 0 or ply >= self.MAX_PLY:
+            if self.options['quiescence']:
+                return self.quiescence(board, alpha, beta, ply)
+            self.nodes += 1
+            stats.count('nodes')
             return self.evaluate(board)
 
+        self.nodes += 1
+        stats.count('nodes')
+        if not self.nodes & self.STOP_CHECK_MASK:
+            self._check_limits()
+
+        is_pv_node = beta - alpha > 1
+        original_alpha = alpha
+
+        # transposition table
+        key = board.zobrist
+        hash_move_id = 0
+        entry = self.tt.probe(key)
+        stats.count('tt_probes')
+        if entry:
+            self.tt_hits += 1
+            stats.count('tt_hits')
+            entry_depth, entry_score, bound, hash_move_id = entry
+            entry_score = self._score_from_tt(entry_score, ply)
+            if ply and not is_pv_node and entry_depth >= depth and (
+                bound == Bound.EXACT
+                or bound == Bound.LOWER and entry_score >= beta
+                or bound == Bound.UPPER and entry_score <= alpha
+            ):
+                stats.count('tt_cutoffs')
+                return entry_score
+
+        color = board.active_color
+        in_check = board.is_in_check()
+        not_mated = abs(alpha) < self.MATE_LOWER and abs(beta) < self.MATE_LOWER
+
+        static_eval: Optional[float] = None
+        if not in_check and ply and (
+            self.options['null_move']
+            or self.options['futility'] and depth <= len(self.FUTILITY_MARGINS)
+            or self.options['reverse_futility'] and depth <= self.REVERSE_FUTILITY_DEPTH
+        ):
+            static_eval = self.evaluate(board)
+
+        # reverse futility pruning
+        # near the leaves, a static eval far above beta is very unlikely to drop below it
+        if (
+            self.options['reverse_futility']
+            and static_eval is not None
+            and not is_pv_node
+            and not_mated
+            and depth <= self.REVERSE_FUTILITY_DEPTH
+            and static_eval - self.REVERSE_FUTILITY_MARGIN * depth >= beta
+        ):
+            return static_eval - self.REVERSE_FUTILITY_MARGIN * depth
+
+        # null-move pruning
+        # give the opponent a free move. if we still beat beta, this node is almost certainly a cutoff.
+        # skipped in check, after another null move, near mate scores and
+        # when only pawns are left, since those are the usual zugzwang positions
+        if (
+            self.options['null_move']
+            and allow_null
+            and static_eval is not None
+            and depth >= self.NULL_MOVE_MIN_DEPTH
+            and abs(beta) < self.MATE_LOWER
+            and static_eval >= beta
+            and self._has_non_pawn_material(board)
+        ):
+            reduction = self.NULL_MOVE_REDUCTION + (1 if depth > 6 else 0)
+            board.make_null_move()
+            try:
+                score = -self.negamax(board, depth - 1 - reduction, -beta, -beta + 1, ply + 1, allow_null=False)
+            finally:
+                board.unmake_null_move()
+
+            if score >= beta:
+                return beta
+
+        # futility pruning
+        # near the leaves, quiet moves can't make up a static eval far below alpha
+        futility_score: Optional[float] = None
+        if (
+            self.options['futility']
+            and static_eval is not None
+            and not_mated
+            and depth <= len(self.FUTILITY_MARGINS)
+            and static_eval + self.FUTILITY_MARGINS[depth - 1] <= alpha
+        ):
+            futility_score = static_eval + self.FUTILITY_MARGINS[depth - 1]
+
+        following_pv = self.following_pv
+        pv_move = None
+        if following_pv and ply < len(self.previous_pv):
+            pv_move = self.previous_pv[ply]
+
         best_score = self.MATE_UPPER * -1
+        best_move: Optional[Move] = None
+        legal_moves = 0
+        excluded = self.excluded_root_moves if not ply else None
+
+        for move in self.ordered_moves(board, ply, pv_move, hash_move_id=hash_move_id):
+            if excluded and move.id in excluded:
+                continue
 
-        for move in board.legal_moves():
             board.make_move(move)
-            score = -self.negamax(board, depth - 1, alpha, beta)
-            board.unmake_move(move)
+            if board.is_in_check(color):
+                board.unmake_move(move)
+                continue
+
+            legal_moves += 1
+            is_quiet = not (move.capture or move.promotion)
+            gives_check: Optional[bool] = None
+
+            if futility_score is not None and legal_moves > 1 and is_quiet:
+                gives_check = board.is_in_check()
+                if not gives_check:
+                    board.unmake_move(move)
+                    if futility_score > best_score:
+                        best_score = futility_score
+                    continue
+
+            self.following_pv = pv_move is not None and move == pv_move
+
+            # late move reductions
+            # well-ordered late quiet moves rarely turn out best, so search them shallower first
+            reduction = 0
+            if (
+                self.options['lmr']
+                and depth >= self.LMR_MIN_DEPTH
+                and legal_moves > self.LMR_MIN_MOVES
+                and is_quiet
+                and not in_check
+                and move.id not in self.killers[ply]
+            ):
+                if gives_check is None:
+                    gives_check = board.is_in_check()
+                if not gives_check:
+                    reduction = LMR_TABLE[min(depth, LMR_TABLE_SIZE - 1)][min(legal_moves, LMR_TABLE_SIZE - 1)]
+                    reduction = min(reduction, depth - 2)
+
+            try:
+                if legal_moves == 1:
+                    score = -self.negamax(board, depth - 1, -beta, -alpha, ply + 1)
+                elif self.options['pvs']:
+                    # principal variation search:
+                    # prove the move is worse than the best one with a null window,
+                    # and only pay for a full window when that fails
+                    score = -self.negamax(board, depth - 1 - reduction, -alpha - 1, -alpha, ply + 1)
+                    if reduction and score > alpha:
+                        score = -self.negamax(board, depth - 1, -alpha - 1, -alpha, ply + 1)
+                    if alpha < score < beta:
+                        score = -self.negamax(board, depth - 1, -beta, -alpha, ply + 1)
+                else:
+                    score = -self.negamax(board, depth - 1 - reduction, -beta, -alpha, ply + 1)
+                    if reduction and score > alpha:
+                        score = -self.negamax(board, depth - 1, -beta, -alpha, ply + 1)
+            finally:
+                board.unmake_move(move)
 
             if score > best_score:
                 best_score = score
 
             if best_score > alpha:
                 alpha = best_score
+                best_move = move
+                self.pv_table[ply] = [move] + self.pv_table[ply + 1]
+                if not ply:
+                    self.root_score = best_score
 
             if beta <= alpha:
-                return best_score
+                stats.count('beta_cutoffs')
+                if legal_moves == 1:
+                    stats.count('first_move_cutoffs')
+                self._store_cutoff(board, move, depth, ply)
+                break
+
+        self.following_pv = following_pv
+
+        if not legal_moves:
+            # checkmate or stalemate. prefer shorter mates
+            return -(self.MATE_UPPER - ply) if in_check else 0
+
+        if best_score >= beta:
+            bound = Bound.LOWER
+        elif best_score > original_alpha:
+            bound = Bound.EXACT
+        else:
+            bound = Bound.UPPER
+        # with root moves left out, the root's score isn't the position's
+        if not excluded:
+            self.tt.store(
+                key,
+                depth,
+                self._score_to_tt(best_score, ply),
+                bound,
+                best_move.id if best_move else hash_move_id
+            )
 
         return best_score
 
-    def negamax_root(self, board: chess.Board, depth: int) -> Move:
-        best_score: float = self.MATE_UPPER * -1
-        best_move: Optional[Move] = None
+    def negamax_root(self, board: chess.Board, depth: int, alpha: float = None, beta: float = None) -> float:
+        """Searches the board to a depth and returns the score.
+
+        The best line found is stored in ``self.pv``.
+        """
+
+        if alpha is None:
+            alpha = self.MATE_UPPER * -1
+        if beta is None:
+            beta = self.MATE_UPPER
+
+        self.following_pv = True
+        score = self.negamax(board, depth, alpha, beta)
+
+        # a search that failed low or high doesn't have a reliable line
+        if alpha < score < beta and self.pv_table[0]:
+            self.pv = self.pv_table[0]
+            self.previous_pv = self.pv
+
+        return score
+
+    def _aspiration_search(self, board: chess.Board, depth: int, previous_score: float) -> float:
+        """Searches with a narrow window around the previous iteration's score.
+
+        The window is widened on the side that failed until the score lands inside it.
+        """
+
+        alpha_delta = beta_delta = self.ASPIRATION_WINDOW
+
+        while True:
+            alpha = max(previous_score - alpha_delta, self.MATE_UPPER * -1)
+            beta = min(previous_score + beta_delta, self.MATE_UPPER)
+            score = self.negamax_root(board, depth, alpha, beta)
+
+            if score <= alpha and alpha > self.MATE_UPPER * -1:
+                alpha_delta *= 4
+            elif score >= beta and beta < self.MATE_UPPER:
+                beta_delta *= 4
+            else:
+                return score
+
+    def _prepare_tt(self):
+        """Creates the transposition table, or replaces it if its options changed."""
+
+        shared = self.options['threads'] > 1
+        wanted = SharedTranspositionTable if shared else TranspositionTable
+
+        if self.tt is not None and type(self.tt) is wanted and self.tt_size == self.options['hash']:
+            return
+
+        self._release()
+        self.tt = wanted(self.options['hash'])
+        self.tt_size = self.options['hash']
+
+    def _check_limits(self):
+        """Stops the search if it was told to stop or went past its limits.
+
+        The first iteration always goes on until it has a move to play,
+        unless the search is stopped.
+        """
+
+        if self.stop_event.is_set():
+            raise SearchStopped()
+
+        limits = self.limits
+        if limits.infinite or self.current_depth == 1 and not self.pv_table[0]:
+            return
+
+        if (
+            limits.depth and self.current_depth > limits.depth
+            or limits.nodes and self.nodes >= limits.nodes
+            or self.time_limit and time.perf_counter() - self.start_time >= self.time_limit
+        ):
+            raise SearchStopped()
+
+    def _iterate(self, board: chess.Board, info=None):
+        """Runs iterative deepening until it reaches its limits or is stopped."""
+
+        if self.options['evaluator'] == 'nnue':
+            # the network's accumulators follow the search's moves from here on
+            board.accumulator = self._network().accumulator(board)
+            try:
+                self._deepen(board, info)
+            finally:
+                board.accumulator = None
+        else:
+            self._deepen(board, info)
+
+    def _search_root(self, board: chess.Board, depth: int, previous_score: Optional[float]) -> float:
+        """Searches the root to a depth, around the previous iteration's score when there is one."""
+
+        if (
+            self.options['aspiration']
+            and previous_score is not None
+            and abs(previous_score) < self.MATE_LOWER
+        ):
+            return self._aspiration_search(board, depth, previous_score)
+        return self.negamax_root(board, depth)
+
+    def _deepen(self, board: chess.Board, info=None):
+        multipv = self.multipv or self.options['multipv']
+        # the previous iteration's score for each line
+        scores: 'list[float]' = []
+
+        for current_depth in range(1, self.MAX_PLY + 1):
+            limits = self.limits
+            if not limits.infinite and current_depth > 1 and (
+                limits.depth and current_depth > limits.depth
+                or limits.nodes and self.nodes >= limits.nodes
+                # the next iteration would most likely not finish in time
+                or self.time_limit and time.perf_counter() - self.start_time >= self.time_limit / 2
+            ):
+                break
+
+            self.current_depth = current_depth
+            depth_start = time.perf_counter()
+            lines = []
+            try:
+                for index in range(multipv):
+                    # each line after the first is the best one that doesn't start like the ones before it.
+                    # they share the table and move ordering, so they cost much less than the first
+                    self.excluded_root_moves = frozenset(line.pv[0].id for line in lines)
+                    score = self._search_root(board, current_depth, scores[index] if index < len(scores) else None)
+                    if index and not self.pv_table[0]:
+                        # there are fewer legal moves than lines
+                        break
+
+                    lines.append(SearchInfo(
+                        depth=current_depth,
+                        score=score,
+                        nodes=self.nodes,
+                        time=time.perf_counter() - self.start_time,
+                        pv=list(self.pv if not index else self.pv_table[0]),
+                        multipv=index + 1
+                    ))
+            except SearchStopped:
+                if lines:
+                    # the best line of this iteration is still the best move found
+                    self.pv = lines[0].pv
+                elif not self.iterations and self.pv_table[0] and not self.excluded_root_moves:
+                    # cut short partway through the first iteration,
+                    # the best root move so far is better than nothing
+                    self.pv = self.pv_table[0]
+                    self.iterations.append(SearchInfo(
+                        depth=current_depth,
+                        score=self.root_score,
+                        nodes=self.nodes,
+                        time=time.perf_counter() - self.start_time,
+                        pv=list(self.pv)
+                    ))
+                    self.lines = self.iterations[-1:]
+                break
+            finally:
+                self.excluded_root_moves = frozenset()
+
+            stats.time_depth(current_depth, time.perf_counter() - depth_start)
+
+            # a later line can come out ahead of an earlier one once it's been searched deeper
+            lines.sort(key=lambda line: line.score, reverse=True)
+            for index, line in enumerate(lines):
+                line.multipv = index + 1
+            scores = [line.score for line in lines]
+
+            self.pv = lines[0].pv
+            self.previous_pv = self.pv
+            self.lines = lines
+            self.iterations.append(lines[0])
+
+            if info:
+                for line in lines:
+                    info(line)
+
+    def new_game(self):
+        """Forgets everything learned from previous searches."""
+
+        self.pv = []
+        self.killers = [[None, None] for _ in range(self.MAX_PLY + 1)]
+        self.history = {PieceColor.WHITE: {}, PieceColor.BLACK: {}}
+        self.last_root = None
+
+        if self.tt is not None and self.helper_id is None:
+            self.tt.clear()
+        if self.helpers is not None:
+            self.helpers.new_game()
+
+    def _age_search_state(self, board: chess.Board):
+        """Carries the previous search's state over to a search of this board.
+
+        History scores are halved instead of cleared. If the game went on
+        from the last searched position, killers move up by the plies played,
+        and if the moves played are the start of the last PV the rest of it is
+        searched first.
+        """
+
+        for history in self.history.values():
+            for move_id, score in list(history.items()):
+                if score > 1:
+                    history[move_id] = score // 2
+                else:
+                    del history[move_id]
+
+        self.previous_pv = []
+        plies = 0
 
-        for move in board.legal_moves():
+        if self.last_root is not None:
+            last_history, last_zobrist = self.last_root
+            plies = len(board.move_history) - len(last_history)
+
+            if plies > 0:
+                # make sure the game went on from the last searched position, on a copy,
+                # since a board set up from a FEN can start with a move that was never made
+                continued = board.move_history[:len(last_history)] == last_history
+                if continued:
+                    played = board.move_history[len(last_history):]
+                    start = board.copy()
+                    for move in reversed(played):
+                        start.unmake_move(move)
+                    continued = start.zobrist == last_zobrist
+
+                if not continued:
+                    plies = 0
+                elif self.pv[:plies] == played:
+                    self.previous_pv = self.pv[plies:]
+            elif not plies and board.move_history == last_history and board.zobrist == last_zobrist:
+                self.previous_pv = self.pv
+
+        if plies > 0:
+            self.killers = self.killers[plies:] + [[None, None] for _ in range(plies)]
+        elif not self.previous_pv:
+            self.killers = [[None, None] for _ in range(self.MAX_PLY + 1)]
+
+        self.last_root = (list(board.move_history), board.zobrist)
+
+    def _search(self, board: chess.Board, limits: Optional[Limits], info=None) -> 'list[SearchInfo]':
+        """Runs an iterative deepening search until it reaches its limits.
+
+        The limits default to the engine's depth option.
+        The transposition table, history scores and the rest of the
+        previous principal variation are reused from earlier searches.
+
+        ``info`` is called with a SearchInfo every time an iteration completes.
+        Returns information about each completed iteration.
+
+        Positions in the opening book aren't searched, the book move is
+        returned straight away as a depth 0 iteration without a score.
+        """
+
+        book_move = self._book_move(board)
+        if book_move is not None:
+            result = SearchInfo(depth=0, score=None, nodes=0, time=0.0, pv=[book_move])
+            self.pv = [book_move]
+            self.iterations = [result]
+            self.lines = [result]
+            if info:
+                info(result)
+            return self.iterations
+
+        self.limits = limits or Limits(depth=self.options['depth'])
+        self.root_color = board.active_color
+        self.time_limit = self.limits.move_time(self.root_color)
+        self.start_time = time.perf_counter()
+        self.current_depth = 0
+        self.nodes = 0
+        self.moves_evaluated = 0
+        self.tt_hits = 0
+        self._age_search_state(board)
+        self.pv = []
+        self.pv_table = [[] for _ in range(self.MAX_PLY + 1)]
+        self.root_score = None
+        self.iterations = []
+        self.lines = []
+
+        if self.helper_id is None:
+            self._prepare_tt()
+            self.tt.new_search()
+
+        if self.options['threads'] > 1:
+            from .smp import HelperPool
+
+            if self.helpers is not None and self.helpers.options != self.options:
+                self.helpers.close()
+                self.helpers = None
+            if self.helpers is None:
+                self.helpers = HelperPool(self.options['threads'] - 1, self.options, self.tt.name)
+
+            self.helpers.start(board, self.limits.depth, self.tt.generation)
+            try:
+                self._iterate(board, info)
+            finally:
+                reports = self.helpers.stop()
+
+            self._use_helper_reports(board, reports)
+        else:
+            self._iterate(board, info)
+
+        return self.iterations
+
+    def _use_helper_reports(self, board: chess.Board, reports: list):
+        """Adopts the deepest completed iteration reported by a helper, if it beats ours."""
+
+        depth = self.iterations[-1].depth if self.iterations else 0
+
+        for helper_depth, score, nodes, pv_ids in reports:
+            self.nodes += nodes
+            if helper_depth is None or helper_depth <= depth:
+                continue
+
+            pv = self._line_from_ids(board, pv_ids)
+            if not pv:
+                continue
+
+            depth = helper_depth
+            self.pv = pv
+            self.iterations.append(SearchInfo(
+                depth=helper_depth,
+                score=score,
+                nodes=self.nodes,
+                time=self.iterations[-1].time if self.iterations else 0,
+                pv=list(pv)
+            ))
+
+    def _line_from_ids(self, board: chess.Board, move_ids: 'list[int]') -> 'list[Move]':
+        """Turns a line of Move.id values back into moves, stopping at the first illegal one."""
+
+        line = []
+        for move_id in move_ids:
+            move = board.move_from_id(move_id)
+            if move is None:
+                break
             board.make_move(move)
-            score = -self.negamax(board, depth - 1, self.MATE_UPPER * -1, self.MATE_UPPER)
+            line.append(move)
+
+        for move in reversed(line):
             board.unmake_move(move)
 
-            if score > best_score:
-                best_score = score
-                best_move = move
+        return line
+
+    def get_move(self, board: chess.Board, limits: Limits = None):
+        self.search(board, limits)
+        return self.pv[0]
+
+    def analyse(self, board: chess.Board, multipv: int = 1, limits: Limits = None, info=None) -> 'list[SearchInfo]':
+        """Searches the board for its best lines and returns them, best first.
+
+        Every iteration searches the best line, then the best line that starts
+        with a different move, and so on until it has ``multipv`` of them.
+        Returns the lines of the deepest completed iteration, which may be
+        fewer than ``multipv`` if there aren't that many legal moves.
+        ``info`` is called with a SearchInfo for each line of each iteration.
+        """
+
+        self.multipv = multipv
+        try:
+            self.search(board, limits, info)
+        finally:
+            self.multipv = None
+
+        return self.lines
+
+    def ponderhit(self, limits: Limits):
+        """Gives a running (pondering) search new limits, counted from now.
+
+        This is used when the opponent plays the move the engine was pondering on,
+        so the search can carry on instead of starting over.
+        """
+
+        self.start_time = time.perf_counter()
+        self.time_limit = limits.move_time(self.root_color)
+        self.limits = limits
+
+    def wait(self) -> Optional[Move]:
+        """Waits for a background search and returns its best move."""
+
+        if self.search_thread is not None:
+            self.search_thread.join()
+            self.search_thread = None
+
+        # a search that raised never set last_search, and can have left any PV behind
+        return self.pv[0] if self.last_search and self.pv else None
+
+    def close(self):
+        self.stop()
+        self.wait()
+        self._release()
+
+        if self.book is not None:
+            self.book.close()
+            self.book = None
+
+    def _release(self):
+        """Shuts down the helper processes and frees the transposition table."""
+
+        if self.helpers is not None:
+            self.helpers.close()
+            self.helpers = None
+
+        if self.tt is not None:
+            self.tt.close()
+            self.tt = None
 
-        assert best_move
-        return best_move
 
-    def get_move(self, board: chess.Board):
-        self.counter = 0
-        best_move = self.negamax_root(board, depth=3)
-        return best_move
+class SearchStopped(Exception):
+    """Raised inside a search to unwind it once it has been told to stop."""
@@ -0,0 +1,134 @@
+"""Pawn structure evaluation.
+
+The pawn terms only depend on where the pawns are, which rarely changes
+during a search, so their scores are cached in a PawnHashTable keyed by
+Board.pawn_zobrist.
+
+The terms are counted for each side and then subtracted, White minus Black:
+
+doubled -- pawns behind another pawn of the same color on their file
+isolated -- pawns with no pawn of the same color on a neighbouring file
+blocked -- pawns with a pawn of either color right in front of them
+passed -- pawns with no pawn in front of them on their file and no enemy pawn in
+    front of them on a neighbouring file, counted separately for each rank
+    from the pawn's own side
+
+Only pawns are looked at, so a pawn blocked by a piece doesn't count as blocked.
+"""
+
+from typing import Optional
+
+from chess import bitboard
+from chess.piece import PieceColor
+
+
+# centipawns for each term in the order pawn_terms returns them:
+# doubled, isolated, blocked, then passed on the second to seventh ranks
+PAWN_WEIGHTS = (-15, -12, -8, 5, 10, 20, 35, 60, 100)
+
+PAWN_TERMS = len(PAWN_WEIGHTS)
+
+FILES = tuple(bitboard.FILE_A << column for column in range(8))
+ADJACENT_FILES = tuple(
+    (FILES[column - 1] if column > 0 else 0) | (FILES[column + 1] if column < 7 else 0)
+    for column in range(8)
+)
+
+
+def _passed_masks(color: int) -> 'tuple[int, ...]':
+    # the squares in front of each square, on its own and the neighbouring files
+    masks = []
+    for index in range(64):
+        row, column = divmod(index, 8)
+        rows = range(row + 1, 8) if color == PieceColor.WHITE else range(row)
+        in_front = 0
+        for r in rows:
+            in_front |= 0xFF << (r * 8)
+        masks.append(in_front & (FILES[column] | ADJACENT_FILES[column]))
+    return tuple(masks)
+
+
+PASSED_MASKS = {color: _passed_masks(color) for color in (PieceColor.WHITE, PieceColor.BLACK)}
+
+
+def _side_terms(pawns: int, enemy_pawns: int, color: int) -> 'list[int]':
+    terms = [0] * PAWN_TERMS
+
+    for column in range(8):
+        count = bitboard.popcount(pawns & FILES[column])
+        if count > 1:
+            terms[0] += count - 1
+        if count and not pawns & ADJACENT_FILES[column]:
+            terms[1] += count
+
+    if color == PieceColor.WHITE:
+        in_front = (pawns << 8) & bitboard.FULL
+    else:
+        in_front = pawns >> 8
+    terms[2] = bitboard.popcount(in_front & (pawns | enemy_pawns))
+
+    passed_masks = PASSED_MASKS[color]
+    for index in bitboard.iter_squares(pawns):
+        in_front = passed_masks[index]
+        # a pawn behind one of its own counts as doubled, not passed
+        if not in_front & enemy_pawns and not in_front & FILES[index & 7] & pawns:
+            row = index >> 3
+            relative_row = row if color == PieceColor.WHITE else 7 - row
+            # pawns are always on the second to seventh ranks
+            terms[2 + relative_row] += 1
+
+    return terms
+
+
+def pawn_terms(white_pawns: int, black_pawns: int) -> 'list[int]':
+    """Returns the pawn terms of two pawn bitboards, White's counts minus Black's."""
+
+    white = _side_terms(white_pawns, black_pawns, PieceColor.WHITE)
+    black = _side_terms(black_pawns, white_pawns, PieceColor.BLACK)
+    return [w - b for w, b in zip(white, black)]
+
+
+def pawn_structure(white_pawns: int, black_pawns: int) -> int:
+    """Returns the pawn structure score in centipawns, from White's side."""
+
+    return sum(weight * term for weight, term in zip(PAWN_WEIGHTS, pawn_terms(white_pawns, black_pawns)))
+
+
+class PawnHashTable:
+    """A fixed-size cache of pawn structure scores, keyed by pawn Zobrist key.
+
+    Each key has one slot, and a new score always replaces the one in its slot.
+    """
+
+    def __init__(self, entries: int = 1 << 14):
+        size = 1 << max(entries.bit_length() - 1, 0)
+        self.mask = size - 1
+        self.keys: 'list[Optional[int]]' = [None] * size
+        self.scores = [0] * size
+
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return self.mask + 1
+
+    def probe(self, key: int) -> Optional[int]:
+        """Returns the score stored for a key, if there is one."""
+
+        index = key & self.mask
+        if self.keys[index] == key:
+            self.hits += 1
+            return self.scores[index]
+        self.misses += 1
+        return None
+
+    def store(self, key: int, score: int):
+        index = key & self.mask
+        self.keys[index] = key
+        self.scores[index] = score
+
+    def clear(self):
+        self.keys = [None] * len(self)
+        self.scores = [0] * len(self)
+        self.hits = 0
+        self.misses = 0
@@ -1,7 +1,7 @@
 import random
 
 import chess
-from .base import Engine
+from .base import Engine, Limits
 
 
 class RandomEngine(Engine):
@@ -10,6 +10,6 @@ class RandomEngine(Engine):
     Yeah, I know it's dumb.
     """
 
-    def get_move(self, board: chess.Board):
+    def get_move(self, board: chess.Board, limits: Limits = None):
         legal_moves = list(board.legal_moves())
         return random.choice(legal_moves)
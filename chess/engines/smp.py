@@ -0,0 +1,162 @@
+"""Lazy SMP helper processes for OysterEngine.
+
+Every helper runs its own iterative deepening search on the same root.
+The helpers and the main search share one transposition table in shared memory,
+so each of them keeps finding the others' results and the main search
+effectively gets deeper. Helpers alternate between the requested depth and one
+ply deeper, and shuffle their quiet moves a little, so they don't all walk the
+same tree in lockstep.
+
+Processes are used instead of threads because the search is pure Python.
+"""
+
+import multiprocessing
+import queue
+import random
+import time
+import traceback
+from typing import Optional
+
+import chess
+from .base import Limits
+
+
+# seconds the main search waits for helpers to report once it stops them
+STOP_TIMEOUT = 5.0
+REPORT_POLL_INTERVAL = 0.1
+
+
+def _helper_main(helper_id: int, options: dict, tt_name: str, jobs, reports, stop_event):
+    from .oyster import OysterEngine
+    from .transposition import SharedTranspositionTable
+
+    # a helper that fails still reports on every search, so the main search never waits on it
+    try:
+        engine = OysterEngine(**dict(options, threads=1, multipv=1))
+        engine.tt = SharedTranspositionTable(name=tt_name)
+        engine.stop_event = stop_event
+        engine.helper_id = helper_id
+        engine.ordering_noise = random.Random(helper_id)
+    except Exception:
+        traceback.print_exc()
+        engine = None
+
+    try:
+        while True:
+            job = jobs.get()
+            if job is None:
+                break
+
+            if job == 'new_game':
+                if engine is not None:
+                    engine.new_game()
+                continue
+
+            board, depth, generation, search = job
+            if engine is None:
+                reports.put((helper_id, search, None, None, 0, []))
+                continue
+
+            engine.tt.generation = generation
+            try:
+                # helpers don't have limits of their own, they run until the main search stops them
+                engine.search(board, Limits(depth=depth + helper_id % 2 if depth else None))
+            except Exception:
+                traceback.print_exc()
+                reports.put((helper_id, search, None, None, engine.nodes, []))
+                continue
+
+            if engine.iterations:
+                last = engine.iterations[-1]
+                reports.put((helper_id, search, last.depth, last.score, engine.nodes, [move.id for move in last.pv]))
+            else:
+                reports.put((helper_id, search, None, None, engine.nodes, []))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if engine is not None:
+            engine.tt.close()
+
+
+class HelperPool:
+    """A set of helper processes searching alongside the main search."""
+
+    def __init__(self, size: int, options: dict, tt_name: str):
+        context = multiprocessing.get_context()
+        self.options = dict(options)
+        self.stop_event = context.Event()
+        self.reports = context.Queue()
+        self.jobs = []
+        self.processes = []
+        # counts searches, so reports can be matched to the search they're for
+        self.search = 0
+
+        for helper_id in range(1, size + 1):
+            jobs = context.Queue()
+            process = context.Process(
+                target=_helper_main,
+                args=(helper_id, options, tt_name, jobs, self.reports, self.stop_event),
+                daemon=True
+            )
+            process.start()
+            self.jobs.append(jobs)
+            self.processes.append(process)
+
+    def start(self, board: chess.Board, depth: Optional[int], generation: int):
+        """Starts every helper searching a board."""
+
+        self.stop_event.clear()
+        self.search += 1
+        for jobs in self.jobs:
+            jobs.put((board, depth, generation, self.search))
+
+    def new_game(self):
+        """Makes every helper forget what it learned from previous searches."""
+
+        for jobs in self.jobs:
+            jobs.put('new_game')
+
+    def stop(self) -> 'list[tuple]':
+        """Stops the helpers and waits for them.
+
+        Returns ``(depth, score, nodes, pv_ids)`` for each helper's deepest
+        completed iteration. Helpers that have died, or haven't reported within
+        STOP_TIMEOUT seconds, are left out.
+        """
+
+        self.stop_event.set()
+        reports = {}
+        deadline = time.monotonic() + STOP_TIMEOUT
+
+        while len(reports) < len(self.processes):
+            try:
+                report = self.reports.get(timeout=REPORT_POLL_INTERVAL)
+            except queue.Empty:
+                if time.monotonic() > deadline:
+                    break
+                # a dead helper's report would already be in the queue
+                waiting = [
+                    process for helper_id, process in enumerate(self.processes, 1)
+                    if helper_id not in reports
+                ]
+                if not any(process.is_alive() for process in waiting):
+                    break
+                continue
+
+            # a report that came in too late for an earlier search is dropped
+            if report[1] == self.search:
+                reports[report[0]] = report[2:]
+
+        return [reports[helper_id] for helper_id in sorted(reports)]
+
+    def close(self):
+        """Shuts down the helper processes."""
+
+        self.stop_event.set()
+        for jobs in self.jobs:
+            jobs.put(None)
+
+        for process in self.processes:
+            process.join(timeout=5)
+            if process.is_alive():
+                process.terminate()
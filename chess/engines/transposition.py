@@ -0,0 +1,141 @@
+import struct
+from multiprocessing import shared_memory
+from typing import Optional
+
+
+class Bound:
+    EXACT = 1
+    LOWER = 2
+    UPPER = 3
+
+
+_float = struct.Struct('<f')
+
+
+class TranspositionTable:
+    """A fixed-size hash table of search results, keyed by Zobrist key.
+
+    Each entry is two unsigned 64-bit words stored in a flat buffer:
+    the data word, and the key XORed with the data word.
+    A probe only accepts an entry when the two words agree, so an entry
+    that was half-written by another process reads as a miss instead of
+    as someone else's result.
+
+    Entries are kept between searches. Each one is stamped with the
+    generation of the search that stored it, and entries from older
+    generations are the first to be replaced.
+
+    Data word layout:
+    bits 0-15  -- Move.id of the best move
+    bits 16-23 -- depth
+    bits 24-25 -- Bound
+    bits 26-31 -- generation
+    bits 32-63 -- score as a 32-bit float
+    """
+
+    ENTRY_SIZE = 16
+    GENERATIONS = 64
+
+    def __init__(self, size_mb: int = 16, *, buffer=None):
+        if buffer is None:
+            entries = 1 << max((size_mb * 1024 * 1024 // self.ENTRY_SIZE).bit_length() - 1, 0)
+            buffer = bytearray(entries * self.ENTRY_SIZE)
+
+        self.buffer = buffer
+        self.words = memoryview(buffer).cast('Q')
+        self.mask = len(self.words) // 2 - 1
+        self.generation = 0
+
+    def __len__(self) -> int:
+        return self.mask + 1
+
+    def clear(self):
+        """Removes every entry."""
+
+        raw = self.words.cast('B')
+        raw[:] = bytes(len(raw))
+        raw.release()
+        self.generation = 0
+
+    def new_search(self):
+        """Ages every stored entry by one generation."""
+
+        self.generation = (self.generation + 1) % self.GENERATIONS
+
+    def probe(self, key: int) -> 'Optional[tuple[int, float, int, int]]':
+        """Returns ``(depth, score, bound, move_id)`` for a key, if stored."""
+
+        index = (key & self.mask) * 2
+        data = self.words[index]
+        if not data or self.words[index + 1] ^ data != key:
+            return None
+
+        score = _float.unpack((data >> 32).to_bytes(4, 'little'))[0]
+        return (data >> 16) & 0xFF, score, (data >> 24) & 0b11, data & 0xFFFF
+
+    def store(self, key: int, depth: int, score: float, bound: int, move_id: int = 0):
+        """Stores a search result for a key.
+
+        An entry stored by an earlier search is always replaced.
+        An entry from the current search is only replaced by a result
+        that is at least as deep.
+        """
+
+        index = (key & self.mask) * 2
+        old_data = self.words[index]
+        if (
+            old_data
+            and (old_data >> 26) & 0b111111 == self.generation
+            and (old_data >> 16) & 0xFF > depth
+        ):
+            return
+
+        score_bits = int.from_bytes(_float.pack(score), 'little')
+        data = (
+            score_bits << 32
+            | self.generation << 26
+            | bound << 24
+            | min(max(depth, 0), 0xFF) << 16
+            | move_id
+        )
+        self.words[index] = data
+        self.words[index + 1] = key ^ data
+
+    def close(self):
+        self.words.release()
+
+
+class SharedTranspositionTable(TranspositionTable):
+    """A TranspositionTable in shared memory, so several processes can search with it.
+
+    The process that creates the table owns it and unlinks the memory on close.
+    Other processes attach to it by name.
+    """
+
+    def __init__(self, size_mb: int = 16, *, name: str = None):
+        if name is None:
+            entries = 1 << max((size_mb * 1024 * 1024 // self.ENTRY_SIZE).bit_length() - 1, 0)
+            self.shared_memory = shared_memory.SharedMemory(create=True, size=entries * self.ENTRY_SIZE)
+            self.owner = True
+        else:
+            self.shared_memory = shared_memory.SharedMemory(name=name)
+            self.owner = False
+
+        # shared memory can be rounded up to a page, so only use what was asked for
+        size = self.shared_memory.size
+        entries = 1 << max((size // self.ENTRY_SIZE).bit_length() - 1, 0)
+        super().__init__(buffer=self.shared_memory.buf[:entries * self.ENTRY_SIZE])
+
+        if self.owner:
+            self.clear()
+
+    @property
+    def name(self) -> str:
+        return self.shared_memory.name
+
+    def close(self):
+        super().close()
+        self.buffer.release()
+        self.shared_memory.close()
+        if self.owner:
+            self.shared_memory.unlink()
@@ -0,0 +1,258 @@
+"""Running EPD test suites.
+
+Every line of an EPD file is a position (the first four FEN fields)
+followed by operations, each an opcode and its operands ended by a
+semicolon::
+
+    1k1r4/pp1b1R2/3q2pp/4p3/2B5/4Q3/PPP2B2/2K5 b - - bm Qd1+; id "BK.01";
+
+The opcodes used here are ``bm`` (the best moves, any of which solves the
+position), ``am`` (moves to avoid), ``id`` (the position's name) and ``acd``
+(a search depth, used for the position when the run doesn't set a depth).
+Others are kept but ignored.
+
+A suite is run by searching every position with an engine, across a
+process pool. Each position's report says whether it was solved, how long
+the engine took to settle on a solving move, and the nodes and speed of the
+search, so runs from different commits can be compared for both strength
+and speed.
+
+Engines are given as specs, as in chess.match.
+
+Usage:
+    python -m chess.epd suite.epd --movetime 1 --json report.json
+    python -m chess.epd suite.epd --engine oyster:lmr=false --depth 5
+"""
+
+import argparse
+import concurrent.futures
+import json
+import os
+import shlex
+import time
+from typing import NamedTuple, Optional
+
+import chess
+from chess import errors
+from chess.engines import Limits
+from chess.match import parse_engine
+from chess.move import Move
+
+
+class EPD(NamedTuple):
+    """A parsed EPD line.
+
+    operations -- the operands of each opcode, in the order they were given
+    """
+
+    fen: str
+    operations: 'dict[str, list[str]]'
+
+    @property
+    def id(self) -> Optional[str]:
+        operands = self.operations.get('id')
+        return operands[0] if operands else None
+
+    @property
+    def depth(self) -> Optional[int]:
+        operands = self.operations.get('acd')
+        return int(operands[0]) if operands else None
+
+    def board(self) -> chess.Board:
+        return chess.Board.from_fen(self.fen)
+
+    def moves(self, opcode: str) -> 'list[Move]':
+        """Returns the moves given as SAN operands of an opcode, like ``bm`` or ``am``."""
+
+        board = self.board()
+        return [board.parse_san(san, strict=True) for san in self.operations.get(opcode, [])]
+
+
+def parse_epd(line: str) -> EPD:
+    """Parses an EPD line.
+
+    The move counters come from the ``hmvc`` and ``fmvn`` operations, if it has them.
+    """
+
+    fields = line.split(None, 4)
+    if len(fields) < 4:
+        raise errors.InvalidFEN()
+
+    operations: 'dict[str, list[str]]' = {}
+    rest = fields[4] if len(fields) > 4 else ''
+    # shlex keeps quoted operands, like id "BK.01", together
+    lexer = shlex.shlex(rest, posix=True)
+    lexer.whitespace_split = True
+    lexer.whitespace = ' \t\r\n'
+    lexer.commenters = ''
+    operation: 'list[str]' = []
+
+    for token in lexer:
+        operation.append(token.rstrip(';'))
+        if token.endswith(';'):
+            operation = [operand for operand in operation if operand]
+            if operation:
+                operations[operation[0]] = operation[1:]
+            operation = []
+    if operation:
+        operations[operation[0]] = operation[1:]
+
+    halfmoves = operations.get('hmvc', ['0'])[0]
+    fullmoves = operations.get('fmvn', ['1'])[0]
+    fen = ' '.join(fields[:4] + [halfmoves, fullmoves])
+
+    return EPD(fen, operations)
+
+
+def solve(number: int, line: str, spec: str, limits: dict) -> dict:
+    """Searches one EPD position and returns its report.
+
+    The time to solution is when the engine last switched to a solving move
+    and stayed with it, which is None if the position wasn't solved.
+
+    This runs in a worker process, so everything it takes and returns can be pickled.
+    """
+
+    epd = parse_epd(line)
+    board = epd.board()
+    best_moves = {move.id for move in epd.moves('bm')}
+    avoid_moves = {move.id for move in epd.moves('am')}
+
+    def solves(move) -> bool:
+        if best_moves and move.id not in best_moves:
+            return False
+        return move.id not in avoid_moves
+
+    limits = dict(limits)
+    if 'depth' not in limits and epd.depth is not None:
+        limits['depth'] = epd.depth
+
+    solved_at: 'list[Optional[float]]' = [None]
+
+    def info(search_info):
+        if search_info.multipv != 1 or not search_info.pv:
+            return
+        if not solves(search_info.pv[0]):
+            solved_at[0] = None
+        elif solved_at[0] is None:
+            solved_at[0] = search_info.time
+
+    engine_class, options = parse_engine(spec)
+    engine = engine_class(**options)
+    try:
+        start = time.perf_counter()
+        infos = engine.search(board, Limits(**limits), info)
+        elapsed = time.perf_counter() - start
+    finally:
+        engine.close()
+
+    # a position without legal moves, or a search stopped before an iteration, has no move
+    # and is reported as unsolved
+    last = infos[-1] if infos and infos[-1].pv else None
+    move = last.pv[0] if last else None
+    solved = move is not None and solves(move)
+
+    return {
+        'number': number,
+        'id': epd.id,
+        'fen': epd.fen,
+        'bm': epd.operations.get('bm', []),
+        'am': epd.operations.get('am', []),
+        'move': board.san(move) if move else None,
+        'solved': solved,
+        'time_to_solution': solved_at[0] if solved else None,
+        'depth': last.depth if last else None,
+        'score': last.score if last else None,
+        'nodes': last.nodes if last else 0,
+        'time': elapsed,
+        'nps': int(last.nodes / elapsed) if last and elapsed else 0,
+    }
+
+
+def run_suite(
+        lines: 'list[str]',
+        spec: str = 'oyster',
+        *,
+        limits: dict = None,
+        concurrency: int = None,
+        output=None
+) -> dict:
+    """Runs an engine spec on EPD lines and returns a summary with every position's report, in order."""
+
+    limits = limits or {'time': 1.0}
+    # fail here rather than in a worker
+    parse_engine(spec)
+    for line in lines:
+        parse_epd(line).moves('bm')
+
+    reports = []
+    start = time.perf_counter()
+
+    with concurrent.futures.ProcessPoolExecutor(concurrency) as executor:
+        futures = [executor.submit(solve, number, line, spec, limits) for number, line in enumerate(lines, 1)]
+
+        for future in concurrent.futures.as_completed(futures):
+            report = future.result()
+            reports.append(report)
+
+            if output is not None:
+                status = 'solved' if report['solved'] else 'failed'
+                output(
+                    f'{report["number"]:>4} {report["id"] or "":<16} {report["move"] or "-":<8} {status}'
+                    f'  depth {report["depth"]}  {report["nps"]} nps'
+                )
+
+    reports.sort(key=lambda report: report['number'])
+    solved = [report for report in reports if report['solved']]
+    nodes = sum(report['nodes'] for report in reports)
+    search_time = sum(report['time'] for report in reports)
+
+    return {
+        'engine': spec,
+        'limits': limits,
+        'positions': len(reports),
+        'solved': len(solved),
+        'time_to_solution': sum(report['time_to_solution'] for report in solved),
+        'nodes': nodes,
+        'time': search_time,
+        'nps': int(nodes / search_time) if search_time else 0,
+        'wall_time': time.perf_counter() - start,
+        'results': reports,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Runs an engine on an EPD test suite.')
+    parser.add_argument('path', help='the EPD file')
+    parser.add_argument('--engine', default='oyster', help='the engine spec, see chess.match')
+    parser.add_argument('--movetime', type=float, help='seconds per position')
+    parser.add_argument('--depth', type=int)
+    parser.add_argument('--nodes', type=int)
+    parser.add_argument('--concurrency', type=int, default=os.cpu_count())
+    parser.add_argument('--json', help='where to write the report')
+    args = parser.parse_args()
+
+    with open(args.path) as file:
+        lines = [line for line in file if line.strip() and not line.lstrip().startswith('#')]
+
+    limits = {}
+    if args.movetime:
+        limits['time'] = args.movetime
+    if args.depth:
+        limits['depth'] = args.depth
+    if args.nodes:
+        limits['nodes'] = args.nodes
+
+    summary = run_suite(lines, args.engine, limits=limits or None, concurrency=args.concurrency, output=print)
+    print(
+        f'{args.engine}: {summary["solved"]}/{summary["positions"]} solved, '
+        f'{summary["nodes"]} nodes in {summary["time"]:.1f}s ({summary["nps"]} nps)'
+    )
+
+    if args.json:
+        with open(args.json, 'w') as file:
+            json.dump(summary, file, indent=4)
+
+
+if __name__ == '__main__':
+    main()
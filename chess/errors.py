@@ -3,10 +3,14 @@ class ChessError(Exception):
 
 
 class InvalidFEN(ChessError):
-    """Raised when an inputted FEN string is invalid."""
+    """Raised when an inputted FEN string is invalid.
 
-    def __init__(self):
-        super().__init__('Invalid FEN provided.')
+    ``reason`` says what is wrong with it, if known.
+    """
+
+    def __init__(self, reason: str = None):
+        super().__init__(f'Invalid FEN provided: {reason}.' if reason else 'Invalid FEN provided.')
+        self.reason = reason
 
 
 class InvalidMove(ChessError):
@@ -30,3 +34,23 @@ class PromotionError(ChessError):
 
     def __init__(self):
         super().__init__('Please provide a promotion piece.')
+
+
+class InvalidOption(ChessError):
+    """Raised when an engine is given an option it does not have."""
+
+    def __init__(self, name):
+        super().__init__(f'Invalid engine option: {name}.')
+        self.name = name
+
+
+class InvalidPGN(ChessError):
+    """Raised when a game in a PGN file can't be replayed.
+
+    ``san`` is the move that can't be played, or the FEN tag if the game can't be set up.
+    """
+
+    def __init__(self, offset: int, san: str):
+        super().__init__(f'Invalid move or FEN {san} in the game at byte {offset}.')
+        self.offset = offset
+        self.san = san
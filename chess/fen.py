@@ -0,0 +1,216 @@
+"""Validating and converting FEN strings in bulk.
+
+Reads FEN strings one per line from files or standard input, checks each
+one with Board.from_fen and writes every valid position in one of these
+formats:
+
+fen -- the FEN the board writes back out, one per line, so spacing is
+    normalized and EPD-style positions without move counters get ``0 1``
+packed -- the 32 bytes of Board.to_packed
+planes -- PLANES_FORMAT: a bitboard for each piece in PLANE_PIECES order,
+    then the side to move (1 for White), the CastleState id and the en
+    passant square's index (255 if there isn't one)
+
+Invalid lines are reported on standard error with their reason, and the
+rest of the input is still converted. Input is read in chunks, so memory
+use doesn't grow with the input. With more than one process, chunks are
+converted across a process pool and still written in input order.
+
+Usage:
+    python -m chess.fen positions.txt --format packed --output positions.bin
+    cat feed.txt | python -m chess.fen --processes 4 > normalized.txt
+"""
+
+import argparse
+import concurrent.futures
+import collections
+import itertools
+import struct
+import sys
+import time
+from typing import Iterable, Iterator
+
+import chess
+from chess import errors
+from chess.piece import PieceColor, PieceType
+
+
+FORMATS = ('fen', 'packed', 'planes')
+
+# the order of the piece bitboards in the planes format
+PLANE_PIECES = tuple(
+    color | piece_type
+    for color in (PieceColor.WHITE, PieceColor.BLACK)
+    for piece_type in (PieceType.PAWN, PieceType.KNIGHT, PieceType.BISHOP, PieceType.ROOK, PieceType.QUEEN, PieceType.KING)
+)
+PLANES_FORMAT = struct.Struct('<12QBBB5x')
+
+# lines converted at a time
+CHUNK_SIZE = 4096
+
+
+def planes(board: chess.Board) -> 'list[int]':
+    """Returns a board's piece bitboards in PLANE_PIECES order."""
+
+    bitboards = board.piece_bitboards()
+    return [bitboards[piece_id] for piece_id in PLANE_PIECES]
+
+
+def to_planes(board: chess.Board) -> bytes:
+    """Returns a board in the planes format."""
+
+    square = board.en_passant_square
+    return PLANES_FORMAT.pack(
+        *planes(board),
+        board.active_color == PieceColor.WHITE,
+        board.castle_state.id,
+        square.row * 8 + square.column if square else 255
+    )
+
+
+def parse_line(line: str, validate: bool = True) -> chess.Board:
+    """Parses a FEN line, adding move counters to a line that has only the first four fields."""
+
+    fields = line.split()
+    if len(fields) == 4:
+        fields += ['0', '1']
+    return chess.Board.from_fen(' '.join(fields), validate=validate)
+
+
+def convert(line: str, output_format: str, validate: bool = True):
+    """Converts one FEN line. Returns the converted bytes or text.
+
+    Raises InvalidFEN if the line is invalid, or ValueError if the board can't be packed.
+    """
+
+    board = parse_line(line, validate)
+    if output_format == 'fen':
+        return board.fen
+    if output_format == 'packed':
+        return board.to_packed()
+    return to_planes(board)
+
+
+def convert_chunk(
+        lines: 'list[tuple[int, str]]',
+        output_format: str,
+        validate: bool = True
+) -> 'tuple[list, list[tuple[int, str]]]':
+    """Converts numbered lines. Returns the converted positions and the numbers and reasons of lines that failed.
+
+    This runs in worker processes, so everything it takes and returns can be pickled.
+    """
+
+    converted = []
+    invalid = []
+    for number, line in lines:
+        try:
+            converted.append(convert(line, output_format, validate))
+        except errors.InvalidFEN as error:
+            invalid.append((number, error.reason or str(error)))
+        except ValueError as error:
+            # a board with more than 32 pieces, which can only get this far without validation
+            invalid.append((number, str(error)))
+    return converted, invalid
+
+
+def read_chunks(lines: Iterable[str], chunk_size: int = CHUNK_SIZE) -> 'Iterator[list[tuple[int, str]]]':
+    """Groups lines into chunks of numbered, non-blank lines, numbered from 1."""
+
+    numbered = ((number, line) for number, line in enumerate(lines, 1) if line.strip())
+    while True:
+        chunk = list(itertools.islice(numbered, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def convert_lines(
+        lines: Iterable[str],
+        output_format: str = 'fen',
+        *,
+        validate: bool = True,
+        processes: int = 1,
+        chunk_size: int = CHUNK_SIZE
+) -> 'Iterator[tuple[list, list[tuple[int, str]]]]':
+    """Converts lines chunk by chunk, yielding each chunk's result from convert_chunk in input order.
+
+    With more than one process, a few chunks per process are converted at
+    once, so a fast reader can't fill memory with chunks waiting to be written.
+    """
+
+    if output_format not in FORMATS:
+        raise ValueError(f'Unknown format: {output_format}')
+
+    chunks = read_chunks(lines, chunk_size)
+    if processes <= 1:
+        for chunk in chunks:
+            yield convert_chunk(chunk, output_format, validate)
+        return
+
+    with concurrent.futures.ProcessPoolExecutor(processes) as executor:
+        pending = collections.deque()
+        for chunk in chunks:
+            pending.append(executor.submit(convert_chunk, chunk, output_format, validate))
+            if len(pending) >= processes * 2:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Validates and converts FEN strings, one per line.')
+    parser.add_argument('paths', nargs='*', help='the input files, standard input if there are none')
+    parser.add_argument('--format', choices=FORMATS, default='fen')
+    parser.add_argument('--output', help='the file to write to, standard output by default')
+    parser.add_argument('--processes', type=int, default=1)
+    parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE, help='lines converted at a time')
+    parser.add_argument('--no-validate', dest='validate', action='store_false',
+                        help='only check the syntax, not that the position can come up in a game')
+    args = parser.parse_args()
+
+    binary = args.format != 'fen'
+    if args.output:
+        output = open(args.output, 'wb' if binary else 'w')
+    else:
+        output = sys.stdout.buffer if binary else sys.stdout
+
+    sources = [(path, open(path)) for path in args.paths] or [('<stdin>', sys.stdin)]
+    valid = invalid = 0
+    start = time.perf_counter()
+
+    try:
+        for name, file in sources:
+            with file:
+                for converted, errors_ in convert_lines(
+                    file,
+                    args.format,
+                    validate=args.validate,
+                    processes=args.processes,
+                    chunk_size=args.chunk_size
+                ):
+                    if binary:
+                        output.write(b''.join(converted))
+                    elif converted:
+                        output.write('\n'.join(converted) + '\n')
+
+                    valid += len(converted)
+                    invalid += len(errors_)
+                    for number, reason in errors_:
+                        print(f'{name}:{number}: {reason}', file=sys.stderr)
+    finally:
+        if args.output:
+            output.close()
+        else:
+            output.flush()
+
+    elapsed = time.perf_counter() - start
+    print(
+        f'{valid} valid, {invalid} invalid, {(valid + invalid) / elapsed:.0f} lines/s',
+        file=sys.stderr
+    )
+    sys.exit(1 if invalid else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,493 @@
+"""Self-play matches between engines.
+
+Plays two engines against each other over a set of openings. Each opening is
+played twice, once with each engine as White, and games run at the same time
+across a process pool. A match can stop early once a sequential probability
+ratio test (SPRT) has decided whether the first engine is stronger.
+
+Engines are given as ``name[:option=value,...]``, for example ``oyster``,
+``random`` or ``oyster:lmr=false,hash=32``.
+
+Usage:
+    python -m chess.match oyster random --movetime 0.1 --games 20
+    python -m chess.match oyster oyster:lmr=false --sprt --elo0 0 --elo1 20 --pgn games.pgn --json summary.json
+"""
+
+import argparse
+import collections
+import concurrent.futures
+import datetime
+import json
+import math
+import os
+import random
+import time
+from typing import Optional
+
+import chess
+from chess.engines import ENGINES, Limits, engine_name
+from chess.piece import PieceColor, PieceType
+
+
+OPENINGS = (
+    'rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1',
+    'r1bqkbnr/pppp1ppp/2n5/1B2p3/4P3/5N2/PPPP1PPP/RNBQK2R b KQkq - 3 3',
+    'r1bqk1nr/pppp1ppp/2n5/2b1p3/2B1P3/5N2/PPPP1PPP/RNBQK2R w KQkq - 4 4',
+    'rnbqkbnr/pp1ppppp/8/2p5/4P3/8/PPPP1PPP/RNBQKBNR w KQkq c6 0 2',
+    'rnbqkbnr/pp2pppp/3p4/8/3pP3/5N2/PPP2PPP/RNBQKB1R w KQkq - 0 4',
+    'rnbqkbnr/pppp1ppp/4p3/8/3PP3/8/PPP2PPP/RNBQKBNR b KQkq - 0 2',
+    'rnbqkbnr/pp2pppp/2p5/3p4/3PP3/8/PPP2PPP/RNBQKBNR w KQkq d6 0 3',
+    'rnbqkbnr/ppp2ppp/4p3/3p4/2PP4/8/PP2PPPP/RNBQKBNR w KQkq d6 0 3',
+    'rnbqkb1r/pppppp1p/5np1/8/2PP4/8/PP2PPPP/RNBQKBNR w KQkq - 0 3',
+    'rnbqkb1r/pppp1ppp/4pn2/8/2PP4/2N5/PP2PPPP/R1BQKBNR b KQkq - 1 3',
+    'rnbqkbnr/pppppppp/8/8/2P5/8/PP1PPPPP/RNBQKBNR b KQkq c3 0 1',
+    'rnbqkbnr/ppp1pppp/8/3p4/8/5NP1/PPPPPP1P/RNBQKB1R b KQkq - 0 2',
+)
+
+# a side that reports a forced mate this many times in a row is given the win
+MATE_ADJUDICATION_MOVES = 2
+# a game where both sides score it within DRAW_ADJUDICATION_SCORE centipawns for
+# DRAW_ADJUDICATION_PLIES plies in a row, after DRAW_ADJUDICATION_MOVE moves, is drawn
+DRAW_ADJUDICATION_MOVE = 40
+DRAW_ADJUDICATION_SCORE = 10
+DRAW_ADJUDICATION_PLIES = 8
+
+RESULT_SCORES = {'1-0': 1.0, '0-1': 0.0, '1/2-1/2': 0.5}
+
+
+def parse_engine(spec: str) -> 'tuple[type, dict]':
+    """Parses an engine spec like ``oyster:lmr=false`` into its class and options."""
+
+    name, _, option_text = spec.partition(':')
+    engines = {engine_name(engine_class): engine_class for engine_class in ENGINES}
+    if name not in engines:
+        raise ValueError(f'Unknown engine: {name}')
+
+    engine_class = engines[name]
+    options = {}
+    for option in filter(None, option_text.split(',')):
+        key, _, value = option.partition('=')
+        options[key] = engine_class.parse_option(key, value)
+
+    return engine_class, options
+
+
+def has_insufficient_material(board: chess.Board) -> bool:
+    """Returns whether neither side has enough material left to mate."""
+
+    minor_pieces = 0
+    for row in board.rows:
+        for piece in row:
+            if not piece or piece.type == PieceType.KING:
+                continue
+            if piece.type not in (PieceType.KNIGHT, PieceType.BISHOP):
+                return False
+            minor_pieces += 1
+
+    return minor_pieces <= 1
+
+
+def play_game(round_number: int, fen: str, white: str, black: str, limits: dict, max_moves: int) -> dict:
+    """Plays one game between two engine specs and returns its result and statistics.
+
+    This runs in a worker process, so everything it takes and returns can be pickled.
+    """
+
+    # every game gets its own random moves, whichever worker plays it
+    random.seed(round_number)
+
+    board = chess.Board.from_fen(fen)
+    specs = {PieceColor.WHITE: white, PieceColor.BLACK: black}
+    engines = {}
+    for color, spec in specs.items():
+        engine_class, options = parse_engine(spec)
+        engines[color] = engine_class(**options)
+
+    stats = {
+        color: {'nodes': 0, 'time': 0.0, 'max_time': 0.0, 'moves': 0}
+        for color in specs
+    }
+    mate_reports = {color: 0 for color in specs}
+    quiet_plies = 0
+    seen = collections.Counter([board.zobrist])
+    moves = []
+    result, termination = None, None
+
+    try:
+        while result is None:
+            color = board.active_color
+            other_color = PieceColor.BLACK if color == PieceColor.WHITE else PieceColor.WHITE
+
+            if not any(True for _ in board.legal_moves()):
+                if board.is_in_check():
+                    result = '1-0' if other_color == PieceColor.WHITE else '0-1'
+                    termination = 'checkmate'
+                else:
+                    result, termination = '1/2-1/2', 'stalemate'
+                break
+
+            if board.halfmoves >= 100:
+                result, termination = '1/2-1/2', 'fifty-move rule'
+            elif seen[board.zobrist] >= 3:
+                result, termination = '1/2-1/2', 'threefold repetition'
+            elif has_insufficient_material(board):
+                result, termination = '1/2-1/2', 'insufficient material'
+            elif len(moves) >= max_moves * 2:
+                result, termination = '1/2-1/2', 'adjudication: move limit'
+            if result is not None:
+                break
+
+            engine = engines[color]
+            start = time.perf_counter()
+            infos = engine.search(board, Limits(**limits))
+            elapsed = time.perf_counter() - start
+
+            info = infos[-1]
+            move = info.pv[0]
+            color_stats = stats[color]
+            color_stats['nodes'] += info.nodes
+            color_stats['time'] += elapsed
+            color_stats['max_time'] = max(color_stats['max_time'], elapsed)
+            color_stats['moves'] += 1
+
+            moves.append(board.san(move))
+            board.make_move(move)
+            seen[board.zobrist] += 1
+
+            mate_lower = getattr(engine, 'MATE_LOWER', None)
+            if info.score is not None and mate_lower is not None and info.score >= mate_lower:
+                mate_reports[color] += 1
+            else:
+                mate_reports[color] = 0
+
+            if info.score is not None and abs(info.score) <= DRAW_ADJUDICATION_SCORE:
+                quiet_plies += 1
+            else:
+                quiet_plies = 0
+
+            if mate_reports[color] >= MATE_ADJUDICATION_MOVES:
+                result = '1-0' if color == PieceColor.WHITE else '0-1'
+                termination = 'adjudication: forced mate'
+            elif board.fullmoves > DRAW_ADJUDICATION_MOVE and quiet_plies >= DRAW_ADJUDICATION_PLIES:
+                result, termination = '1/2-1/2', 'adjudication: drawn score'
+    finally:
+        for engine in engines.values():
+            engine.close()
+
+    for color_stats in stats.values():
+        color_stats['nps'] = int(color_stats['nodes'] / color_stats['time']) if color_stats['time'] else 0
+
+    return {
+        'round': round_number,
+        'fen': fen,
+        'white': white,
+        'black': black,
+        'result': result,
+        'termination': termination,
+        'moves': moves,
+        'stats': {'white': stats[PieceColor.WHITE], 'black': stats[PieceColor.BLACK]},
+    }
+
+
+class SPRT:
+    """A sequential probability ratio test between two Elo differences.
+
+    H0 is that the first engine is ``elo0`` stronger, H1 that it is ``elo1``
+    stronger. The log-likelihood ratio uses the normal approximation of the
+    game scores (the same GSPRT that fishtest uses), so draws are accounted for.
+    """
+
+    def __init__(self, elo0: float = 0, elo1: float = 10, alpha: float = 0.05, beta: float = 0.05):
+        self.elo0 = elo0
+        self.elo1 = elo1
+        self.alpha = alpha
+        self.beta = beta
+        self.lower = math.log(beta / (1 - alpha))
+        self.upper = math.log((1 - beta) / alpha)
+
+    def __repr__(self) -> str:
+        return f'<SPRT elo0={self.elo0} elo1={self.elo1} alpha={self.alpha} beta={self.beta}>'
+
+    @staticmethod
+    def expected_score(elo: float) -> float:
+        return 1 / (1 + 10 ** (-elo / 400))
+
+    def llr(self, wins: int, draws: int, losses: int) -> float:
+        """Returns the log-likelihood ratio of H1 over H0 for a set of results."""
+
+        games = wins + draws + losses
+        if not wins + losses or not wins + draws or not draws + losses:
+            # every game had the same result, so there's no variance to go on yet
+            return 0.0
+
+        score = (wins + draws / 2) / games
+        variance = (
+            wins * (1 - score) ** 2
+            + draws * (0.5 - score) ** 2
+            + losses * score ** 2
+        ) / games
+
+        score0 = self.expected_score(self.elo0)
+        score1 = self.expected_score(self.elo1)
+        return games * (score1 - score0) * (2 * score - score0 - score1) / (2 * variance)
+
+    def status(self, wins: int, draws: int, losses: int) -> Optional[str]:
+        """Returns ``'H1'`` or ``'H0'`` once one of them is accepted, otherwise None."""
+
+        llr = self.llr(wins, draws, losses)
+        if llr >= self.upper:
+            return 'H1'
+        if llr <= self.lower:
+            return 'H0'
+        return None
+
+
+def elo_difference(wins: int, draws: int, losses: int) -> 'tuple[float, float]':
+    """Returns the Elo difference a set of results suggests and its 95% error margin."""
+
+    games = wins + draws + losses
+    if not games:
+        return 0.0, math.inf
+
+    def elo(score: float) -> float:
+        score = min(max(score, 1e-6), 1 - 1e-6)
+        return -400 * math.log10(1 / score - 1)
+
+    score = (wins + draws / 2) / games
+    variance = (wins * (1 - score) ** 2 + draws * (0.5 - score) ** 2 + losses * score ** 2) / games
+    margin = 1.96 * math.sqrt(variance / games)
+    return elo(score), (elo(score + margin) - elo(score - margin)) / 2
+
+
+def pgn(game: dict, event: str = 'chess.match') -> str:
+    """Returns a game played by play_game as PGN."""
+
+    result = game['result']
+    headers = {
+        'Event': event,
+        'Site': '?',
+        'Date': datetime.date.today().strftime('%Y.%m.%d'),
+        'Round': str(game['round']),
+        'White': game['white'],
+        'Black': game['black'],
+        'Result': result,
+    }
+    if game['fen'] != chess.Board.DEFAULT_FEN:
+        headers['SetUp'] = '1'
+        headers['FEN'] = game['fen']
+    headers['Termination'] = game['termination']
+    headers['PlyCount'] = str(len(game['moves']))
+
+    lines = [f'[{name} "{value}"]' for name, value in headers.items()]
+    lines.append('')
+
+    _, active_color, *_, fullmoves = game['fen'].split()
+    move_number = int(fullmoves)
+    white_to_move = active_color == 'w'
+
+    tokens = []
+    for i, san in enumerate(game['moves']):
+        if white_to_move:
+            tokens.append(f'{move_number}.')
+        elif i == 0:
+            tokens.append(f'{move_number}...')
+        tokens.append(san)
+
+        if not white_to_move:
+            move_number += 1
+        white_to_move = not white_to_move
+    tokens.append(result)
+
+    # movetext lines are kept under 80 characters
+    line = ''
+    for token in tokens:
+        if line and len(line) + len(token) + 1 > 79:
+            lines.append(line)
+            line = token
+        else:
+            line = f'{line} {token}' if line else token
+    lines.append(line)
+
+    return '\n'.join(lines) + '\n'
+
+
+def run_match(
+        first: str,
+        second: str,
+        *,
+        openings=OPENINGS,
+        limits: dict = None,
+        games: int = None,
+        concurrency: int = None,
+        max_moves: int = 200,
+        sprt: SPRT = None,
+        output=print
+) -> 'tuple[dict, list[dict]]':
+    """Plays a match between two engine specs.
+
+    Results are counted from the first engine's side.
+    Returns a summary of the match and the games that were played, in round order.
+    """
+
+    # fail here rather than in a worker
+    parse_engine(first)
+    parse_engine(second)
+
+    limits = limits or {'time': 0.1}
+    games = games or len(openings) * 2
+    schedule = []
+    for round_number in range(1, games + 1):
+        fen = openings[(round_number - 1) // 2 % len(openings)]
+        white, black = (first, second) if round_number % 2 else (second, first)
+        schedule.append((round_number, fen, white, black, limits, max_moves))
+
+    wins = draws = losses = 0
+    decision = None
+    played = []
+    start = time.perf_counter()
+
+    with concurrent.futures.ProcessPoolExecutor(concurrency) as executor:
+        futures = [executor.submit(play_game, *game) for game in schedule]
+
+        for future in concurrent.futures.as_completed(futures):
+            if future.cancelled():
+                continue
+
+            game = future.result()
+            played.append(game)
+
+            score = RESULT_SCORES[game['result']]
+            if game['black'] == first and game['white'] != first:
+                score = 1 - score
+            if score == 1:
+                wins += 1
+            elif score == 0:
+                losses += 1
+            else:
+                draws += 1
+
+            status = f'Round {game["round"]:>4}: {game["white"]} - {game["black"]} {game["result"]} ({game["termination"]})'
+            status += f'  +{wins} ={draws} -{losses}'
+            if sprt is not None:
+                status += f'  LLR {sprt.llr(wins, draws, losses):.2f} [{sprt.lower:.2f}, {sprt.upper:.2f}]'
+            output(status)
+
+            if sprt is not None:
+                decision = sprt.status(wins, draws, losses)
+                if decision is not None:
+                    for pending in futures:
+                        pending.cancel()
+                    break
+
+    played.sort(key=lambda game: game['round'])
+    elo, elo_margin = elo_difference(wins, draws, losses)
+
+    engine_stats = {}
+    for spec in dict.fromkeys((first, second)):
+        nodes = seconds = moves = 0
+        max_time = 0.0
+        for game in played:
+            for side in ('white', 'black'):
+                if game[side] == spec:
+                    side_stats = game['stats'][side]
+                    nodes += side_stats['nodes']
+                    seconds += side_stats['time']
+                    moves += side_stats['moves']
+                    max_time = max(max_time, side_stats['max_time'])
+        engine_stats[spec] = {
+            'nodes': nodes,
+            'nps': int(nodes / seconds) if seconds else 0,
+            'time_per_move': seconds / moves if moves else 0.0,
+            'max_time_per_move': max_time,
+        }
+
+    summary = {
+        'engines': [first, second],
+        'limits': limits,
+        'games': len(played),
+        'wins': wins,
+        'draws': draws,
+        'losses': losses,
+        'score': (wins + draws / 2) / len(played) if played else 0.0,
+        'elo': elo,
+        'elo_margin': elo_margin,
+        'terminations': dict(collections.Counter(game['termination'] for game in played)),
+        'engine_stats': engine_stats,
+        'duration': time.perf_counter() - start,
+    }
+    if sprt is not None:
+        summary['sprt'] = {
+            'elo0': sprt.elo0,
+            'elo1': sprt.elo1,
+            'alpha': sprt.alpha,
+            'beta': sprt.beta,
+            'llr': sprt.llr(wins, draws, losses),
+            'lower': sprt.lower,
+            'upper': sprt.upper,
+            'decision': decision,
+        }
+
+    return summary, played
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('first', help='the engine being tested')
+    parser.add_argument('second', help='the engine it plays against')
+    parser.add_argument('--games', type=int, help='defaults to every opening with both colors')
+    parser.add_argument('--movetime', type=float, default=0.1, help='seconds per move')
+    parser.add_argument('--depth', type=int)
+    parser.add_argument('--nodes', type=int)
+    parser.add_argument('--concurrency', type=int, default=os.cpu_count())
+    parser.add_argument('--max-moves', type=int, default=200, help='moves before a game is drawn')
+    parser.add_argument('--openings', help='a file with one FEN per line')
+    parser.add_argument('--sprt', action='store_true', help='stop once an SPRT decides')
+    parser.add_argument('--elo0', type=float, default=0)
+    parser.add_argument('--elo1', type=float, default=10)
+    parser.add_argument('--alpha', type=float, default=0.05)
+    parser.add_argument('--beta', type=float, default=0.05)
+    parser.add_argument('--pgn', help='where to write the games')
+    parser.add_argument('--json', help='where to write the summary')
+    args = parser.parse_args()
+
+    openings = OPENINGS
+    if args.openings:
+        with open(args.openings) as file:
+            openings = tuple(line.strip() for line in file if line.strip())
+
+    limits = {'time': args.movetime}
+    if args.depth:
+        limits['depth'] = args.depth
+    if args.nodes:
+        limits['nodes'] = args.nodes
+
+    sprt = SPRT(args.elo0, args.elo1, args.alpha, args.beta) if args.sprt else None
+    summary, games = run_match(
+        args.first,
+        args.second,
+        openings=openings,
+        limits=limits,
+        games=args.games,
+        concurrency=args.concurrency,
+        max_moves=args.max_moves,
+        sprt=sprt
+    )
+
+    print(
+        f'{args.first} vs {args.second}: +{summary["wins"]} ={summary["draws"]} -{summary["losses"]}, '
+        f'Elo {summary["elo"]:+.1f} +/- {summary["elo_margin"]:.1f}'
+    )
+    if sprt is not None:
+        print(f'SPRT: {summary["sprt"]["decision"] or "no decision"} (LLR {summary["sprt"]["llr"]:.2f})')
+
+    if args.pgn:
+        with open(args.pgn, 'w') as file:
+            file.write('\n'.join(pgn(game) for game in games))
+
+    if args.json:
+        with open(args.json, 'w') as file:
+            json.dump(summary, file, indent=4)
+
+
+if __name__ == '__main__':
+    main()
@@ -82,6 +82,23 @@ class Move:
         promotion = self.promotion.fen.upper() if self.promotion else ''
         return f'{self.from_square.san}-{self.to_square.san}{promotion}'
 
+    @property
+    def id(self) -> int:
+        """Returns the move packed into an int.
+
+        Bits 0-5 hold the from square, bits 6-11 the to square
+        and bits 12-14 the promotion piece type.
+        Castle moves set bit 15 and store their CastleType in bit 0.
+        """
+
+        if self.castle is not None:
+            return 1 << 15 | self.castle
+
+        from_square = self.from_square.row * 8 + self.from_square.column
+        to_square = self.to_square.row * 8 + self.to_square.column
+        promotion = self.promotion.type if self.promotion else 0
+        return from_square | to_square << 6 | promotion << 12
+
     @property
     def uci(self) -> str:
         if self.castle is not None:
@@ -0,0 +1,409 @@
+"""Reading PGN files.
+
+A PGNReader memory-maps its file and finds games lazily, so reading a file
+of any size takes the same small amount of memory. Finding a game only reads
+its tag pairs. Its moves aren't parsed until they're asked for, so filtering
+games by their tags never pays for SAN parsing:
+
+    with PGNReader('games.pgn') as reader:
+        for game in reader.games():
+            if game.headers.get('White') == 'oyster':
+                for board, move in game.moves():
+                    ...
+
+A game's byte offsets can be kept and the game read again later with
+PGNReader.game_at, without scanning the file up to it.
+
+Only games that start with at least one tag pair are found. Comments,
+variations and numeric annotation glyphs are skipped when moves are parsed.
+
+extract_positions replays a whole file in parallel to get a record of every
+position in it. The file is split into byte ranges at game starts and each
+range is replayed in its own process, which writes its records to chunk
+files, so only file names and counts are sent back between processes. Each
+line of a chunk is one position, the move played from it and the game's
+result from White's side::
+
+    <fen> | <uci move> | <result>
+
+chess.tune reads chunk files as they are.
+
+Usage:
+    python -m chess.pgn games.pgn --output positions --processes 4
+"""
+
+import argparse
+import concurrent.futures
+import mmap
+import os
+import re
+import time
+from typing import Optional
+
+import chess
+from chess import errors
+
+
+# a run of tag pair lines, which starts every game
+TAG_SECTION = re.compile(rb'(?:^\[[A-Za-z0-9_]+[ \t]+"[^\r\n]*\][ \t]*(?:\r?\n|\Z))+', re.MULTILINE)
+TAG_PAIR = re.compile(rb'^\[([A-Za-z0-9_]+)[ \t]+"((?:[^"\\\r\n]|\\.)*)"\]', re.MULTILINE)
+TAG_ESCAPE = re.compile(r'\\(.)')
+
+# comments, variations, glyphs, move numbers, results and everything else (moves)
+MOVETEXT_TOKEN = re.compile(
+    rb'\{[^}]*\}|;[^\n]*|\$\d+|\(|\)|\d+\.+|1-0|0-1|1/2-1/2|\*|[^\s(){};$]+'
+)
+RESULTS = ('1-0', '0-1', '1/2-1/2', '*')
+RESULT_SCORES = {'1-0': '1.0', '0-1': '0.0', '1/2-1/2': '0.5'}
+
+# records per chunk file, which are only split between games
+CHUNK_SIZE = 1 << 16
+# byte ranges per process, so a process that gets short games can take another range
+RANGES_PER_PROCESS = 4
+
+
+def parse_tags(section: bytes) -> 'dict[str, str]':
+    """Returns the tags of a tag pair section."""
+
+    return {
+        name.decode('ascii'): TAG_ESCAPE.sub(r'\1', value.decode('utf-8', 'replace'))
+        for name, value in TAG_PAIR.findall(section)
+    }
+
+
+def parse_movetext(movetext: bytes) -> 'list[str]':
+    """Returns the SAN moves of a game's main line."""
+
+    sans = []
+    depth = 0
+
+    for match in MOVETEXT_TOKEN.finditer(movetext):
+        token = match.group()
+        first = token[:1]
+
+        if first == b'(':
+            depth += 1
+        elif first == b')':
+            depth -= 1
+        elif depth or first in b'{;$' or first.isdigit() and token.endswith(b'.'):
+            continue
+        else:
+            san = token.decode('ascii', 'replace')
+            if san in RESULTS:
+                break
+            sans.append(san)
+
+    return sans
+
+
+class Game:
+    """A game found in a PGN file.
+
+    Attributes:
+    headers -- the game's tags
+    start -- the byte offset the game starts at
+    movetext_start -- the byte offset its moves start at
+    end -- the byte offset just after the game
+    """
+
+    __slots__ = ('reader', 'headers', 'start', 'movetext_start', 'end')
+
+    def __init__(self, reader: 'PGNReader', headers: 'dict[str, str]', start: int, movetext_start: int, end: int):
+        self.reader = reader
+        self.headers = headers
+        self.start = start
+        self.movetext_start = movetext_start
+        self.end = end
+
+    def __repr__(self) -> str:
+        return (
+            f'<Game white={self.headers.get("White")!r} black={self.headers.get("Black")!r} '
+            f'result={self.result!r} start={self.start}>'
+        )
+
+    @property
+    def offsets(self) -> 'tuple[int, int]':
+        """Returns the byte offsets the game starts and ends at, for PGNReader.game_at."""
+
+        return self.start, self.end
+
+    @property
+    def result(self) -> str:
+        return self.headers.get('Result', '*')
+
+    def movetext(self) -> bytes:
+        return self.reader.data[self.movetext_start:self.end]
+
+    def sans(self) -> 'list[str]':
+        """Returns the SAN moves of the game's main line."""
+
+        return parse_movetext(self.movetext())
+
+    def starting_board(self) -> chess.Board:
+        """Returns the board the game starts from, set up from its FEN tag if it has one."""
+
+        fen = self.headers.get('FEN')
+        if fen and self.headers.get('SetUp', '1') == '1':
+            return chess.Board.from_fen(fen)
+        return chess.Board.default()
+
+    def moves(self, board: Optional[chess.Board] = None):
+        """Returns a generator that replays the game's main line.
+
+        It yields the board before each move along with the move. The same
+        board is yielded every time, with the moves made on it in between,
+        so copy it to keep a position. The moves are made on ``board`` if it's
+        given, which should be the game's starting board.
+
+        Raises InvalidPGN if the FEN tag is invalid or a move can't be played.
+        """
+
+        if board is None:
+            board = self._replay_board()
+
+        for san in self.sans():
+            try:
+                move = board.parse_san(san, strict=True)
+            except errors.ChessError:
+                raise errors.InvalidPGN(self.start, san) from None
+
+            yield board, move
+            board.make_move(move)
+
+    def _replay_board(self) -> chess.Board:
+        # the starting board, with an invalid FEN tag raised like a move that can't be played
+        try:
+            return self.starting_board()
+        except errors.ChessError:
+            raise errors.InvalidPGN(self.start, self.headers.get('FEN')) from None
+
+    def board(self) -> chess.Board:
+        """Returns the board at the end of the game's main line.
+
+        Raises InvalidPGN if the FEN tag is invalid or a move can't be played.
+        """
+
+        board = self._replay_board()
+        # the generator makes the last move before it finishes
+        for _ in self.moves(board):
+            pass
+        return board
+
+
+class PGNReader:
+    """A memory-mapped PGN file.
+
+    Use it as a context manager, or call PGNReader.close when done.
+    Games must not be used after their reader is closed.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.file = open(path, 'rb')
+        try:
+            self.data = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # an empty file can't be mapped
+            self.data = b''
+
+    def __repr__(self) -> str:
+        return f'<PGNReader path={self.path!r}>'
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __iter__(self):
+        return self.games()
+
+    def __len__(self) -> int:
+        """Returns the size of the file in bytes."""
+
+        return len(self.data)
+
+    def close(self):
+        if isinstance(self.data, mmap.mmap):
+            self.data.close()
+        self.file.close()
+
+    def games(self, start: int = 0, end: Optional[int] = None):
+        """Returns a generator of the games that start between two byte offsets.
+
+        A game that starts in the range is read to its end, even past ``end``,
+        so splitting a file into ranges gives every game to exactly one range.
+        """
+
+        data = self.data
+        if end is None:
+            end = len(data)
+
+        sections = TAG_SECTION.finditer(data, start)
+        section = next(sections, None)
+        # a range starting inside a game's tags must skip the rest of them
+        if section is not None and self._follows_tag(section.start()):
+            section = next(sections, None)
+
+        while section is not None and section.start() < end:
+            next_section = next(sections, None)
+            game_end = next_section.start() if next_section is not None else len(data)
+
+            yield Game(self, parse_tags(section.group()), section.start(), section.end(), game_end)
+            section = next_section
+
+    def split(self, parts: int) -> 'list[tuple[int, int]]':
+        """Splits the file into at most ``parts`` byte ranges that each start at a game.
+
+        Ranges are about the same size in bytes, and fewer are returned
+        when there aren't enough games to go around.
+        """
+
+        size = len(self.data)
+        starts: 'list[int]' = []
+        for part in range(parts):
+            game = next(self.games(size * part // parts), None)
+            if game is not None and (not starts or game.start > starts[-1]):
+                starts.append(game.start)
+
+        return list(zip(starts, starts[1:] + [size]))
+
+    def _follows_tag(self, position: int) -> bool:
+        # whether the line before a position is a tag pair
+        if position == 0:
+            return False
+        line_start = self.data.rfind(b'\n', 0, position - 1) + 1
+        return TAG_PAIR.match(self.data, line_start) is not None
+
+    def game_at(self, start: int, end: Optional[int] = None) -> Game:
+        """Reads the game that starts at a byte offset, see Game.offsets.
+
+        Without ``end``, the game runs to the start of the next one.
+        """
+
+        section = TAG_SECTION.match(self.data, start)
+        if section is None:
+            raise ValueError(f'No game starts at byte {start}.')
+
+        if end is None:
+            next_section = TAG_SECTION.search(self.data, section.end())
+            end = next_section.start() if next_section is not None else len(self.data)
+
+        return Game(self, parse_tags(section.group()), start, section.end(), end)
+
+
+def read_games(path: str):
+    """Returns a generator of the games in a PGN file, closing it once the generator is done."""
+
+    with PGNReader(path) as reader:
+        yield from reader.games()
+
+
+def _extract_range(path: str, start: int, end: int, directory: str, name: str, chunk_size: int) -> dict:
+    # runs in a worker process
+    counts = {'games': 0, 'positions': 0, 'skipped': 0, 'files': []}
+    records: 'list[str]' = []
+
+    def flush():
+        file_path = os.path.join(directory, f'{name}-{len(counts["files"]):05d}.txt')
+        with open(file_path, 'w') as file:
+            file.write('\n'.join(records) + '\n')
+        counts['files'].append(file_path)
+        records.clear()
+
+    with PGNReader(path) as reader:
+        for game in reader.games(start, end):
+            score = RESULT_SCORES.get(game.result)
+            if score is None:
+                counts['skipped'] += 1
+                continue
+
+            # a game is only written once all of it could be replayed
+            try:
+                game_records = [f'{board.fen} | {board.uci(move)} | {score}' for board, move in game.moves()]
+            except errors.InvalidPGN:
+                counts['skipped'] += 1
+                continue
+
+            counts['games'] += 1
+            counts['positions'] += len(game_records)
+            records.extend(game_records)
+            if len(records) >= chunk_size:
+                flush()
+
+    if records:
+        flush()
+
+    return counts
+
+
+def extract_positions(
+        path: str,
+        directory: str,
+        *,
+        processes: int = None,
+        chunk_size: int = CHUNK_SIZE,
+        output=None
+) -> dict:
+    """Replays every game in a PGN file and writes a record of each position to chunk files.
+
+    Games without a decided result, or with a move that can't be played,
+    are skipped. Returns a summary with the number of games, positions and
+    skipped games, the chunk files in file order and the time taken.
+    """
+
+    processes = processes or os.cpu_count() or 1
+    os.makedirs(directory, exist_ok=True)
+
+    with PGNReader(path) as reader:
+        ranges = reader.split(processes * RANGES_PER_PROCESS)
+
+    summary = {'games': 0, 'positions': 0, 'skipped': 0, 'files': [], 'time': 0.0}
+    files: 'list[list[str]]' = [[] for _ in ranges]
+    start = time.perf_counter()
+
+    with concurrent.futures.ProcessPoolExecutor(processes) as executor:
+        futures = {
+            executor.submit(_extract_range, path, range_start, range_end, directory, f'positions-{i:04d}', chunk_size): i
+            for i, (range_start, range_end) in enumerate(ranges)
+        }
+
+        for future in concurrent.futures.as_completed(futures):
+            counts = future.result()
+            for key in ('games', 'positions', 'skipped'):
+                summary[key] += counts[key]
+            files[futures[future]] = counts['files']
+
+            if output is not None:
+                elapsed = time.perf_counter() - start
+                output(f'{summary["games"]} games, {summary["positions"]} positions ({summary["games"] / elapsed:.0f} games/s)')
+
+    summary['files'] = [file for range_files in files for file in range_files]
+    summary['time'] = time.perf_counter() - start
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Extracts the positions of the games in a PGN file.')
+    parser.add_argument('path', help='the PGN file')
+    parser.add_argument('--output', required=True, help='the directory to write chunk files to')
+    parser.add_argument('--processes', type=int, default=os.cpu_count())
+    parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE, help='positions per chunk file')
+    args = parser.parse_args()
+
+    summary = extract_positions(
+        args.path,
+        args.output,
+        processes=args.processes,
+        chunk_size=args.chunk_size,
+        output=print
+    )
+
+    print(
+        f'{summary["games"]} games ({summary["skipped"]} skipped), {summary["positions"]} positions '
+        f'in {len(summary["files"])} files, {summary["games"] / summary["time"]:.0f} games/s'
+    )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,194 @@
+"""An append-only store of analysed positions.
+
+Positions are kept in a flat file of fixed-size records, each holding a
+board's Zobrist key, the board packed with Board.to_packed, and a score,
+depth and best move. A second file, ``<path>.index.npy``, holds the keys
+sorted along with their record numbers. Both are memory-mapped, so opening
+a store reads nothing up front, and finding a position is a binary search
+that only touches a few pages of the index however large the store grows.
+
+New positions are buffered in memory and appended when the store is
+flushed, which merges their keys into the index:
+
+    with PositionStore('analysis.positions') as store:
+        store.add(board, score=35, depth=12, move=move)
+        ...
+        entry = store.get(board)
+
+This needs NumPy.
+"""
+
+import os
+from typing import NamedTuple, Optional
+
+import numpy as np
+
+import chess
+from chess.move import Move
+
+
+RECORD = np.dtype([
+    ('key', '<u8'),
+    ('position', f'V{chess.board.PACKED_SIZE}'),
+    ('score', '<i4'),
+    ('depth', '<i2'),
+    ('move', '<u2'),
+])
+
+# the bytes of a packed board that come before its move counters
+PACKED_POSITION_SIZE = 26
+
+INDEX = np.dtype([
+    ('key', '<u8'),
+    ('record', '<u8'),
+])
+
+
+class Entry(NamedTuple):
+    """A stored position.
+
+    position -- the board packed with Board.to_packed
+    move -- the best move's Move.id, or 0 if there isn't one
+    """
+
+    key: int
+    position: bytes
+    score: int
+    depth: int
+    move: int
+
+    def board(self) -> chess.Board:
+        return chess.Board.from_packed(self.position)
+
+
+class PositionStore:
+    """A file of positions that can be looked up by Zobrist key.
+
+    Use it as a context manager, or call PositionStore.close when done,
+    so positions that were added get written.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.index_path = f'{path}.index.npy'
+        self.pending: 'list[tuple[int, bytes, int, int, int]]' = []
+
+        if not os.path.exists(path):
+            open(path, 'wb').close()
+        self._map()
+
+    def __repr__(self) -> str:
+        return f'<PositionStore path={self.path!r} positions={len(self)}>'
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __len__(self) -> int:
+        return len(self.records) + len(self.pending)
+
+    def __contains__(self, board: chess.Board) -> bool:
+        return self.get(board) is not None
+
+    def _map(self):
+        size = os.path.getsize(self.path)
+        if size % RECORD.itemsize:
+            raise ValueError(f'{self.path} is not a position store.')
+
+        # empty files can't be mapped
+        if size:
+            self.records = np.memmap(self.path, dtype=RECORD, mode='r')
+        else:
+            self.records = np.empty(0, dtype=RECORD)
+
+        if os.path.exists(self.index_path):
+            self.index = np.load(self.index_path, mmap_mode='r')
+        else:
+            self.index = np.empty(0, dtype=INDEX)
+
+        if len(self.index) != len(self.records):
+            # the store was written to without its index being updated
+            self._build_index()
+
+    def _build_index(self):
+        index = np.empty(len(self.records), dtype=INDEX)
+        index['key'] = self.records['key']
+        index['record'] = np.arange(len(self.records))
+        self._write_index(index[np.argsort(index['key'], kind='stable')])
+
+    def _write_index(self, index: np.ndarray):
+        # written next to the old index and moved over it, so it's never half written
+        temporary_path = f'{self.path}.index.tmp.npy'
+        np.save(temporary_path, index)
+        os.replace(temporary_path, self.index_path)
+        self.index = np.load(self.index_path, mmap_mode='r')
+
+    def add(self, board: chess.Board, *, score: int = 0, depth: int = 0, move: Optional[Move] = None):
+        """Adds a position. It can be looked up straight away, but is only written by PositionStore.flush."""
+
+        self.pending.append((board.zobrist, board.to_packed(), score, depth, move.id if move else 0))
+
+    def flush(self):
+        """Appends the added positions to the file and merges them into the index."""
+
+        if not self.pending:
+            return
+
+        added = np.array(self.pending, dtype=RECORD)
+        first = len(self.records)
+        with open(self.path, 'ab') as file:
+            added.tofile(file)
+        self.pending = []
+
+        new_index = np.empty(len(added), dtype=INDEX)
+        new_index['key'] = added['key']
+        new_index['record'] = np.arange(first, first + len(added))
+
+        # both halves are sorted, so the stable sort only has to merge them
+        index = np.concatenate((self.index, new_index[np.argsort(new_index['key'], kind='stable')]))
+        self.records = np.memmap(self.path, dtype=RECORD, mode='r')
+        self._write_index(index[np.argsort(index['key'], kind='stable')])
+
+    def lookup(self, key: int) -> 'list[Entry]':
+        """Returns every position stored under a Zobrist key, oldest first."""
+
+        keys = self.index['key']
+        # a Python int this large would be compared as a float
+        key = np.uint64(key)
+        start = int(np.searchsorted(keys, key, side='left'))
+        end = int(np.searchsorted(keys, key, side='right'))
+
+        entries = []
+        for record_number in sorted(int(number) for number in self.index['record'][start:end]):
+            record = self.records[record_number]
+            entries.append(Entry(
+                int(record['key']),
+                record['position'].tobytes(),
+                int(record['score']),
+                int(record['depth']),
+                int(record['move'])
+            ))
+
+        entries += [Entry(*pending) for pending in self.pending if pending[0] == int(key)]
+        return entries
+
+    def get(self, board: chess.Board) -> Optional[Entry]:
+        """Returns the most recently stored entry for a board's position, if there is one.
+
+        Entries that only share the board's key are ignored. The move counters
+        aren't compared.
+        """
+
+        position = board.to_packed()[:PACKED_POSITION_SIZE]
+        for entry in reversed(self.lookup(board.zobrist)):
+            if entry.position[:PACKED_POSITION_SIZE] == position:
+                return entry
+        return None
+
+    def close(self):
+        self.flush()
+        # drop the maps so the files can be closed
+        self.records = np.empty(0, dtype=RECORD)
+        self.index = np.empty(0, dtype=INDEX)
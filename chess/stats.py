@@ -0,0 +1,204 @@
+"""Search instrumentation.
+
+The board and OysterEngine count what they do with ``stats.count(name)``
+and time each iterative deepening depth with ``stats.time_depth``. Counting
+is off unless the ``CHESS_STATS`` environment variable is set or
+stats.enable is called. While it's off, both are swapped for a function that
+returns straight away, so the call sites cost next to nothing.
+
+The counters are kept per process, so Lazy SMP helpers' work isn't counted.
+
+    stats.enable()
+    stats.reset()
+    engine.get_move(board)
+    print(stats.format_stats())
+
+SearchProfiler profiles every search an engine runs, with cProfile or by
+sampling the search thread's stack, see Engine.profiler.
+"""
+
+import collections
+import cProfile
+import io
+import os
+import pstats
+import sys
+import threading
+from typing import Optional
+
+
+COUNTERS = (
+    'nodes',
+    'qs_nodes',
+    'evaluations',
+    'movegen',
+    'make_move',
+    'unmake_move',
+    'tt_probes',
+    'tt_hits',
+    'tt_cutoffs',
+    'beta_cutoffs',
+    'first_move_cutoffs',
+)
+
+counters = dict.fromkeys(COUNTERS, 0)
+# seconds spent on each iterative deepening depth
+depth_times: 'dict[int, float]' = {}
+
+
+def _count(name: str, amount: int = 1):
+    counters[name] += amount
+
+
+def _time_depth(depth: int, seconds: float):
+    depth_times[depth] = depth_times.get(depth, 0.0) + seconds
+
+
+def _disabled(*args):
+    pass
+
+
+count = _disabled
+time_depth = _disabled
+
+
+def enable():
+    global count, time_depth
+    count = _count
+    time_depth = _time_depth
+
+
+def disable():
+    global count, time_depth
+    count = _disabled
+    time_depth = _disabled
+
+
+def is_enabled() -> bool:
+    return count is _count
+
+
+def reset():
+    """Sets every counter back to zero and forgets the depth times."""
+
+    for name in counters:
+        counters[name] = 0
+    depth_times.clear()
+
+
+def snapshot() -> dict:
+    """Returns a copy of the counters and depth times, with the rates worked out from them."""
+
+    tt_probes = counters['tt_probes']
+    beta_cutoffs = counters['beta_cutoffs']
+    return {
+        'counters': dict(counters),
+        'depth_times': dict(depth_times),
+        'tt_hit_rate': counters['tt_hits'] / tt_probes if tt_probes else 0.0,
+        'first_move_cutoff_rate': counters['first_move_cutoffs'] / beta_cutoffs if beta_cutoffs else 0.0,
+    }
+
+
+def format_stats(values: dict = None) -> str:
+    """Formats a snapshot, the current counters by default, as a few lines of text."""
+
+    values = values or snapshot()
+    lines = [' '.join(f'{name} {value}' for name, value in values['counters'].items())]
+    lines.append(
+        f'tt hit rate {values["tt_hit_rate"]:.1%}, '
+        f'first move cutoff rate {values["first_move_cutoff_rate"]:.1%}'
+    )
+    if values['depth_times']:
+        lines.append('depth times ' + ' '.join(
+            f'{depth}:{seconds:.3f}s' for depth, seconds in sorted(values['depth_times'].items())
+        ))
+    return '\n'.join(lines)
+
+
+if os.environ.get('CHESS_STATS'):
+    enable()
+
+
+class SearchProfiler:
+    """Profiles the searches an engine runs, see Engine.profiler.
+
+    ``mode`` is ``'cprofile'`` to trace every call with cProfile, or
+    ``'sample'`` to look at the search's stack every ``interval`` seconds,
+    which slows the search down much less. The report is of the last search.
+    """
+
+    def __init__(self, mode: str = 'cprofile', interval: float = 0.001):
+        if mode not in ('cprofile', 'sample'):
+            raise ValueError(f'Unknown profiler mode: {mode}')
+
+        self.mode = mode
+        self.interval = interval
+        self.profile: Optional[cProfile.Profile] = None
+        self.samples: 'collections.Counter[str]' = collections.Counter()
+        self.leaf_samples: 'collections.Counter[str]' = collections.Counter()
+        self.sample_count = 0
+
+    def __repr__(self) -> str:
+        return f'<SearchProfiler mode={self.mode!r}>'
+
+    def __call__(self, function, *args):
+        """Calls a function under the profiler, in the calling thread, and returns its result."""
+
+        if self.mode == 'cprofile':
+            self.profile = cProfile.Profile()
+            return self.profile.runcall(function, *args)
+
+        self.samples = collections.Counter()
+        self.leaf_samples = collections.Counter()
+        self.sample_count = 0
+
+        done = threading.Event()
+        sampler = threading.Thread(target=self._sample, args=(threading.get_ident(), done), daemon=True)
+        sampler.start()
+        try:
+            return function(*args)
+        finally:
+            done.set()
+            sampler.join()
+
+    def _sample(self, thread_id: int, done: threading.Event):
+        while not done.wait(self.interval):
+            frame = sys._current_frames().get(thread_id)
+            if frame is None:
+                continue
+
+            self.sample_count += 1
+            self.leaf_samples[self._describe(frame)] += 1
+            # a recursive function is only counted once per sample
+            seen = set()
+            while frame is not None:
+                name = self._describe(frame)
+                if name not in seen:
+                    seen.add(name)
+                    self.samples[name] += 1
+                frame = frame.f_back
+
+    @staticmethod
+    def _describe(frame) -> str:
+        code = frame.f_code
+        return f'{os.path.basename(code.co_filename)}:{code.co_firstlineno}({code.co_name})'
+
+    def report(self, limit: int = 15) -> str:
+        """Returns the functions that took the most time in the last search."""
+
+        if self.mode == 'cprofile':
+            if self.profile is None:
+                return ''
+            output = io.StringIO()
+            pstats.Stats(self.profile, stream=output).sort_stats('cumulative').print_stats(limit)
+            return output.getvalue()
+
+        if not self.sample_count:
+            return ''
+        lines = [f'{f"{self.sample_count} samples":<60} {"total":>6} {"self":>6}']
+        for name, samples in self.samples.most_common(limit):
+            lines.append(
+                f'{name:<60} {samples / self.sample_count:>6.1%} '
+                f'{self.leaf_samples[name] / self.sample_count:>6.1%}'
+            )
+        return '\n'.join(lines)
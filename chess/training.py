@@ -0,0 +1,326 @@
+"""Exporting positions as training data.
+
+Positions are replayed from PGN games, or read from EPD lines, and written
+to a directory of shards, each holding up to ``shard_size`` positions as
+one ``.npy`` file per field:
+
+planes -- twelve bitboards per position, in chess.fen.PLANE_PIECES order,
+    which unpack_planes turns into 12x8x8 planes of ones and zeros
+side -- 1 if White is to move, 0 if Black is
+castling -- the CastleState id
+en_passant -- the en passant square's index, or 255 if there isn't one
+halfmoves -- the halfmove clock
+keys -- the Zobrist key
+moves -- the Move.id of the move played, or of the first ``bm`` move of an
+    EPD line, or 0 if there isn't one
+results -- the game's result from White's side: 1, 0 or -1
+
+The planes are kept as bitboards since that's an eighth of the size, and
+unpacking a batch while training is cheap. Every shard is loaded without
+copying with ``np.load(path, mmap_mode='r')``, as load_shards does, and
+``manifest.json`` lists the shards and how many positions each has.
+
+Positions are buffered in chunks of ``chunk_size`` and copied into the
+shard's memory-mapped files, so memory use doesn't grow with the input.
+Positions can also be deduplicated by Zobrist key, which keeps the key of
+every position written in memory.
+
+PGN games without a decided result, or with a move that can't be played,
+are skipped, as are EPD lines without a ``c9`` result.
+
+Usage:
+    python -m chess.training games.pgn suite.epd --output data --deduplicate
+
+This needs NumPy.
+"""
+
+import argparse
+import json
+import os
+import time
+from typing import Optional
+
+import numpy as np
+
+import chess
+from chess import epd, errors, fen
+from chess.move import Move
+from chess.pgn import PGNReader
+from chess.piece import PieceColor
+
+
+# name -> dtype and shape of one position
+FIELDS = {
+    'planes': ('<u8', (len(fen.PLANE_PIECES),)),
+    'side': ('u1', ()),
+    'castling': ('u1', ()),
+    'en_passant': ('u1', ()),
+    'halfmoves': ('<u2', ()),
+    'keys': ('<u8', ()),
+    'moves': ('<u2', ()),
+    'results': ('i1', ()),
+}
+
+RESULTS = {'1-0': 1, '1/2-1/2': 0, '0-1': -1}
+
+SHARD_SIZE = 1 << 20
+# positions buffered before they're written
+CHUNK_SIZE = 1 << 14
+
+
+def unpack_planes(planes: np.ndarray) -> np.ndarray:
+    """Turns bitboards, shaped ``(..., 12)``, into planes of ones and zeros, shaped ``(..., 12, 8, 8)``.
+
+    A plane is indexed by row and then column, so ``[0, 0]`` is a1.
+    """
+
+    planes = np.ascontiguousarray(planes, dtype='<u8')
+    # each byte of a little-endian bitboard is a row, with a1 in its lowest bit
+    rows = planes.view(np.uint8).reshape(planes.shape + (8, 1))
+    return np.unpackbits(rows, axis=-1, bitorder='little')
+
+
+class ShardWriter:
+    """Writes positions to a directory of shards.
+
+    Use it as a context manager, or call ShardWriter.close when done,
+    so the last positions and the manifest get written.
+    """
+
+    def __init__(
+            self,
+            directory: str,
+            *,
+            shard_size: int = SHARD_SIZE,
+            chunk_size: int = CHUNK_SIZE,
+            deduplicate: bool = False
+    ):
+        self.directory = directory
+        self.shard_size = shard_size
+        self.chunk_size = min(chunk_size, shard_size)
+        self.seen: 'Optional[set[int]]' = set() if deduplicate else None
+
+        self.buffer = {
+            name: np.zeros((self.chunk_size,) + shape, dtype=dtype)
+            for name, (dtype, shape) in FIELDS.items()
+        }
+        self.buffered = 0
+        # the memory-mapped files of the shard being filled, and how many positions it has
+        self.arrays: 'Optional[dict[str, np.ndarray]]' = None
+        self.filled = 0
+        self.shards: 'list[dict]' = []
+        self.positions = 0
+        self.duplicates = 0
+
+        os.makedirs(directory, exist_ok=True)
+
+    def __repr__(self) -> str:
+        return f'<ShardWriter directory={self.directory!r} positions={self.positions}>'
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def add(self, board: chess.Board, move: Optional[Move], result: int) -> bool:
+        """Adds a position. Returns False if it was left out as a duplicate."""
+
+        key = board.zobrist
+        if self.seen is not None:
+            if key in self.seen:
+                self.duplicates += 1
+                return False
+            self.seen.add(key)
+
+        n = self.buffered
+        buffer = self.buffer
+        square = board.en_passant_square
+        buffer['planes'][n] = fen.planes(board)
+        buffer['side'][n] = board.active_color == PieceColor.WHITE
+        buffer['castling'][n] = board.castle_state.id
+        buffer['en_passant'][n] = square.row * 8 + square.column if square else 255
+        buffer['halfmoves'][n] = min(board.halfmoves, 0xFFFF)
+        buffer['keys'][n] = key
+        buffer['moves'][n] = move.id if move else 0
+        buffer['results'][n] = result
+
+        self.buffered += 1
+        self.positions += 1
+        if self.buffered == self.chunk_size:
+            self.flush()
+        return True
+
+    def flush(self):
+        """Copies the buffered positions into the shards."""
+
+        written = 0
+        while written < self.buffered:
+            if self.arrays is None:
+                self._open_shard()
+
+            count = min(self.buffered - written, self.shard_size - self.filled)
+            for name, array in self.arrays.items():
+                array[self.filled:self.filled + count] = self.buffer[name][written:written + count]
+            self.filled += count
+            written += count
+
+            if self.filled == self.shard_size:
+                self._close_shard()
+
+        self.buffered = 0
+
+    def _shard_path(self, number: int, name: str) -> str:
+        return os.path.join(self.directory, f'shard-{number:05d}', f'{name}.npy')
+
+    def _open_shard(self):
+        number = len(self.shards)
+        os.makedirs(os.path.dirname(self._shard_path(number, '')), exist_ok=True)
+        self.arrays = {
+            name: np.lib.format.open_memmap(
+                self._shard_path(number, name), mode='w+', dtype=dtype, shape=(self.shard_size,) + shape
+            )
+            for name, (dtype, shape) in FIELDS.items()
+        }
+        self.filled = 0
+
+    def _close_shard(self):
+        number = len(self.shards)
+        for name, array in self.arrays.items():
+            array.flush()
+            if self.filled == self.shard_size:
+                continue
+
+            # the last shard is cut down to the positions it has, a chunk at a time
+            path = self._shard_path(number, name)
+            dtype, shape = FIELDS[name]
+            trimmed = np.lib.format.open_memmap(
+                f'{path}.tmp', mode='w+', dtype=dtype, shape=(self.filled,) + shape
+            )
+            for start in range(0, self.filled, self.chunk_size):
+                end = min(start + self.chunk_size, self.filled)
+                trimmed[start:end] = array[start:end]
+            trimmed.flush()
+            del trimmed
+            os.replace(f'{path}.tmp', path)
+
+        self.arrays = None
+        self.shards.append({'directory': f'shard-{number:05d}', 'positions': self.filled})
+
+    def close(self):
+        """Writes the buffered positions, cuts the last shard to size and writes the manifest."""
+
+        self.flush()
+        if self.arrays is not None:
+            self._close_shard()
+
+        manifest = {
+            'fields': {name: [dtype, list(shape)] for name, (dtype, shape) in FIELDS.items()},
+            'plane_pieces': list(fen.PLANE_PIECES),
+            'positions': self.positions,
+            'duplicates': self.duplicates,
+            'shards': self.shards,
+        }
+        path = os.path.join(self.directory, 'manifest.json')
+        with open(f'{path}.tmp', 'w') as file:
+            json.dump(manifest, file, indent=4)
+        os.replace(f'{path}.tmp', path)
+
+
+def export_pgn(writer: ShardWriter, path: str) -> 'tuple[int, int]':
+    """Writes the positions of every game in a PGN file. Returns the games written and skipped."""
+
+    written = skipped = 0
+    with PGNReader(path) as reader:
+        for game in reader.games():
+            result = RESULTS.get(game.result)
+            if result is None:
+                skipped += 1
+                continue
+
+            # a game is only written once all of it could be replayed
+            try:
+                positions = [(board.copy(), move) for board, move in game.moves()]
+            except errors.InvalidPGN:
+                skipped += 1
+                continue
+
+            for board, move in positions:
+                writer.add(board, move, result)
+            written += 1
+
+    return written, skipped
+
+
+def export_epd(writer: ShardWriter, path: str) -> 'tuple[int, int]':
+    """Writes the positions of the lines of an EPD file. Returns the lines written and skipped."""
+
+    written = skipped = 0
+    with open(path) as file:
+        for line in file:
+            if not line.strip() or line.lstrip().startswith('#'):
+                continue
+
+            try:
+                position = epd.parse_epd(line)
+                result = RESULTS.get((position.operations.get('c9') or [None])[0])
+                best_moves = position.moves('bm')
+                board = position.board()
+            except errors.ChessError:
+                skipped += 1
+                continue
+            if result is None:
+                skipped += 1
+                continue
+
+            writer.add(board, best_moves[0] if best_moves else None, result)
+            written += 1
+
+    return written, skipped
+
+
+def load_shards(directory: str) -> 'list[dict[str, np.ndarray]]':
+    """Memory-maps every shard in an exported directory, in the order they were written."""
+
+    with open(os.path.join(directory, 'manifest.json')) as file:
+        manifest = json.load(file)
+
+    return [
+        {
+            name: np.load(os.path.join(directory, shard['directory'], f'{name}.npy'), mmap_mode='r')
+            for name in manifest['fields']
+        }
+        for shard in manifest['shards']
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Exports positions from PGN or EPD files as training data.')
+    parser.add_argument('paths', nargs='+', help='PGN files, ending in .pgn, and EPD files')
+    parser.add_argument('--output', required=True, help='the directory to write shards to')
+    parser.add_argument('--shard-size', type=int, default=SHARD_SIZE, help='positions per shard')
+    parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE, help='positions buffered before writing')
+    parser.add_argument('--deduplicate', action='store_true', help='leave out repeated positions')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    with ShardWriter(
+        args.output,
+        shard_size=args.shard_size,
+        chunk_size=args.chunk_size,
+        deduplicate=args.deduplicate
+    ) as writer:
+        for path in args.paths:
+            export = export_pgn if path.lower().endswith('.pgn') else export_epd
+            written, skipped = export(writer, path)
+            print(f'{path}: {written} written, {skipped} skipped')
+
+    elapsed = time.perf_counter() - start
+    print(
+        f'{writer.positions} positions ({writer.duplicates} duplicates left out) '
+        f'in {len(writer.shards)} shards, {writer.positions / elapsed:.0f} positions/s'
+    )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,520 @@
+"""Texel-style tuning of Oyster's evaluation.
+
+Fits ``PIECE_SCORES``, ``PIECE_SQUARE_TABLES`` and ``MOBILITY_WEIGHT`` from
+chess.engines.oyster, and ``PAWN_WEIGHTS`` from chess.engines.pawns, to the
+results of games. Each position is scored with the
+classic evaluation, turned into an expected result with a logistic curve, and
+the parameters are moved by gradient descent to make the squared difference
+from the real results as small as possible.
+
+The evaluation is linear in its parameters, so a position only needs to be
+turned into features once: the (square, piece) entries it activates, each +1
+for White and -1 for Black, its mobility and its pawn terms. The features are cached as
+``.npy`` files, so later runs skip straight to the descent. The descent works
+on all the positions at once with NumPy, about half a second per iteration
+for a million positions.
+
+Every line of the input files is one position, as a FEN or EPD with its
+game's result from White's side, in any of these forms::
+
+    <fen> [1.0]
+    <fen> "1/2-1/2"
+    <epd> c9 "0-1";
+    <fen> | <score> | 0.5
+
+Lines without a result are skipped.
+
+Usage:
+    python -m chess.tune positions.epd --cache positions.cache --output tuned.py
+
+This needs NumPy.
+"""
+
+import argparse
+import json
+import math
+import os
+import re
+import sys
+import time
+from typing import NamedTuple, Optional
+
+import numpy as np
+
+from chess.engines.oyster import PIECE_SQUARE_TABLES, OysterEngine, attack_mobility
+from chess.engines.pawns import PAWN_TERMS, PAWN_WEIGHTS, pawn_terms
+from chess.piece import PieceColor, PieceType
+
+
+# the order of the tables in the parameters
+TYPES = (PieceType.PAWN, PieceType.KNIGHT, PieceType.BISHOP, PieceType.ROOK, PieceType.QUEEN, PieceType.KING)
+TYPE_NAMES = ('PAWN', 'KNIGHT', 'BISHOP', 'ROOK', 'QUEEN', 'KING')
+
+PIECE_LETTERS = {
+    'p': PieceType.PAWN,
+    'n': PieceType.KNIGHT,
+    'b': PieceType.BISHOP,
+    'r': PieceType.ROOK,
+    'q': PieceType.QUEEN,
+    'k': PieceType.KING,
+}
+
+# parameters: a piece score for each type, a table entry for each (type, square)
+# with rows as in PIECE_SQUARE_TABLES, the mobility weight, then the pawn weights
+SCORES = 0
+TABLES = len(TYPES)
+MOBILITY = TABLES + len(TYPES) * 64
+PAWNS = MOBILITY + 1
+PARAMETERS = PAWNS + PAWN_TERMS
+
+# a piece activates one table entry and its type's score, so only the table
+# entry is stored (see _evaluate)
+MAX_PIECES = 32
+
+RESULTS = {'1-0': 1.0, '0-1': 0.0, '1/2-1/2': 0.5}
+RESULT_PATTERN = re.compile(r'(1-0|0-1|1/2-1/2)|\[\s*(\d*\.?\d+)\s*\]')
+
+CACHE_FILES = ('indices', 'signs', 'mobility', 'pawns', 'results')
+# how many positions the descent works on at a time, to bound its memory use
+CHUNK_SIZE = 1 << 18
+
+
+class Dataset(NamedTuple):
+    """Positions converted to features.
+
+    indices -- int16, (positions, 32), table entries, padded with zeros
+    signs -- int8, (positions, 32), 1 for White's pieces, -1 for Black's and 0 for padding
+    mobility -- int16, (positions,), White's mobility minus Black's
+    pawns -- int8, (positions, PAWN_TERMS), the pawn terms, see chess.engines.pawns
+    results -- float32, (positions,), the result from White's side
+    """
+
+    indices: np.ndarray
+    signs: np.ndarray
+    mobility: np.ndarray
+    pawns: np.ndarray
+    results: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.results)
+
+
+def parse_result(text: str) -> Optional[float]:
+    """Returns the result in the label part of a line, or None if it has none."""
+
+    if '|' in text:
+        text = f'[{text.rsplit("|", 1)[1].strip()}]'
+
+    match = RESULT_PATTERN.search(text)
+    if match is None:
+        return None
+    if match.group(1):
+        return RESULTS[match.group(1)]
+
+    result = float(match.group(2))
+    return result if 0 <= result <= 1 else None
+
+
+def parse_line(line: str) -> 'Optional[tuple[str, float]]':
+    """Splits a labelled line into its piece placement and result."""
+
+    fields = line.split()
+    if len(fields) < 4 or fields[0].count('/') != 7:
+        return None
+
+    # skip the side to move, castling and en passant fields and a FEN's
+    # move counters, so the counters can't be taken for a result
+    label = fields[4:]
+    if len(label) >= 2 and label[0].isdigit() and label[1].isdigit():
+        label = label[2:]
+
+    result = parse_result(' '.join(label))
+    if result is None:
+        return None
+    return fields[0], result
+
+
+def placement_features(placement: str) -> 'tuple[list[int], list[int], int, list[int]]':
+    """Returns the table entries, signs, mobility and pawn terms of a FEN piece placement."""
+
+    indices = []
+    signs = []
+
+    occupied = 0
+    occupancy = {PieceColor.WHITE: 0, PieceColor.BLACK: 0}
+    pawns = {PieceColor.WHITE: 0, PieceColor.BLACK: 0}
+    mobile_pieces = []
+
+    for rank, rank_text in enumerate(placement.split('/')):
+        # FEN starts at the eighth rank, Board.rows at the first
+        i = 7 - rank
+        j = 0
+        for char in rank_text:
+            if char.isdigit():
+                j += int(char)
+                continue
+
+            piece_type = PIECE_LETTERS.get(char.lower())
+            if piece_type is None or j > 7:
+                raise ValueError(f'Invalid piece placement: {placement}')
+
+            color = PieceColor.WHITE if char.isupper() else PieceColor.BLACK
+            row = 7 - i if color == PieceColor.WHITE else i
+            indices.append(TYPES.index(piece_type) * 64 + row * 8 + j)
+            signs.append(1 if color == PieceColor.WHITE else -1)
+
+            bit = 1 << (i * 8 + j)
+            occupied |= bit
+            occupancy[color] |= bit
+            if piece_type == PieceType.PAWN:
+                # the pawn terms only have passed pawn rows for the second to seventh ranks
+                if i in (0, 7):
+                    raise ValueError(f'Pawn on the first or last rank: {placement}')
+                pawns[color] |= bit
+            elif piece_type != PieceType.KING:
+                mobile_pieces.append((piece_type, color, i * 8 + j))
+            j += 1
+
+    if len(indices) > MAX_PIECES:
+        raise ValueError(f'Too many pieces: {placement}')
+
+    return (
+        indices,
+        signs,
+        attack_mobility(mobile_pieces, occupied, occupancy, pawns),
+        pawn_terms(pawns[PieceColor.WHITE], pawns[PieceColor.BLACK])
+    )
+
+
+def read_positions(paths: 'list[str]'):
+    """Yields ``(placement, result)`` for every labelled line in the files."""
+
+    for path in paths:
+        with open(path) as file:
+            for line in file:
+                position = parse_line(line)
+                if position is not None:
+                    yield position
+
+
+def build_dataset(positions) -> Dataset:
+    """Converts ``(placement, result)`` pairs to features."""
+
+    chunks = []
+    chunk = []
+    for placement, result in positions:
+        try:
+            chunk.append((placement_features(placement), result))
+        except ValueError:
+            continue
+        if len(chunk) == CHUNK_SIZE:
+            chunks.append(_convert_chunk(chunk))
+            chunk = []
+    chunks.append(_convert_chunk(chunk))
+
+    return Dataset(*(np.concatenate(arrays) for arrays in zip(*chunks)))
+
+
+def _convert_chunk(chunk) -> 'tuple[np.ndarray, ...]':
+    indices = np.zeros((len(chunk), MAX_PIECES), dtype=np.int16)
+    signs = np.zeros((len(chunk), MAX_PIECES), dtype=np.int8)
+    mobility = np.empty(len(chunk), dtype=np.int16)
+    pawns = np.empty((len(chunk), PAWN_TERMS), dtype=np.int8)
+    results = np.empty(len(chunk), dtype=np.float32)
+
+    for n, ((position_indices, position_signs, position_mobility, position_pawns), result) in enumerate(chunk):
+        indices[n, :len(position_indices)] = position_indices
+        signs[n, :len(position_signs)] = position_signs
+        mobility[n] = position_mobility
+        pawns[n] = position_pawns
+        results[n] = result
+
+    return indices, signs, mobility, pawns, results
+
+
+def _sources(paths: 'list[str]') -> list:
+    return [[os.path.abspath(path), os.path.getsize(path), os.path.getmtime(path)] for path in paths]
+
+
+def load_dataset(paths: 'list[str]', cache: Optional[str] = None) -> Dataset:
+    """Reads the positions in the files, or their features from the cache directory.
+
+    The cache is rebuilt when the files have changed since it was written.
+    Cached arrays are memory-mapped rather than read in.
+    """
+
+    sources_path = cache and os.path.join(cache, 'sources.json')
+    if cache and all(
+        os.path.exists(os.path.join(cache, name))
+        for name in ['sources.json'] + [f'{name}.npy' for name in CACHE_FILES]
+    ):
+        with open(sources_path) as file:
+            if json.load(file) == _sources(paths):
+                return Dataset(*(
+                    np.load(os.path.join(cache, f'{name}.npy'), mmap_mode='r')
+                    for name in CACHE_FILES
+                ))
+
+    dataset = build_dataset(read_positions(paths))
+
+    if cache:
+        os.makedirs(cache, exist_ok=True)
+        for name, array in zip(CACHE_FILES, dataset):
+            np.save(os.path.join(cache, f'{name}.npy'), array)
+        # written last, so an interrupted run doesn't leave a cache that looks complete
+        with open(sources_path, 'w') as file:
+            json.dump(_sources(paths), file)
+
+    return dataset
+
+
+def initial_parameters() -> np.ndarray:
+    """Returns Oyster's current evaluation parameters."""
+
+    parameters = np.zeros(PARAMETERS)
+    for t, piece_type in enumerate(TYPES):
+        parameters[SCORES + t] = OysterEngine.PIECE_SCORES[piece_type]
+        parameters[TABLES + t * 64:TABLES + (t + 1) * 64] = np.ravel(PIECE_SQUARE_TABLES[piece_type])
+    parameters[MOBILITY] = OysterEngine.MOBILITY_WEIGHT
+    parameters[PAWNS:] = PAWN_WEIGHTS
+    return parameters
+
+
+def _values(parameters: np.ndarray) -> np.ndarray:
+    # each table entry plus its type's score
+    return (parameters[TABLES:MOBILITY].reshape(len(TYPES), 64) + parameters[SCORES:TABLES, None]).ravel()
+
+
+def _chunks(dataset: Dataset):
+    for start in range(0, len(dataset), CHUNK_SIZE):
+        yield Dataset(*(np.asarray(array[start:start + CHUNK_SIZE]) for array in dataset))
+
+
+def _evaluate(values: np.ndarray, parameters: np.ndarray, chunk: Dataset) -> np.ndarray:
+    return (
+        (values[chunk.indices] * chunk.signs).sum(axis=1)
+        + parameters[MOBILITY] * chunk.mobility
+        + chunk.pawns @ parameters[PAWNS:]
+    )
+
+
+def evaluate(parameters: np.ndarray, dataset: Dataset) -> np.ndarray:
+    """Returns the evaluation of every position in centipawns, from White's side."""
+
+    values = _values(parameters)
+    return np.concatenate([
+        _evaluate(values, parameters, chunk) for chunk in _chunks(dataset)
+    ] or [np.empty(0)])
+
+
+def expected_results(scores: np.ndarray, k: float) -> np.ndarray:
+    """Turns centipawn scores into expected results."""
+
+    return 1 / (1 + 10 ** (-k * scores / 400))
+
+
+def error(parameters: np.ndarray, dataset: Dataset, k: float) -> float:
+    """Returns the mean squared difference between the expected and real results."""
+
+    total = 0.0
+    values = _values(parameters)
+    for chunk in _chunks(dataset):
+        expected = expected_results(_evaluate(values, parameters, chunk), k)
+        total += float(np.sum((chunk.results - expected) ** 2))
+    return total / max(len(dataset), 1)
+
+
+def fit_k(parameters: np.ndarray, dataset: Dataset, low: float = 0.05, high: float = 5.0) -> float:
+    """Returns the scaling constant that fits the current evaluation best.
+
+    Uses a golden section search, as the error only has one minimum in k.
+    """
+
+    scores = evaluate(parameters, dataset)
+
+    def k_error(k: float) -> float:
+        return float(np.mean((dataset.results - expected_results(scores, k)) ** 2))
+
+    ratio = (math.sqrt(5) - 1) / 2
+    a, b = low, high
+    c, d = b - ratio * (b - a), a + ratio * (b - a)
+    error_c, error_d = k_error(c), k_error(d)
+    while b - a > 1e-4:
+        if error_c < error_d:
+            b, d, error_d = d, c, error_c
+            c = b - ratio * (b - a)
+            error_c = k_error(c)
+        else:
+            a, c, error_c = c, d, error_d
+            d = a + ratio * (b - a)
+            error_d = k_error(d)
+    return (a + b) / 2
+
+
+def gradient(parameters: np.ndarray, dataset: Dataset, k: float) -> 'tuple[np.ndarray, float]':
+    """Returns the gradient of the error with respect to the parameters, and the error."""
+
+    table_gradient = np.zeros(len(TYPES) * 64)
+    mobility_gradient = 0.0
+    pawn_gradient = np.zeros(PAWN_TERMS)
+    total = 0.0
+
+    values = _values(parameters)
+    for chunk in _chunks(dataset):
+        expected = expected_results(_evaluate(values, parameters, chunk), k)
+        difference = expected - chunk.results
+        total += float(np.sum(difference ** 2))
+
+        # d(error)/d(score) for each position
+        slope = difference * expected * (1 - expected) * (2 * k * math.log(10) / 400)
+        table_gradient += np.bincount(
+            chunk.indices.ravel(),
+            weights=(chunk.signs * slope[:, None]).ravel(),
+            minlength=len(TYPES) * 64
+        )
+        mobility_gradient += float(slope @ chunk.mobility)
+        pawn_gradient += slope @ chunk.pawns
+
+    count = max(len(dataset), 1)
+    result = np.empty(PARAMETERS)
+    result[TABLES:MOBILITY] = table_gradient / count
+    # a piece score is part of every entry of its table
+    result[SCORES:TABLES] = table_gradient.reshape(len(TYPES), 64).sum(axis=1) / count
+    # the kings always cancel out
+    result[SCORES + TYPES.index(PieceType.KING)] = 0
+    result[MOBILITY] = mobility_gradient / count
+    result[PAWNS:] = pawn_gradient / count
+    return result, total / count
+
+
+def tune(
+    dataset: Dataset,
+    parameters: Optional[np.ndarray] = None,
+    *,
+    k: Optional[float] = None,
+    iterations: int = 500,
+    learning_rate: float = 2.0,
+    log=None
+) -> 'tuple[np.ndarray, float]':
+    """Tunes the parameters with Adam and returns them with the error they reach.
+
+    ``k`` is fitted to the starting parameters when it isn't given.
+    ``log`` is called with the iteration number and error every so often.
+    """
+
+    parameters = initial_parameters() if parameters is None else parameters.astype(np.float64)
+    if k is None:
+        k = fit_k(parameters, dataset)
+
+    beta1, beta2, epsilon = 0.9, 0.999, 1e-8
+    mean = np.zeros(PARAMETERS)
+    variance = np.zeros(PARAMETERS)
+
+    for iteration in range(1, iterations + 1):
+        grad, current_error = gradient(parameters, dataset, k)
+        if log and (iteration == 1 or iteration % 50 == 0):
+            log(iteration, current_error)
+
+        mean = beta1 * mean + (1 - beta1) * grad
+        variance = beta2 * variance + (1 - beta2) * grad ** 2
+        corrected_mean = mean / (1 - beta1 ** iteration)
+        corrected_variance = variance / (1 - beta2 ** iteration)
+        parameters -= learning_rate * corrected_mean / (np.sqrt(corrected_variance) + epsilon)
+
+    return normalize(parameters), error(parameters, dataset, k)
+
+
+def normalize(parameters: np.ndarray) -> np.ndarray:
+    """Moves the average of each table into its piece score.
+
+    A piece score and its table can trade any amount between them without
+    changing the evaluation, so this keeps the tables centred on zero.
+    Pawn tables are averaged over the second to seventh ranks, where pawns can be.
+    The king's score is left alone.
+    """
+
+    parameters = parameters.copy()
+    for t, piece_type in enumerate(TYPES):
+        if piece_type == PieceType.KING:
+            continue
+        table = parameters[TABLES + t * 64:TABLES + (t + 1) * 64].reshape(8, 8)
+        mean = table[1:7].mean() if piece_type == PieceType.PAWN else table.mean()
+        table -= mean
+        if piece_type == PieceType.PAWN:
+            table[0] = table[7] = 0
+        parameters[SCORES + t] += mean
+    return parameters
+
+
+def format_parameters(parameters: np.ndarray) -> str:
+    """Returns the parameters as Python source, in the layout oyster.py uses."""
+
+    parameters = np.rint(parameters).astype(int)
+
+    lines = ['PIECE_SQUARE_TABLES = {']
+    for t, name in enumerate(TYPE_NAMES):
+        table = parameters[TABLES + t * 64:TABLES + (t + 1) * 64].reshape(8, 8)
+        lines.append(f'    PieceType.{name}: [')
+        for n, row in enumerate(table):
+            comma = ',' if n < 7 else ''
+            lines.append('        (' + ', '.join(f'{value:4d}' for value in row) + ')' + comma)
+        lines.append('    ],' if t < len(TYPES) - 1 else '    ]')
+    lines.append('}')
+    lines.append('')
+
+    lines.append('PIECE_SCORES = {')
+    for t, name in reversed(list(enumerate(TYPE_NAMES))):
+        comma = ',' if t else ''
+        lines.append(f'    PieceType.{name}: {parameters[SCORES + t]}{comma}')
+    lines.append('}')
+    lines.append('')
+    lines.append(f'MOBILITY_WEIGHT = {parameters[MOBILITY]}')
+    lines.append('')
+    lines.append(f'PAWN_WEIGHTS = ({", ".join(str(weight) for weight in parameters[PAWNS:])})')
+    return '\n'.join(lines) + '\n'
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tunes Oyster's evaluation on labelled positions.")
+    parser.add_argument('files', nargs='+', help='FEN or EPD files with a result on every line')
+    parser.add_argument('--cache', help='a directory to cache the features in')
+    parser.add_argument('--iterations', type=int, default=500)
+    parser.add_argument('--learning-rate', type=float, default=2.0)
+    parser.add_argument('-k', type=float, help='the scaling constant, fitted when not given')
+    parser.add_argument('--output', help='where to write the tables, standard output by default')
+    args = parser.parse_args()
+
+    def log(message: str):
+        print(message, file=sys.stderr, flush=True)
+
+    start = time.perf_counter()
+    dataset = load_dataset(args.files, args.cache)
+    log(f'{len(dataset)} positions loaded in {time.perf_counter() - start:.1f}s')
+    if not len(dataset):
+        sys.exit('No labelled positions found.')
+
+    parameters = initial_parameters()
+    k = args.k or fit_k(parameters, dataset)
+    log(f'k = {k:.4f}, starting error {error(parameters, dataset, k):.6f}')
+
+    start = time.perf_counter()
+    parameters, final_error = tune(
+        dataset,
+        parameters,
+        k=k,
+        iterations=args.iterations,
+        learning_rate=args.learning_rate,
+        log=lambda iteration, current_error: log(f'iteration {iteration}: error {current_error:.6f}')
+    )
+    log(f'final error {final_error:.6f} after {time.perf_counter() - start:.1f}s')
+
+    source = format_parameters(parameters)
+    if args.output:
+        with open(args.output, 'w') as file:
+            file.write(source)
+    else:
+        sys.stdout.write(source)
+
+
+if __name__ == '__main__':
+    main()
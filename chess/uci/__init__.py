@@ -0,0 +1,306 @@
+"""A UCI (Universal Chess Interface) front-end for the engines.
+
+Run ``python -m chess.uci`` and talk to it over stdin and stdout,
+or point a chess GUI or tournament manager at it.
+``--engine`` picks one of chess.engines.ENGINES by name.
+"""
+
+import argparse
+import sys
+import threading
+from typing import Optional
+
+import chess
+from chess.errors import ChessError
+from chess.engines import ENGINES, Engine, Limits, SearchInfo, engine_name
+
+
+# UCI spells these options differently than the engines do
+OPTION_NAMES = {'hash': 'Hash', 'threads': 'Threads', 'multipv': 'MultiPV'}
+
+# the range advertised for each number option
+OPTION_RANGES = {'depth': (1, 64), 'hash': (1, 4096), 'threads': (1, 64), 'multipv': (1, 256)}
+DEFAULT_OPTION_RANGE = (0, 1000000)
+
+# go parameters in milliseconds, and the Limits fields they fill in seconds
+GO_TIMES = {
+    'wtime': 'white_clock',
+    'btime': 'black_clock',
+    'winc': 'white_increment',
+    'binc': 'black_increment',
+    'movetime': 'time',
+}
+GO_COUNTS = {'depth': 'depth', 'nodes': 'nodes', 'movestogo': 'moves_to_go'}
+
+
+class UCI:
+    """Speaks UCI on behalf of an engine.
+
+    Commands are given to UCI.handle one line at a time.
+    Searches run in the background, so ``stop`` and ``ponderhit``
+    can be handled while the engine is thinking.
+    """
+
+    def __init__(self, engine: Engine, output=None):
+        self.engine = engine
+        self.output = output or sys.stdout
+        self.output_lock = threading.Lock()
+
+        self.board = chess.Board.default()
+        # the position command that set up the board, so the next one
+        # only has to play the moves that were added since
+        self.position_fen = chess.Board.DEFAULT_FEN
+        self.position_moves: 'list[str]' = []
+
+        self.search_board: Optional[chess.Board] = None
+        self.search_limits: Optional[Limits] = None
+        self.last_info: Optional[SearchInfo] = None
+        self.reporter: Optional[threading.Thread] = None
+        # infinite and ponder searches hold their bestmove until stop or ponderhit
+        self.release = threading.Event()
+
+    def send(self, line: str):
+        with self.output_lock:
+            self.output.write(line + '\n')
+            self.output.flush()
+
+    def run(self, lines=None):
+        """Handles commands until ``quit`` or the end of the input."""
+
+        for line in lines or sys.stdin:
+            if not self.handle(line):
+                break
+        else:
+            self.quit()
+
+    def handle(self, line: str) -> bool:
+        """Handles one command. Returns False once the engine should exit."""
+
+        command, *args = line.split() or ('',)
+
+        if command == 'uci':
+            self.uci()
+        elif command == 'isready':
+            self.send('readyok')
+        elif command == 'ucinewgame':
+            self.stop()
+            self.engine.new_game()
+        elif command == 'setoption':
+            self.set_option(args)
+        elif command == 'position':
+            self.position(args)
+        elif command == 'go':
+            self.go(args)
+        elif command == 'stop':
+            self.stop()
+        elif command == 'ponderhit':
+            self.ponderhit()
+        elif command == 'quit':
+            self.quit()
+            return False
+        elif command:
+            self.send(f'info string Unknown command: {command}')
+
+        return True
+
+    def uci(self):
+        self.send(f'id name {self.engine.__class__.__name__}')
+        self.send('id author Fyssion')
+
+        for key, default in self.engine.OPTIONS.items():
+            name = OPTION_NAMES.get(key, key)
+            if isinstance(default, bool):
+                self.send(f'option name {name} type check default {str(default).lower()}')
+            elif isinstance(default, int):
+                low, high = OPTION_RANGES.get(key, DEFAULT_OPTION_RANGE)
+                self.send(f'option name {name} type spin default {default} min {low} max {high}')
+            else:
+                self.send(f'option name {name} type string default {default}')
+
+        # tells the GUI it may send go ponder
+        self.send('option name Ponder type check default false')
+        self.send('uciok')
+
+    def set_option(self, args: 'list[str]'):
+        if 'name' not in args:
+            return
+
+        if 'value' in args:
+            value_index = args.index('value')
+            name = ' '.join(args[args.index('name') + 1:value_index])
+            value = ' '.join(args[value_index + 1:])
+        else:
+            name = ' '.join(args[args.index('name') + 1:])
+            value = ''
+
+        key = name.lower().replace(' ', '_')
+        if key == 'ponder':
+            return
+
+        if key not in self.engine.OPTIONS:
+            self.send(f'info string Unknown option: {name}')
+            return
+
+        try:
+            value = self.engine.parse_option(key, value)
+        except ValueError:
+            self.send(f'info string Invalid value for {name}: {value}')
+            return
+
+        self.stop()
+        self.engine.set_option(key, value)
+
+    def position(self, args: 'list[str]'):
+        self.stop()
+
+        if args[:1] == ['startpos']:
+            fen = chess.Board.DEFAULT_FEN
+            rest = args[1:]
+        elif args[:1] == ['fen']:
+            fen = ' '.join(args[1:7])
+            rest = args[7:]
+        else:
+            self.send('info string Expected startpos or fen')
+            return
+
+        moves = rest[1:] if rest[:1] == ['moves'] else []
+
+        if fen == self.position_fen and moves[:len(self.position_moves)] == self.position_moves:
+            new_moves = moves[len(self.position_moves):]
+        else:
+            try:
+                self.board = chess.Board.from_fen(fen)
+            except ChessError:
+                self.send(f'info string Invalid FEN: {fen}')
+                return
+            self.position_fen = fen
+            self.position_moves = []
+            new_moves = moves
+
+        for move in new_moves:
+            try:
+                self.board.push_uci(move)
+            except ChessError:
+                self.send(f'info string Illegal move: {move}')
+                return
+            self.position_moves.append(move)
+
+    def go(self, args: 'list[str]'):
+        self.stop()
+
+        fields = {}
+        ponder = False
+        infinite = False
+        args = iter(args)
+        for arg in args:
+            try:
+                if arg in GO_TIMES:
+                    fields[GO_TIMES[arg]] = int(next(args)) / 1000
+                elif arg in GO_COUNTS:
+                    fields[GO_COUNTS[arg]] = int(next(args))
+            except (StopIteration, ValueError):
+                self.send(f'info string Invalid value for {arg}')
+                return
+
+            if arg == 'infinite':
+                infinite = True
+            elif arg == 'ponder':
+                ponder = True
+
+        self.search_board = self.board.copy()
+        self.search_limits = Limits(**fields)
+        self.last_info = None
+
+        if infinite or ponder:
+            self.release.clear()
+        else:
+            self.release.set()
+
+        limits = Limits(infinite=True, **fields) if ponder else Limits(infinite=infinite, **fields)
+        # started from here rather than from the reporter thread, so a stop
+        # that comes right after go always reaches the search
+        self.engine.start_search(self.search_board, limits, self.info)
+        self.reporter = threading.Thread(target=self.report_best_move, daemon=True)
+        self.reporter.start()
+
+    def info(self, info: SearchInfo):
+        # called from the search thread
+        if info.multipv == 1:
+            self.last_info = info
+
+        parts = [f'info depth {info.depth}']
+        if self.engine.options.get('multipv', 1) > 1:
+            parts.append(f'multipv {info.multipv}')
+        if info.score is not None:
+            parts.append(f'score {self.format_score(info.score)}')
+        parts.append(f'nodes {info.nodes} nps {info.nps} time {int(info.time * 1000)}')
+        if info.pv:
+            parts.append(f'pv {" ".join(self.format_line(info.pv))}')
+
+        self.send(' '.join(parts))
+
+    def format_score(self, score: float) -> str:
+        mate_lower = getattr(self.engine, 'MATE_LOWER', None)
+        if mate_lower is not None and abs(score) >= mate_lower:
+            plies = self.engine.MATE_UPPER - abs(score)
+            moves = int(plies + 1) // 2
+            return f'mate {moves if score > 0 else -moves}'
+
+        return f'cp {round(score)}'
+
+    def format_line(self, moves: list) -> 'list[str]':
+        """Returns a line of moves from the searched position in UCI notation."""
+
+        board = self.search_board.copy()
+        line = []
+        for move in moves:
+            line.append(board.uci(move))
+            board.make_move(move)
+        return line
+
+    def report_best_move(self):
+        move = self.engine.wait()
+        self.release.wait()
+
+        if move is None:
+            self.send('bestmove 0000')
+            return
+
+        info = self.last_info
+        if info is not None and len(info.pv) > 1 and info.pv[0] == move:
+            best, ponder = self.format_line(info.pv[:2])
+            self.send(f'bestmove {best} ponder {ponder}')
+        else:
+            self.send(f'bestmove {self.search_board.uci(move)}')
+
+    def stop(self):
+        """Stops the running search, if there is one, and waits for its bestmove."""
+
+        if self.reporter is None:
+            return
+
+        self.engine.stop()
+        self.release.set()
+        self.reporter.join()
+        self.reporter = None
+
+    def ponderhit(self):
+        if self.reporter is None:
+            return
+
+        self.engine.ponderhit(self.search_limits)
+        self.release.set()
+
+    def quit(self):
+        self.stop()
+        self.engine.close()
+
+
+def main():
+    engines = {engine_name(engine_class): engine_class for engine_class in ENGINES}
+
+    parser = argparse.ArgumentParser(description='Runs an engine over UCI.')
+    parser.add_argument('--engine', choices=engines, default='oyster')
+    args = parser.parse_args()
+
+    UCI(engines[args.engine]()).run()
@@ -0,0 +1,28 @@
+"""Zobrist hashing keys.
+
+A position's key is the XOR of a random 64-bit number for every
+(piece, square) pair on the board, its castle state, its en passant file
+and the side to move. Keys are generated from a fixed seed, so they are
+the same in every process and every run.
+"""
+
+import random
+
+
+_random = random.Random(0x5eed)
+
+
+def _key() -> int:
+    return _random.getrandbits(64)
+
+
+# indexed by Piece.id, then by row * 8 + column
+PIECE_KEYS = tuple(tuple(_key() for _ in range(64)) for _ in range(16))
+
+# indexed by CastleState.id
+CASTLE_KEYS = tuple(_key() for _ in range(16))
+
+# indexed by the en passant square's column
+EN_PASSANT_KEYS = tuple(_key() for _ in range(8))
+
+BLACK_TO_MOVE_KEY = _key()
@@ -0,0 +1,68 @@
+import pytest
+
+import chess
+
+np = pytest.importorskip('numpy')
+batch = pytest.importorskip('chess.batch')
+
+
+FENS = [
+    chess.Board.DEFAULT_FEN,
+    'r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1',
+    'rnbqkbnr/ppp1pppp/8/8/3pP3/8/PPPP1PPP/RNBQKBNR b KQkq e3 0 3',
+    '8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1',
+    'r3k2r/Pppp1ppp/1b3nbN/nP6/BBP1P3/q4N2/Pp1P2PP/R2Q1RK1 w kq - 0 1',
+    'rnbq1k1r/pp1Pbppp/2p5/8/2B5/8/PPP1NnPP/RNBQK2R w KQ - 1 8',
+    '4k3/8/8/8/8/8/8/4K2R b K - 0 1',
+]
+
+
+def test_legal_moves():
+    boards = [chess.Board.from_fen(fen) for fen in FENS]
+    moves = batch.BoardBatch.from_boards(boards).legal_moves()
+
+    assert len(moves.offsets) == len(boards) + 1
+    for i, board in enumerate(boards):
+        expected = sorted(move.id for move in board.legal_moves())
+        assert sorted(moves.moves[moves.offsets[i]:moves.offsets[i + 1]].tolist()) == expected
+
+    assert list(batch.BoardBatch.from_boards(boards).legal_counts()) == list(moves.counts())
+
+
+def test_play():
+    boards = [chess.Board.from_fen(fen) for fen in FENS]
+    board_batch = batch.BoardBatch.from_boards(boards)
+    moves = board_batch.legal_moves()
+    children = board_batch.play(moves)
+
+    for n, (i, move_id) in enumerate(zip(moves.boards(), moves.moves.tolist())):
+        board = boards[i].copy()
+        board.make_move(board.move_from_id(move_id))
+        # the batch keeps an en passant square after every double push
+        assert children.fen(n).split()[:3] == board.fen.split()[:3]
+
+
+@pytest.mark.parametrize('fen, depth, nodes', [
+    (FENS[0], 3, 8902),
+    (FENS[1], 2, 2039),
+    (FENS[3], 3, 2812),
+    (FENS[4], 3, 9467),
+])
+def test_perft(fen: str, depth: int, nodes: int):
+    assert batch.perft(batch.BoardBatch.from_fens([fen]), depth).tolist() == [nodes]
+
+
+def test_attacks():
+    board_batch = batch.BoardBatch.from_fens([
+        '4k3/8/8/8/8/8/8/R3K3 w - - 0 1',
+        '4k3/8/8/8/8/8/8/4R1K1 b - - 0 1',
+    ])
+
+    white_attacks = int(board_batch.attacks(True)[0])
+    assert white_attacks & (1 << 56)  # a8, along the file
+    assert white_attacks & (1 << 3)  # d1, along the rank up to the king
+    assert not white_attacks & (1 << 7)  # h1, behind the king
+    assert board_batch.in_check().tolist() == [False, True]
+
+    masks = board_batch.move_masks()
+    assert int(masks[0, 0]) == int(chess.bitboard.rook_attacks(0, (1 << 0) | (1 << 4) | (1 << 60))) & ~(1 << 4)
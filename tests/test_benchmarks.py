@@ -0,0 +1,24 @@
+from benchmarks import run
+
+
+def test_measure():
+    results = run.run_benchmarks(['fen', 'is_in_check'], repeat=1, min_time=0)
+
+    assert set(results['benchmarks']) == {'fen', 'is_in_check'}
+    for result in results['benchmarks'].values():
+        assert result['operations'] > 0
+        assert result['ops_per_second'] > 0
+
+
+def test_compare():
+    def results(**speeds):
+        return {'benchmarks': {name: {'ops_per_second': speed} for name, speed in speeds.items()}}
+
+    baseline = results(fen=100, from_fen=100, parse_san=100)
+    comparison = run.compare(results(fen=80, from_fen=95, parse_san=120, evaluate=10), baseline, threshold=0.1)
+
+    assert comparison == {
+        'fen': (0.8, 'regression'),
+        'from_fen': (0.95, 'ok'),
+        'parse_san': (1.2, 'improvement'),
+    }
@@ -0,0 +1,106 @@
+import pytest
+
+import chess
+from chess import book, polyglot
+from chess.engines import OysterEngine
+
+
+GAMES = '''[Result "1-0"]
+
+1. e4 e5 2. Nf3 Nc6 3. Bc4 Nf6 4. O-O 1-0
+
+[Result "1/2-1/2"]
+
+1. e4 c5 2. Nf3 1/2-1/2
+
+[Result "0-1"]
+
+1. d4 d5 0-1
+
+[Result "*"]
+
+1. c4 *
+'''
+
+
+def build(tmp_path, **kwargs) -> str:
+    pgn_path = tmp_path / 'games.pgn'
+    pgn_path.write_text(GAMES)
+    book_path = str(tmp_path / 'book.bin')
+
+    tree = book.OpeningTree(**kwargs)
+    assert tree.add_pgn(str(pgn_path)) == 3
+    tree.write(book_path)
+    return book_path
+
+
+def test_encode_move():
+    board = chess.Board.from_fen('r3k2r/1P6/8/8/8/8/8/R3K2R w KQkq - 0 1')
+
+    assert book.encode_move(board, board.parse_san('O-O')) == 0o0407
+    assert book.encode_move(board, board.parse_san('O-O-O')) == 0o0400
+    assert book.encode_move(board, board.parse_san('bxa8=N')) == 1 << 12 | 0o6170
+
+
+# keys from the Polyglot format's documentation
+@pytest.mark.parametrize('fen, key', [
+    (chess.Board.DEFAULT_FEN, 0x463B96181691FC9C),
+    ('rnbqkbnr/pppppppp/8/8/4P3/8/PPPP1PPP/RNBQKBNR b KQkq e3 0 1', 0x823C9B50FD114196),
+    ('rnbqkbnr/ppp1p1pp/8/3pPp2/8/8/PPPP1PPP/RNBQKBNR w KQkq f6 0 3', 0x22A48B5A8E47FF78),
+    ('rnbq1bnr/ppp1pkpp/8/3pPp2/8/8/PPPPKPPP/RNBQ1BNR w - - 0 4', 0x00FDD303C946BDD9),
+    ('rnbqkbnr/p1pppppp/8/8/PpP4P/8/1P1PPPP1/RNBQKBNR b KQkq c3 0 3', 0x3C8123EA7B067637),
+    ('rnbqkbnr/p1pppppp/8/8/P6P/R1p5/1P1PPPP1/1NBQKBNR b Kkq - 0 4', 0x5C3F9B829B279560),
+])
+def test_polyglot_key(fen: str, key: int):
+    assert polyglot.polyglot_key(chess.Board.from_fen(fen)) == key
+
+
+def test_polyglot_key_after_moves():
+    board = chess.Board.default()
+    for san in ('e4', 'd5', 'e5', 'f5'):
+        board.make_move(board.parse_san(san, strict=True))
+    assert polyglot.polyglot_key(board) == 0x22A48B5A8E47FF78
+
+
+def test_book(tmp_path):
+    path = build(tmp_path)
+
+    with book.Book(path) as opening_book:
+        board = chess.Board.default()
+        assert opening_book.entries(0x463B96181691FC9C)
+        moves = [(board.san(move), weight) for move, weight in opening_book.moves(board)]
+        # two points a win and one a draw, for the side that played the move
+        assert moves == [('e4', 3), ('d4', 0)]
+        assert opening_book.choose(board, best=True) == board.parse_san('e4')
+
+        board.push_san('e4')
+        assert sorted(board.san(move) for move, _ in opening_book.moves(board)) == ['c5', 'e5']
+        assert [weight for _, weight in opening_book.moves(board)] == [1, 0]
+        # only e5 lost, so c5 is the only move ever picked
+        assert opening_book.choose(board) == board.parse_san('c5')
+
+        for san in ('c5', 'Nf3'):
+            board.push_san(san)
+        assert opening_book.moves(board) == []
+        assert opening_book.choose(board) is None
+
+
+def test_max_ply(tmp_path):
+    path = build(tmp_path, max_ply=1)
+
+    with book.Book(path) as opening_book:
+        assert len(opening_book) == 2
+
+
+def test_engine_plays_from_book(tmp_path):
+    engine = OysterEngine(book_file=build(tmp_path), depth=1)
+    board = chess.Board.from_fen('r1bqkb1r/pppp1ppp/2n2n2/4p3/2B1P3/5N2/PPPP1PPP/RNBQK2R w KQkq - 4 4')
+
+    result = engine.search(board)
+    assert len(result) == 1 and result[0].depth == 0
+    assert result[0].pv == [board.parse_san('O-O')]
+
+    # out of the book
+    board.push_san('O-O')
+    assert engine.search(board)[-1].depth == 1
+    engine.close()
@@ -0,0 +1,42 @@
+from chess import epd
+
+
+def test_parse_epd():
+    parsed = epd.parse_epd('4k3/8/8/3q4/8/8/3R4/4K3 w - - bm Rxd5; am Kf2 Ke2; id "hanging queen"; acd 2; hmvc 3;')
+
+    assert parsed.fen == '4k3/8/8/3q4/8/8/3R4/4K3 w - - 3 1'
+    assert parsed.id == 'hanging queen'
+    assert parsed.depth == 2
+    assert parsed.operations['am'] == ['Kf2', 'Ke2']
+    assert [move.lan for move in parsed.moves('bm')] == ['d2-d5']
+
+
+def test_run_suite():
+    lines = [
+        '6k1/5ppp/8/8/8/8/5PPP/3R2K1 w - - bm Rd8#; id "mate";',
+        '4k3/8/8/3q4/8/8/3R4/4K3 w - - am Rxd5; id "avoid";',
+    ]
+    summary = epd.run_suite(lines, limits={'depth': 2}, concurrency=1)
+
+    assert summary['positions'] == 2
+    mate, avoid = summary['results']
+    assert mate['id'] == 'mate' and mate['solved'] and mate['move'] == 'Rd8#'
+    assert mate['time_to_solution'] is not None
+    assert not avoid['solved'] and avoid['time_to_solution'] is None
+    assert summary['solved'] == 1
+    assert summary['nodes'] == mate['nodes'] + avoid['nodes']
+
+
+def test_run_suite_without_moves():
+    # checkmated, so there's nothing to search
+    printed = []
+    summary = epd.run_suite(
+        ['k7/1Q6/1K6/8/8/8/8/8 b - - id "mated";'], limits={'depth': 2}, concurrency=1, output=printed.append
+    )
+
+    report, = summary['results']
+    assert report['move'] is None and not report['solved']
+    assert report['depth'] is None and report['score'] is None
+    assert report['nodes'] == 0 and report['nps'] == 0
+    assert summary['solved'] == 0
+    assert 'failed' in printed[0]
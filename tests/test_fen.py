@@ -0,0 +1,85 @@
+import pytest
+
+import chess
+from chess import errors, fen
+
+
+@pytest.mark.parametrize('position, reason', [
+    ('rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq -', 'expected 6 fields'),
+    ('rnbqkbnr/pppppppp/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1', 'expected 8 ranks'),
+    ('rnbqkbnr/pppppppp/54/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1', 'rank'),
+    ('rnbqkbnr/ppppxppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1', 'piece'),
+    ('rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR x KQkq - 0 1', 'side'),
+    ('rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkx - 0 1', 'castle rights'),
+    ('rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq e4 0 1', 'en passant'),
+    ('rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - x 1', 'halfmove'),
+    ('rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQ1BNR w kq - 0 1', 'king'),
+    ('rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNP w kq - 0 1', 'pawn'),
+    ('rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBN1 w KQkq - 0 1', 'castle rights'),
+    ('rnbqkbnr/ppp1pppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq d6 0 1', 'just moved'),
+    ('rnbqkbnr/pppp1ppp/8/8/8/8/PPPP1PPP/RNBQRBNK w kq - 0 1', 'check'),
+    ('4k3/pppppppp/p7/8/8/8/8/4K3 w - - 0 1', '9 pawns'),
+    ('4k3/8/8/8/8/NNNNNNNN/NNNNNNNN/NNNNNNNK w - - 0 1', '24 pieces'),
+])
+def test_invalid_fen(position: str, reason: str):
+    with pytest.raises(errors.InvalidFEN) as info:
+        chess.Board.from_fen(position)
+    assert reason in info.value.reason
+
+
+def test_invalid_fen_without_reason():
+    error = errors.InvalidFEN()
+    assert error.reason is None
+    assert isinstance(error, errors.ChessError)
+
+
+def test_validate_off():
+    # White is to move, but Black is in check
+    position = 'rnbqkbnr/pppp1ppp/8/8/8/8/PPPP1PPP/RNBQRBNK w kq - 0 1'
+    assert chess.Board.from_fen(position, validate=False).fen == position
+
+
+def test_convert_lines():
+    lines = [
+        'rnbqkbnr/pppppppp/8/8/4P3/8/PPPP1PPP/RNBQKBNR   b KQkq e3 0 1\n',
+        '\n',
+        'not a fen\n',
+        '4k3/8/8/8/8/8/8/4K3 w - -\n',
+    ]
+    results = list(fen.convert_lines(lines, chunk_size=2))
+
+    converted = [position for positions, _ in results for position in positions]
+    invalid = [error for _, errors_ in results for error in errors_]
+    assert converted == [
+        'rnbqkbnr/pppppppp/8/8/4P3/8/PPPP1PPP/RNBQKBNR b KQkq e3 0 1',
+        '4k3/8/8/8/8/8/8/4K3 w - - 0 1',
+    ]
+    assert [number for number, _ in invalid] == [3]
+
+
+def test_binary_formats():
+    board = chess.Board.from_fen('4k3/8/8/8/8/8/8/4K3 w - - 0 1')
+
+    packed = fen.convert('4k3/8/8/8/8/8/8/4K3 w - - 0 1', 'packed')
+    assert chess.Board.from_packed(packed).fen == board.fen
+
+    values = fen.PLANES_FORMAT.unpack(fen.convert('4k3/8/8/8/8/8/8/4K3 w - - 0 1', 'planes'))
+    assert values[5] == 1 << 4
+    assert values[11] == 1 << 60
+    assert values[12:] == (1, 0, 255)
+
+
+def test_convert_too_many_pieces():
+    lines = [
+        '4k3/pppppppp/pppppppp/pppppppp/PPPPPPPP/PPPPPPPP/PPPPPPPP/4K3 w - - 0 1',
+        '4k3/8/8/8/8/8/8/4K3 w - - 0 1',
+    ]
+
+    converted, invalid = fen.convert_chunk(list(enumerate(lines, 1)), 'packed')
+    assert len(converted) == 1
+    assert [number for number, _ in invalid] == [1]
+
+    # without validation, the board only fails when it's packed
+    converted, invalid = fen.convert_chunk(list(enumerate(lines, 1)), 'packed', validate=False)
+    assert len(converted) == 1
+    assert invalid == [(1, "Boards with more than 32 pieces can't be packed.")]
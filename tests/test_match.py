@@ -0,0 +1,52 @@
+import pytest
+
+import chess
+from chess.match import SPRT, has_insufficient_material, parse_engine, pgn, play_game
+from chess.engines import OysterEngine
+
+
+def test_parse_engine():
+    assert parse_engine('oyster:lmr=false,hash=4') == (OysterEngine, {'lmr': False, 'hash': 4})
+
+    with pytest.raises(ValueError):
+        parse_engine('stockfish')
+
+
+@pytest.mark.parametrize(
+    'fen, insufficient',
+    [
+        ('8/8/8/4k3/8/8/8/4K3 w - - 0 1', True),
+        ('8/8/8/4k3/8/8/8/2B1K3 w - - 0 1', True),
+        ('8/8/8/4k3/8/8/8/1NB1K3 w - - 0 1', False),
+        ('8/8/8/4k3/8/8/4P3/4K3 w - - 0 1', False),
+    ]
+)
+def test_insufficient_material(fen: str, insufficient: bool):
+    assert has_insufficient_material(chess.Board.from_fen(fen)) == insufficient
+
+
+def test_sprt_direction():
+    sprt = SPRT(0, 20)
+
+    assert sprt.llr(60, 30, 10) > 0
+    assert sprt.llr(10, 30, 60) < 0
+    assert sprt.status(600, 300, 100) == 'H1'
+    assert sprt.status(100, 300, 600) == 'H0'
+    assert sprt.status(5, 5, 5) is None
+
+
+def test_play_game_and_pgn():
+    fen = '6k1/5ppp/8/8/8/8/5PPP/3R2K1 w - - 0 1'
+    game = play_game(1, fen, 'oyster:depth=2', 'random', {'depth': 2}, 10)
+
+    assert game['result'] in ('1-0', '0-1', '1/2-1/2')
+    assert game['stats']['white']['moves'] >= 1
+
+    text = pgn(game)
+    assert '[FEN "6k1/5ppp/8/8/8/8/5PPP/3R2K1 w - - 0 1"]' in text
+    assert text.rstrip().endswith(game['result'])
+
+    # every move in the PGN can be played back
+    board = chess.Board.from_fen(fen)
+    for san in game['moves']:
+        board.make_move(next(move for move in board.legal_moves() if board.san(move) == san))
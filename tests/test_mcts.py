@@ -0,0 +1,43 @@
+import random
+
+import pytest
+
+import chess
+from chess.engines import Limits, MCTSEngine
+
+
+@pytest.mark.parametrize(
+    'fen',
+    [
+        'rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1',
+        'r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1',
+        '8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1',
+    ]
+)
+def test_random_move_is_legal(fen: str):
+    board = chess.Board.from_fen(fen)
+    legal_moves = list(board.legal_moves())
+    rng = random.Random(0)
+
+    for _ in range(50):
+        assert board.random_move(rng) in legal_moves
+
+    assert board.fen == fen
+
+
+def test_random_move_without_moves():
+    board = chess.Board.from_fen('R6k/8/7K/8/8/8/8/8 b - - 0 1')
+
+    assert board.random_move() is None
+
+
+@pytest.mark.parametrize('processes', [1, 2])
+def test_mcts_finds_mate(processes: int):
+    board = chess.Board.from_fen('k7/8/1K6/8/8/8/8/7R w - - 0 1')
+    engine = MCTSEngine(processes=processes, playout_depth=8)
+
+    infos = engine.search(board, Limits(nodes=500))
+    engine.close()
+
+    assert infos[-1].pv[0].lan == 'h1-h8'
+    assert engine.playouts >= 500
@@ -0,0 +1,70 @@
+import pytest
+
+import chess
+from chess.engines import Limits, OysterEngine
+
+np = pytest.importorskip('numpy')
+nnue = pytest.importorskip('chess.engines.nnue')
+
+
+@pytest.mark.parametrize(
+    'fen',
+    [
+        'r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1',
+        'r2q1rk1/pP1p2pp/Q4n2/bbp1p3/Np6/1B3NBn/pPPP1PPP/R3K2R b KQ - 0 1',
+        'rnbqkbnr/ppp1pppp/8/8/3pP3/8/PPPP1PPP/RNBQKBNR b KQkq e3 0 3',
+    ]
+)
+def test_accumulator_matches_refresh(fen: str):
+    network = nnue.Network.random(16)
+    board = chess.Board.from_fen(fen)
+    board.accumulator = network.accumulator(board)
+
+    for move in list(board.legal_moves()):
+        board.make_move(move)
+        assert (board.accumulator.stack[-1] == network.refresh(board)).all(), move
+        board.unmake_move(move)
+
+    assert len(board.accumulator.stack) == 1
+    assert (board.accumulator.stack[0] == network.refresh(board)).all()
+
+
+def test_evaluate_batch_matches_evaluate():
+    network = nnue.Network.random(16)
+    boards = [
+        chess.Board.default(),
+        chess.Board.from_fen('r1bqkb1r/pppp1ppp/2n2n2/4p3/2B1P3/5N2/PPPP1PPP/RNBQK2R b KQkq - 4 4'),
+        chess.Board.from_fen('8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1'),
+    ]
+
+    assert list(network.evaluate_batch(boards)) == [network.evaluate(board) for board in boards]
+
+
+def test_evaluate_large_weights():
+    hidden = 512
+    network = nnue.Network(
+        np.full((nnue.INPUTS, hidden), 32767),
+        np.full(hidden, 32767),
+        np.full(2 * hidden, 32767),
+        0
+    )
+    boards = [chess.Board.default(), chess.Board.from_fen('8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1')]
+
+    # every activation is clipped to QA, and the output's sum doesn't fit in an int32
+    expected = 2 * hidden * nnue.QA * 32767 * nnue.SCALE // (nnue.QA * nnue.QB)
+    assert [network.evaluate(board) for board in boards] == [expected, expected]
+    assert list(network.evaluate_batch(boards)) == [expected, expected]
+
+
+def test_search_with_network(tmp_path):
+    path = str(tmp_path / 'network.npz')
+    nnue.Network.random(16).save(path)
+    fen = 'r1bqkb1r/pppp1ppp/2n2n2/4p3/2B1P3/5N2/PPPP1PPP/RNBQK2R w KQkq - 4 4'
+    board = chess.Board.from_fen(fen)
+    engine = OysterEngine(evaluator='nnue', nnue_file=path)
+
+    infos = engine.search(board, Limits(depth=2))
+
+    assert infos[-1].pv
+    assert board.fen == fen
+    assert board.accumulator is None
@@ -0,0 +1,158 @@
+import asyncio
+import time
+
+import pytest
+
+import chess
+from chess.engines import Limits, OysterEngine
+from chess.errors import InvalidOption
+
+
+@pytest.mark.parametrize('mobility', ['attacks', 'legal'])
+@pytest.mark.parametrize(
+    'fen',
+    [
+        'rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1',
+        'rnbqkbnr/ppp1pppp/8/8/3pP3/8/PPPP1PPP/RNBQKBNR b KQkq e3 0 3',
+        'r1bqkb1r/pppp1ppp/2n2n2/4p3/2B1P3/5N2/PPPP1PPP/RNBQK2R w KQkq - 4 4',
+    ]
+)
+def test_evaluate_leaves_board_untouched(fen: str, mobility: str):
+    board = chess.Board.from_fen(fen)
+    engine = OysterEngine(mobility=mobility)
+
+    engine.evaluate(board)
+
+    assert board.fen == fen
+
+
+@pytest.mark.parametrize('mobility', ['attacks', 'legal'])
+def test_evaluate_is_symmetric(mobility: str):
+    engine = OysterEngine(mobility=mobility)
+
+    white = engine.evaluate(chess.Board.from_fen('r1bqkb1r/pppp1ppp/2n2n2/4p3/2B1P3/5N2/PPPP1PPP/RNBQK2R w KQkq - 4 4'))
+    black = engine.evaluate(chess.Board.from_fen('rnbqk2r/pppp1ppp/5n2/2b1p3/4P3/2N2N2/PPPP1PPP/R1BQKB1R b KQkq - 4 4'))
+
+    assert white == pytest.approx(black)
+
+
+def test_invalid_option():
+    with pytest.raises(InvalidOption):
+        OysterEngine(depth_limit=3)
+
+
+# options that can change the score of a search
+PRUNING_OFF = {'null_move': False, 'lmr': False, 'futility': False, 'reverse_futility': False}
+
+
+@pytest.mark.parametrize('options', [
+    {'pvs': True, 'aspiration': False},
+    {'pvs': False, 'aspiration': True},
+    {'pvs': True, 'aspiration': True},
+])
+def test_search_options_keep_score(options: dict):
+    fen = 'r1bqkb1r/pppp1ppp/2n2n2/4p3/2B1P3/5N2/PPPP1PPP/RNBQK2R w KQkq - 4 4'
+    board = chess.Board.from_fen(fen)
+
+    reference = OysterEngine(pvs=False, aspiration=False, **PRUNING_OFF).search(chess.Board.from_fen(fen), Limits(depth=3))
+    infos = OysterEngine(**options, **PRUNING_OFF).search(board, Limits(depth=3))
+
+    assert [info.score for info in infos] == [info.score for info in reference]
+    assert board.fen == fen
+
+
+@pytest.mark.parametrize('options', [{}, PRUNING_OFF, {'quiescence': False}])
+def test_search_finds_mate(options: dict):
+    board = chess.Board.from_fen('k7/8/1K6/8/8/8/8/7R w - - 0 1')
+    engine = OysterEngine(**options)
+
+    infos = engine.search(board, Limits(depth=3))
+
+    assert engine.pv[0].lan == 'h1-h8'
+    assert infos[-1].score >= engine.MATE_LOWER
+
+
+def test_null_move_restores_board():
+    fen = 'rnbqkbnr/ppp1pppp/8/8/3pP3/8/PPPP1PPP/RNBQKBNR b KQkq e3 0 3'
+    board = chess.Board.from_fen(fen)
+
+    board.make_null_move()
+    assert board.en_passant_square is None
+    board.unmake_null_move()
+
+    assert board.fen == fen
+
+
+def test_ponderhit_ends_infinite_search():
+    board = chess.Board.from_fen('k7/8/1K6/8/8/8/8/7R w - - 0 1')
+    engine = OysterEngine()
+
+    engine.start_search(board, Limits(infinite=True))
+    time.sleep(0.2)
+    assert engine.search_thread.is_alive()
+
+    engine.ponderhit(Limits(time=0.1))
+    engine.search_thread.join(timeout=10)
+
+    assert not engine.search_thread.is_alive()
+    assert engine.wait().lan == 'h1-h8'
+    assert board.fen == 'k7/8/1K6/8/8/8/8/7R w - - 0 1'
+    engine.close()
+
+
+@pytest.mark.filterwarnings('ignore::pytest.PytestUnhandledThreadExceptionWarning')
+def test_failed_search_has_no_move():
+    board = chess.Board.default()
+    engine = OysterEngine(depth=1)
+
+    engine.start_search(board)
+    assert engine.wait() is not None
+
+    engine._search = None
+    engine.start_search(board)
+    # the search thread raised, so the last search's move isn't returned
+    assert engine.wait() is None
+    engine.close()
+
+
+def test_analyse_async_streams_and_stops():
+    board = chess.Board.from_fen('r1bqkb1r/pppp1ppp/2n2n2/4p3/2B1P3/5N2/PPPP1PPP/RNBQK2R w KQkq - 4 4')
+    engine = OysterEngine()
+
+    async def analyse():
+        analysis = engine.analyse_async(board, Limits(infinite=True))
+        depths = []
+        async for info in analysis:
+            depths.append(info.depth)
+            if info.depth == 2:
+                break
+        return depths, await analysis.stop()
+
+    depths, move = asyncio.run(analyse())
+    engine.close()
+
+    assert depths == [1, 2]
+    assert move in list(board.legal_moves())
+
+
+def test_analyse_multipv():
+    fen = 'r1bqkb1r/pppp1ppp/2n2n2/4p3/2B1P3/5N2/PPPP1PPP/RNBQK2R w KQkq - 4 4'
+    board = chess.Board.from_fen(fen)
+
+    reference = OysterEngine(**PRUNING_OFF).search(chess.Board.from_fen(fen), Limits(depth=3))
+    lines = OysterEngine(**PRUNING_OFF).analyse(board, 3, Limits(depth=3))
+
+    assert [line.multipv for line in lines] == [1, 2, 3]
+    assert len({line.pv[0].id for line in lines}) == 3
+    assert [line.score for line in lines] == sorted((line.score for line in lines), reverse=True)
+    assert lines[0].score == reference[-1].score
+    assert board.fen == fen
+
+
+def test_analyse_multipv_with_few_moves():
+    # the king only has two squares to go to
+    board = chess.Board.from_fen('k7/8/2K5/8/8/8/8/8 b - - 0 1')
+
+    lines = OysterEngine().analyse(board, 5, Limits(depth=2))
+
+    assert sorted(line.pv[0].lan for line in lines) == ['a8-a7', 'a8-b8']
@@ -0,0 +1,58 @@
+import chess
+from chess.engines import OysterEngine
+from chess.engines.pawns import pawn_structure, pawn_terms
+
+
+def pawns(board: chess.Board, color: int) -> int:
+    bitboard = 0
+    for i, row in enumerate(board.rows):
+        for j, piece in enumerate(row):
+            if piece and piece.type == chess.piece.PieceType.PAWN and piece.color == color:
+                bitboard |= 1 << (i * 8 + j)
+    return bitboard
+
+
+def test_pawn_terms():
+    # White: doubled and isolated c-pawns, a passed pawn on a6 and an e-pawn blocked by e5.
+    # Black: the e5 pawn, blocked too, and an isolated passed pawn on h3
+    board = chess.Board.from_fen('4k3/8/P7/4p3/2P1P3/2P4p/8/4K3 w - - 0 1')
+    white = pawns(board, chess.piece.PieceColor.WHITE)
+    black = pawns(board, chess.piece.PieceColor.BLACK)
+
+    doubled, isolated, blocked, *passed = pawn_terms(white, black)
+    assert doubled == 1
+    # a, c, c and e for White, e and h for Black
+    assert isolated == 4 - 2
+    # c3 and e4 for White, e5 for Black
+    assert blocked == 2 - 1
+    # a6 and c4 for White (c3 is behind c4), h3 for Black, which is on its sixth rank like a6
+    assert passed == [0, 0, 1, 0, 0, 0]
+
+    assert pawn_structure(0, 0) == 0
+
+
+def test_pawn_structure_is_symmetric():
+    board = chess.Board.from_fen('4k3/pp3p2/2p5/8/3P4/8/PP3PP1/4K3 w - - 0 1')
+    mirrored = chess.Board.from_fen('4k3/pp3pp1/8/3p4/8/2P5/PP3P2/4K3 w - - 0 1')
+    white, black = (pawns(board, color) for color in (chess.piece.PieceColor.WHITE, chess.piece.PieceColor.BLACK))
+    mirrored_white, mirrored_black = (pawns(mirrored, color) for color in (chess.piece.PieceColor.WHITE, chess.piece.PieceColor.BLACK))
+
+    assert pawn_structure(white, black) == -pawn_structure(mirrored_white, mirrored_black)
+
+
+def test_pawn_hash_is_used():
+    engine = OysterEngine()
+    board = chess.Board.default()
+    board.push_san('Nf3')
+
+    first = engine.evaluate(board)
+    misses = engine.pawn_table.misses
+    board.push_san('Nf6')
+    board.push_san('Ng1')
+    board.push_san('Ng8')
+    board.push_san('Nf3')
+
+    # the same pawns as before, so the score comes from the table
+    assert engine.evaluate(board) == first
+    assert engine.pawn_table.misses == misses
+    assert engine.pawn_table.hits == 1
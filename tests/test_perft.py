@@ -0,0 +1,45 @@
+import pytest
+
+import chess
+
+
+def perft(board: chess.Board, depth: int) -> int:
+    if depth == 0:
+        return 1
+
+    nodes = 0
+    for move in list(board.legal_moves()):
+        board.make_move(move)
+        nodes += perft(board, depth - 1)
+        board.unmake_move(move)
+    return nodes
+
+
+@pytest.mark.parametrize(
+    'fen, depth, nodes',
+    [
+        ('rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1', 3, 8902),
+        ('r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1', 2, 2039),
+        ('8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1', 3, 2812),
+        ('r3k2r/Pppp1ppp/1b3nbN/nP6/BBP1P3/q4N2/Pp1P2PP/R2Q1RK1 w kq - 0 1', 3, 9467),
+    ]
+)
+def test_perft(fen: str, depth: int, nodes: int):
+    board = chess.Board.from_fen(fen)
+
+    assert perft(board, depth) == nodes
+    assert board.fen == fen
+
+
+def test_halfmove_clock():
+    board = chess.Board.default()
+
+    board.push_san('Nf3')
+    board.push_san('Nf6')
+    assert board.halfmoves == 2
+
+    move = board.push_san('e4')
+    assert board.halfmoves == 0
+
+    board.unmake_move(move)
+    assert board.halfmoves == 2
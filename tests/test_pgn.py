@@ -0,0 +1,141 @@
+import pytest
+
+import chess
+from chess import errors, pgn
+
+
+GAMES = '''[Event "First"]
+[White "a \\"quoted\\" name"]
+[Black "b"]
+[Result "1-0"]
+
+1. e4 {a comment} e5 (1... c5 2. Nf3 (2. c3) d6) 2. Nf3 $1 Nc6 3. Bb5 a6
+; a rest of line comment
+4. Ba4 Nf6 5. O-O Be7 1-0
+
+[Event "Second"]
+[SetUp "1"]
+[FEN "4k3/P7/8/8/8/8/8/4K3 w - - 0 1"]
+[Result "*"]
+
+1. a8=Q+ Kd7 *
+
+[Event "Third"]
+[Result "0-1"]
+
+1. f3 e5 2. g4 Qh4# 0-1
+'''
+
+
+@pytest.fixture
+def path(tmp_path):
+    path = tmp_path / 'games.pgn'
+    path.write_text(GAMES)
+    return str(path)
+
+
+def test_games(path: str):
+    with pgn.PGNReader(path) as reader:
+        games = list(reader.games())
+
+    assert [game.headers['Event'] for game in games] == ['First', 'Second', 'Third']
+    assert games[0].headers['White'] == 'a "quoted" name'
+    assert [game.result for game in games] == ['1-0', '*', '0-1']
+
+
+def test_moves(path: str):
+    with pgn.PGNReader(path) as reader:
+        first, second, third = reader.games()
+
+        assert first.sans() == ['e4', 'e5', 'Nf3', 'Nc6', 'Bb5', 'a6', 'Ba4', 'Nf6', 'O-O', 'Be7']
+        assert first.board().fen == 'r1bqk2r/1pppbppp/p1n2n2/4p3/B3P3/5N2/PPPP1PPP/RNBQ1RK1 w kq - 4 6'
+        assert second.board().fen == 'Q7/3k4/8/8/8/8/8/4K3 w - - 1 2'
+        assert third.board().is_checkmate()
+
+        boards = [board.fen for board, _ in first.moves()]
+        assert boards[0] == chess.Board.DEFAULT_FEN
+        assert len(boards) == 10
+
+
+def test_game_without_moves(tmp_path):
+    path = tmp_path / 'empty.pgn'
+    path.write_text('[Event "?"]\n[SetUp "1"]\n[FEN "4k3/8/8/8/8/8/8/4K3 w - - 0 1"]\n[Result "*"]\n\n*\n')
+
+    with pgn.PGNReader(str(path)) as reader:
+        game, = reader.games()
+        assert game.sans() == []
+        assert game.board().fen == '4k3/8/8/8/8/8/8/4K3 w - - 0 1'
+
+
+def test_invalid_move(tmp_path):
+    path = tmp_path / 'invalid.pgn'
+    path.write_text('[Event "?"]\n\n1. e4 e5 2. Ke3 *\n')
+
+    with pgn.PGNReader(str(path)) as reader:
+        game, = reader.games()
+        with pytest.raises(errors.InvalidPGN):
+            game.board()
+
+
+def test_invalid_fen_tag(tmp_path):
+    path = tmp_path / 'invalid.pgn'
+    path.write_text(
+        '[Event "?"]\n[SetUp "1"]\n[FEN "not a fen"]\n[Result "1-0"]\n\n1. e4 1-0\n\n'
+        '[Event "?"]\n[Result "1-0"]\n\n1. e4 e5 1-0\n'
+    )
+
+    with pgn.PGNReader(str(path)) as reader:
+        game, _ = reader.games()
+        with pytest.raises(errors.InvalidPGN):
+            list(game.moves())
+        with pytest.raises(errors.InvalidPGN):
+            game.board()
+
+    # games that can't be set up are skipped like ones with bad moves
+    summary = pgn.extract_positions(str(path), str(tmp_path / 'chunks'), processes=1)
+    assert (summary['games'], summary['skipped'], summary['positions']) == (1, 1, 2)
+
+
+def test_offsets(path: str):
+    with pgn.PGNReader(path) as reader:
+        games = list(reader.games())
+
+        for game in games:
+            again = reader.game_at(*game.offsets)
+            assert again.headers == game.headers
+            assert again.sans() == game.sans()
+            assert reader.game_at(game.start).end == game.end
+
+        with pytest.raises(ValueError):
+            reader.game_at(games[1].start + 1)
+
+        # every game belongs to exactly one range, however the file is split
+        for middle in range(0, len(reader), 7):
+            starts = [game.start for game in reader.games(0, middle)]
+            starts += [game.start for game in reader.games(middle)]
+            assert starts == [game.start for game in games]
+
+
+def test_empty_file(tmp_path):
+    path = tmp_path / 'empty.pgn'
+    path.write_text('')
+
+    assert list(pgn.read_games(str(path))) == []
+
+
+def test_extract_positions(path: str, tmp_path):
+    directory = str(tmp_path / 'positions')
+    summary = pgn.extract_positions(path, directory, processes=2, chunk_size=4)
+
+    # the second game has no result
+    assert (summary['games'], summary['skipped'], summary['positions']) == (2, 1, 14)
+    # chunks only end between games
+    assert len(summary['files']) == 2
+
+    records = []
+    for file_path in summary['files']:
+        with open(file_path) as file:
+            records += [line.split(' | ') for line in file.read().splitlines()]
+
+    assert records[0] == [chess.Board.DEFAULT_FEN, 'e2e4', '1.0']
+    assert records[-1] == ['rnbqkbnr/pppp1ppp/8/4p3/6P1/5P2/PPPPP2P/RNBQKBNR b KQkq g3 0 2', 'd8h4', '0.0']
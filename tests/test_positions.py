@@ -0,0 +1,68 @@
+import pytest
+
+import chess
+
+pytest.importorskip('numpy')
+positions = pytest.importorskip('chess.positions')
+
+
+FENS = [
+    chess.Board.DEFAULT_FEN,
+    'r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1',
+    'rnbqkbnr/ppp1pppp/8/8/3pP3/8/PPPP1PPP/RNBQKBNR b KQkq e3 0 3',
+    '8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 41 120',
+]
+
+
+@pytest.mark.parametrize('fen', FENS)
+def test_packed(fen: str):
+    board = chess.Board.from_fen(fen)
+    packed = board.to_packed()
+    assert len(packed) == 32
+
+    unpacked = chess.Board.from_packed(packed)
+    assert unpacked.fen == fen
+    assert unpacked.zobrist == board.zobrist
+    assert sorted(move.lan for move in unpacked.legal_moves()) == sorted(move.lan for move in board.legal_moves())
+
+
+def test_packed_invalid():
+    with pytest.raises(ValueError):
+        chess.Board.from_packed(b'\0' * 31)
+
+    board = chess.Board.default()
+    board.rows[3] = [chess.piece.Queen(color=chess.piece.PieceColor.WHITE)] * 8
+    with pytest.raises(ValueError):
+        board.to_packed()
+
+
+def test_store(tmp_path):
+    path = str(tmp_path / 'analysis.positions')
+    boards = [chess.Board.from_fen(fen) for fen in FENS]
+
+    with positions.PositionStore(path) as store:
+        for i, board in enumerate(boards[:2]):
+            store.add(board, score=i, depth=10)
+        store.flush()
+
+        store.add(boards[2], score=2, depth=10, move=boards[2].parse_san('dxe3'))
+        # found before it's written
+        assert store.get(boards[2]).score == 2
+        assert boards[3] not in store
+
+    with positions.PositionStore(path) as store:
+        assert len(store) == 3
+        for i, board in enumerate(boards[:3]):
+            entry = store.get(board)
+            assert entry.score == i
+            assert entry.board().fen == board.fen
+
+        assert store.get(boards[2]).move == boards[2].parse_san('dxe3').id
+        assert store.get(boards[3]) is None
+
+        # a newer entry for the same position wins
+        store.add(boards[0], score=100, depth=20)
+
+    with positions.PositionStore(path) as store:
+        assert [entry.score for entry in store.lookup(boards[0].zobrist)] == [0, 100]
+        assert store.get(boards[0]).score == 100
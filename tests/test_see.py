@@ -0,0 +1,41 @@
+import pytest
+
+import chess
+
+
+@pytest.mark.parametrize(
+    'fen, san, expected',
+    [
+        # an undefended pawn
+        ('1k1r4/1pp4p/p7/4p3/8/P5P1/1PP4P/2K1R3 w - - 0 1', 'Rxe5', 100),
+        # the knight is lost for a pawn once every defender joins in
+        ('1k1r3q/1ppn3p/p4b2/4p3/8/P2N2P1/1PP1R1BP/2K1Q3 w - - 0 1', 'Nxe5', -200),
+        # the rook behind the rook (an x-ray) makes it safe to take the defended pawn
+        ('3r1k2/8/8/3p4/8/8/3R4/3RK3 w - - 0 1', 'Rxd5', 100),
+        ('3r1k2/8/8/3p4/8/8/8/3RK3 w - - 0 1', 'Rxd5', -400),
+        # the king can only take back when nothing else defends the square
+        ('8/8/8/8/8/4k3/3r4/3Q2K1 w - - 0 1', 'Qxd2', -400),
+        ('8/8/8/8/8/4k3/R2r4/3Q2K1 w - - 0 1', 'Qxd2', 500),
+        ('4k3/8/8/8/8/8/3r4/3QK3 w - - 0 1', 'Qxd2', 500),
+        # the queen is lost for a rook, and the king wins the knight back
+        ('4k3/8/8/8/8/1n6/3r4/3QK3 w - - 0 1', 'Qxd2', -100),
+    ]
+)
+def test_see(fen: str, san: str, expected: int):
+    board = chess.Board.from_fen(fen)
+    move = board.parse_san(san)
+
+    assert board.see(move) == expected
+    assert board.see_ge(move, expected)
+    assert not board.see_ge(move, expected + 1)
+
+
+def test_see_ge_matches_see():
+    board = chess.Board.from_fen('r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1')
+
+    for move in board.legal_moves():
+        if not move.capture:
+            continue
+        value = board.see(move)
+        for threshold in (-500, -101, -100, 0, 1, 100, 300, 301):
+            assert board.see_ge(move, threshold) == (value >= threshold), (move, threshold)
@@ -0,0 +1,51 @@
+import pytest
+
+import chess
+from chess import stats
+from chess.engines import Limits, OysterEngine
+
+
+@pytest.fixture
+def enabled():
+    stats.enable()
+    stats.reset()
+    yield
+    stats.disable()
+    stats.reset()
+
+
+def test_disabled():
+    stats.disable()
+    stats.reset()
+    OysterEngine().search(chess.Board.default(), Limits(depth=2))
+
+    assert not any(stats.counters.values())
+    assert not stats.depth_times
+
+
+def test_counters(enabled):
+    engine = OysterEngine()
+    engine.search(chess.Board.default(), Limits(depth=3))
+    counters = stats.counters
+
+    assert counters['nodes'] + counters['qs_nodes'] == engine.nodes
+    assert counters['evaluations'] == engine.moves_evaluated
+    assert counters['make_move'] == counters['unmake_move'] > 0
+    assert counters['tt_hits'] <= counters['tt_probes']
+    assert 0 < counters['first_move_cutoffs'] <= counters['beta_cutoffs']
+    assert sorted(stats.depth_times) == [1, 2, 3]
+    assert 'tt hit rate' in stats.format_stats()
+
+
+@pytest.mark.parametrize('mode', ['cprofile', 'sample'])
+def test_profiler(mode: str):
+    engine = OysterEngine()
+    engine.profiler = stats.SearchProfiler(mode, interval=0.0001)
+    engine.start_search(chess.Board.default(), Limits(depth=3))
+    assert engine.wait() is not None
+
+    report = engine.profiler.report()
+    if mode == 'cprofile':
+        assert 'negamax' in report
+    else:
+        assert engine.profiler.sample_count == 0 or 'samples' in report
@@ -0,0 +1,81 @@
+import pytest
+
+import chess
+
+np = pytest.importorskip('numpy')
+training = pytest.importorskip('chess.training')
+
+
+GAMES = '''[Event "First"]
+[Result "1-0"]
+
+1. e4 e5 2. Nf3 Nc6 1-0
+
+[Event "Second"]
+[Result "0-1"]
+
+1. e4 e5 2. Nf3 Nf6 0-1
+
+[Event "Unfinished"]
+[Result "*"]
+
+1. d4 *
+'''
+
+EPD = '''4k3/8/8/8/8/8/4P3/4K3 w - - bm e4; c9 "1/2-1/2";
+4k3/8/8/8/8/8/4P3/4K3 b - - id "no result";
+'''
+
+
+@pytest.fixture
+def paths(tmp_path):
+    pgn_path = tmp_path / 'games.pgn'
+    pgn_path.write_text(GAMES)
+    epd_path = tmp_path / 'suite.epd'
+    epd_path.write_text(EPD)
+    return str(pgn_path), str(epd_path)
+
+
+def test_export(tmp_path, paths):
+    pgn_path, epd_path = paths
+    directory = str(tmp_path / 'data')
+
+    with training.ShardWriter(directory, shard_size=3, chunk_size=2) as writer:
+        assert training.export_pgn(writer, pgn_path) == (2, 1)
+        assert training.export_epd(writer, epd_path) == (1, 1)
+
+    shards = training.load_shards(directory)
+    assert [len(shard['keys']) for shard in shards] == [3, 3, 3]
+    assert all(isinstance(shard['planes'], np.memmap) for shard in shards)
+
+    data = {name: np.concatenate([shard[name] for shard in shards]) for name in training.FIELDS}
+    assert list(data['results']) == [1, 1, 1, 1, -1, -1, -1, -1, 0]
+    assert list(data['side']) == [1, 0, 1, 0, 1, 0, 1, 0, 1]
+
+    board = chess.Board.default()
+    assert data['keys'][0] == board.zobrist
+    assert board.uci(board.move_from_id(int(data['moves'][0]))) == 'e2e4'
+
+    # the en passant square after 1. e4
+    assert data['en_passant'][1] == 20
+
+    planes = training.unpack_planes(data['planes'][:1])[0]
+    assert planes.shape == (12, 8, 8)
+    # white pawns, then white kings and black pawns
+    assert planes[0, 1].all() and planes[0].sum() == 8
+    assert planes[5, 0, 4] == 1
+    assert planes[6, 6].all()
+
+
+def test_deduplicate(tmp_path, paths):
+    pgn_path, _ = paths
+    directory = str(tmp_path / 'data')
+
+    with training.ShardWriter(directory, deduplicate=True) as writer:
+        training.export_pgn(writer, pgn_path)
+
+    # the games share their first four positions
+    assert writer.duplicates == 4
+    shards = training.load_shards(directory)
+    assert len(shards) == 1 and len(shards[0]['keys']) == 4
+    assert len(set(shards[0]['keys'].tolist())) == 4
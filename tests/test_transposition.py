@@ -0,0 +1,123 @@
+import pytest
+
+import chess
+from chess.engines import Limits, OysterEngine
+from chess.engines.transposition import Bound, SharedTranspositionTable, TranspositionTable
+
+
+def test_store_and_probe():
+    tt = TranspositionTable(1)
+    key = 0xDEADBEEFCAFEBABE
+
+    assert tt.probe(key) is None
+
+    tt.store(key, 5, -42.5, Bound.LOWER, 1234)
+    assert tt.probe(key) == (5, -42.5, Bound.LOWER, 1234)
+
+    # a shallower result for the same position doesn't overwrite a deeper one
+    tt.store(key, 2, 10, Bound.EXACT, 99)
+    assert tt.probe(key) == (5, -42.5, Bound.LOWER, 1234)
+
+    tt.clear()
+    assert tt.probe(key) is None
+
+
+def test_shared_table_is_visible_from_another_handle():
+    owner = SharedTranspositionTable(1)
+    other = SharedTranspositionTable(name=owner.name)
+    try:
+        owner.store(12345, 3, 100, Bound.EXACT, 7)
+        assert other.probe(12345) == (3, 100, Bound.EXACT, 7)
+    finally:
+        other.close()
+        owner.close()
+
+
+def test_lazy_smp_search():
+    fen = 'k7/8/1K6/8/8/8/8/7R w - - 0 1'
+    board = chess.Board.from_fen(fen)
+    engine = OysterEngine(threads=2)
+    try:
+        infos = engine.search(board, Limits(depth=3))
+    finally:
+        engine.close()
+
+    assert engine.pv[0].lan == 'h1-h8'
+    assert infos[-1].score >= engine.MATE_LOWER
+    assert board.fen == fen
+
+
+def test_older_generations_are_replaced():
+    tt = TranspositionTable(1)
+    key = 0x1234
+
+    tt.store(key, 6, 1, Bound.EXACT, 1)
+    tt.new_search()
+    tt.store(key, 2, 2, Bound.EXACT, 2)
+
+    assert tt.probe(key) == (2, 2, Bound.EXACT, 2)
+
+
+def test_engine_state_is_kept_between_searches():
+    board = chess.Board.from_fen('r1bqkb1r/pppp1ppp/2n2n2/4p3/2B1P3/5N2/PPPP1PPP/RNBQK2R w KQkq - 4 4')
+    engine = OysterEngine(depth=2)
+
+    engine.get_move(board)
+    first_evaluated = engine.moves_evaluated
+    assert engine.tt.probe(board.zobrist) is not None
+
+    engine.get_move(board)
+    # counters are per search, and the second search is served from the first
+    assert 0 < engine.moves_evaluated < first_evaluated
+    assert engine.tt_hits
+
+    engine.new_game()
+    assert engine.tt.probe(board.zobrist) is None
+    assert engine.history == {color: {} for color in engine.history}
+
+
+def test_new_position_is_left_untouched():
+    engine = OysterEngine(depth=1)
+    engine.get_move(chess.Board.default())
+
+    # a board set up from a FEN with an en passant square starts with a move that was never made
+    position = 'rnbqkbnr/ppp1pppp/8/8/3pP3/8/PPPP1PPP/RNBQKBNR b KQkq e3 0 3'
+    board = chess.Board.from_fen(position)
+    engine.get_move(board)
+    assert board.fen == position
+
+
+@pytest.mark.parametrize('bad_options', [
+    # the network is only loaded once a helper starts searching, so every search fails
+    {'evaluator': 'nnue', 'nnue_file': 'missing.npz'},
+    # the helper's engine can't be made at all
+    {'no_such_option': True},
+])
+def test_failing_helpers_still_report(bad_options: dict):
+    from chess.engines.smp import HelperPool
+
+    tt = SharedTranspositionTable(1)
+    helpers = HelperPool(2, dict(OysterEngine.OPTIONS, **bad_options), tt.name)
+    try:
+        helpers.start(chess.Board.default(), 2, 0)
+        assert helpers.stop() == [(None, None, 0, []), (None, None, 0, [])]
+    finally:
+        helpers.close()
+        tt.close()
+
+
+def test_dead_helper_is_not_waited_for():
+    from chess.engines.smp import HelperPool
+
+    tt = SharedTranspositionTable(1)
+    helpers = HelperPool(2, dict(OysterEngine.OPTIONS), tt.name)
+    try:
+        helpers.processes[0].terminate()
+        helpers.processes[0].join()
+
+        helpers.start(chess.Board.default(), 1, 0)
+        reports = helpers.stop()
+        assert len(reports) == 1
+    finally:
+        helpers.close()
+        tt.close()
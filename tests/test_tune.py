@@ -0,0 +1,80 @@
+import pytest
+
+import chess
+from chess.engines import OysterEngine
+from chess.piece import PieceColor
+
+pytest.importorskip('numpy')
+tune = pytest.importorskip('chess.tune')
+
+
+POSITIONS = [
+    ('r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1', 1.0),
+    ('r2q1rk1/pP1p2pp/Q4n2/bbp1p3/Np6/1B3NBn/pPPP1PPP/R3K2R b KQ - 0 1', 0.0),
+    ('8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1', 0.5),
+    ('rnbqkb1r/pppp1ppp/4pn2/8/2PP4/2N5/PP2PPPP/R1BQKBNR b KQkq - 1 3', 0.5),
+    ('4k3/8/8/8/8/8/4PPPP/4K2R w K - 0 1', 1.0),
+    ('4k3/pppp4/8/8/8/8/8/R3K3 b Q - 0 1', 0.0),
+]
+
+
+@pytest.mark.parametrize(
+    'line, expected',
+    [
+        ('8/8/8/8/8/8/8/K6k w - - 0 1 [1.0]', 1.0),
+        ('8/8/8/8/8/8/8/K6k w - - 0 1 "1/2-1/2"', 0.5),
+        ('8/8/8/8/8/8/8/K6k w - - c9 "0-1";', 0.0),
+        ('8/8/8/8/8/8/8/K6k w - - 0 1 | 35 | 1', 1.0),
+        ('8/8/8/8/8/8/8/K6k w - - 0 1', None),
+    ]
+)
+def test_parse_line(line: str, expected):
+    position = tune.parse_line(line)
+    if expected is None:
+        assert position is None
+    else:
+        assert position == ('8/8/8/8/8/8/8/K6k', expected)
+
+
+def test_features_match_evaluate():
+    engine = OysterEngine()
+    dataset = tune.build_dataset((fen.split()[0], result) for fen, result in POSITIONS)
+    scores = tune.evaluate(tune.initial_parameters(), dataset)
+
+    for (fen, _), score in zip(POSITIONS, scores):
+        board = chess.Board.from_fen(fen)
+        expected = engine.evaluate(board)
+        if board.active_color == PieceColor.BLACK:
+            expected = -expected
+        assert score == pytest.approx(expected), fen
+
+
+@pytest.mark.parametrize('placement', ['4k2P/8/8/8/8/8/8/4K3', '4k3/8/8/8/8/8/8/p3K3'])
+def test_pawn_on_back_rank(placement: str):
+    with pytest.raises(ValueError):
+        tune.placement_features(placement)
+
+    # a bad line is skipped rather than stopping the run
+    dataset = tune.build_dataset([(placement, 1.0), ('4k3/8/8/8/8/8/4P3/4K3', 0.5)])
+    assert len(dataset.results) == 1
+
+
+def test_tune_lowers_error(tmp_path):
+    path = tmp_path / 'positions.epd'
+    path.write_text(''.join(f'{fen} [{result}]\n' for fen, result in POSITIONS))
+    cache = str(tmp_path / 'cache')
+
+    dataset = tune.load_dataset([str(path)], cache)
+    cached = tune.load_dataset([str(path)], cache)
+    assert (cached.indices == dataset.indices).all()
+    assert (cached.results == dataset.results).all()
+
+    k = tune.fit_k(tune.initial_parameters(), dataset)
+    start = tune.error(tune.initial_parameters(), dataset, k)
+    parameters, end = tune.tune(dataset, k=k, iterations=50)
+    assert end < start
+
+    source = tune.format_parameters(parameters)
+    namespace = {'PieceType': chess.piece.PieceType}
+    exec(source, namespace)
+    assert set(namespace['PIECE_SQUARE_TABLES']) == set(OysterEngine.PIECE_SCORES)
@@ -0,0 +1,63 @@
+import io
+
+import pytest
+
+import chess
+from chess.engines import OysterEngine, RandomEngine
+from chess.uci import UCI
+
+
+@pytest.mark.parametrize(
+    'fen, uci',
+    [
+        ('r3k2r/8/8/8/8/8/8/R3K2R w KQkq - 0 1', 'e1g1'),
+        ('r3k2r/8/8/8/8/8/8/R3K2R b KQkq - 0 1', 'e8c8'),
+        ('8/4P3/8/8/8/8/8/k6K w - - 0 1', 'e7e8n'),
+        ('rnbqkbnr/ppp1pppp/8/8/3pP3/8/PPPP1PPP/RNBQKBNR b KQkq e3 0 3', 'd4e3'),
+    ]
+)
+def test_uci_round_trip(fen: str, uci: str):
+    board = chess.Board.from_fen(fen)
+
+    move = board.parse_uci(uci)
+
+    assert board.uci(move) == uci
+
+
+@pytest.mark.parametrize('engine_class', [OysterEngine, RandomEngine])
+def test_uci_plays_a_legal_move(engine_class):
+    output = io.StringIO()
+    uci = UCI(engine_class(depth=2) if engine_class is OysterEngine else engine_class(), output)
+
+    uci.run([
+        'uci',
+        'setoption name Hash value 1' if engine_class is OysterEngine else 'isready',
+        'position startpos moves e2e4',
+        'position startpos moves e2e4 e7e5 g1f3',
+        'go',
+        'quit',
+    ])
+
+    lines = output.getvalue().splitlines()
+    assert 'uciok' in lines
+    assert uci.board.fen.startswith('rnbqkbnr/pppp1ppp/8/4p3/4P3/5N2/PPPP1PPP/RNBQKB1R b KQkq -')
+
+    best_move = lines[-1].split()
+    assert best_move[0] == 'bestmove'
+    assert uci.board.parse_uci(best_move[1])
+
+
+def test_uci_multipv():
+    output = io.StringIO()
+    uci = UCI(OysterEngine(), output)
+
+    for line in ('setoption name MultiPV value 3', 'position startpos', 'go depth 2'):
+        uci.handle(line)
+    # let the search finish instead of stopping it
+    uci.reporter.join()
+    uci.handle('quit')
+
+    lines = output.getvalue().splitlines()
+    depth_two = [line for line in lines if line.startswith('info depth 2 ')]
+    assert [line.split()[4] for line in depth_two] == ['1', '2', '3']
+    assert lines[-1].startswith('bestmove')
@@ -0,0 +1,53 @@
+import pytest
+
+import chess
+
+
+def walk(board: chess.Board, depth: int):
+    assert board.zobrist == board.compute_zobrist()
+    assert board.pawn_zobrist == board.compute_pawn_zobrist()
+
+    if not depth:
+        return
+
+    for move in list(board.legal_moves()):
+        board.make_move(move)
+        walk(board, depth - 1)
+        board.unmake_move(move)
+
+    assert board.zobrist == board.compute_zobrist()
+    assert board.pawn_zobrist == board.compute_pawn_zobrist()
+
+
+@pytest.mark.parametrize(
+    'fen',
+    [
+        'r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1',
+        'rnbq1k1r/pp1Pbppp/2p5/8/2B5/8/PPP1NnPP/RNBQK2R w KQ - 1 8',
+        'rnbqkbnr/ppp1pppp/8/8/3pP3/8/PPPP1PPP/RNBQKBNR b KQkq e3 0 3',
+    ]
+)
+def test_incremental_zobrist(fen: str):
+    walk(chess.Board.from_fen(fen), 2)
+
+
+def test_zobrist_distinguishes_side_and_castling():
+    keys = {
+        chess.Board.from_fen('r3k2r/8/8/8/8/8/8/R3K2R w KQkq - 0 1').zobrist,
+        chess.Board.from_fen('r3k2r/8/8/8/8/8/8/R3K2R b KQkq - 0 1').zobrist,
+        chess.Board.from_fen('r3k2r/8/8/8/8/8/8/R3K2R w Kkq - 0 1').zobrist,
+    }
+
+    assert len(keys) == 3
+
+
+def test_transposition_has_same_zobrist():
+    first = chess.Board.default()
+    for san in ('Nf3', 'Nf6', 'Nc3'):
+        first.push_san(san)
+
+    second = chess.Board.default()
+    for san in ('Nc3', 'Nf6', 'Nf3'):
+        second.push_san(san)
+
+    assert first.zobrist == second.zobrist